@@ -0,0 +1,195 @@
+"""
+MASAL SEPETİ - Üretim uç noktaları için kabul kontrolü
+Kullanıcı / IP başına token bucket, LLM ve TTS için küresel eşzamanlılık sınırı,
+sınırlı bekleme kuyruğu ve hızlı 429 reddi
+"""
+
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+from cachetools import TTLCache
+from pymongo import ReturnDocument
+
+
+class AdmissionRejected(Exception):
+    """Request refused by admission control; retry_after is in seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class MemoryTokenBuckets:
+    """Per-key token buckets kept in process memory (single worker)"""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        # Idle buckets refill completely after burst / rate seconds; drop them then
+        ttl = burst / self.rate if self.rate > 0 else 3600
+        self.buckets = TTLCache(maxsize=max_keys, ttl=ttl)
+
+    async def take(self, key: str) -> float:
+        """Consume one token; returns 0 if admitted, else seconds until a token is available"""
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            self.buckets[key] = (tokens - 1, now)
+            return 0.0
+        self.buckets[key] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+
+class MongoTokenBuckets:
+    """Token buckets shared by all workers: one atomic pipeline update per request"""
+
+    def __init__(self, collection, rate_per_minute: float, burst: int):
+        self.collection = collection
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+
+    async def take(self, key: str) -> float:
+        now = datetime.now(timezone.utc)
+        refilled = {"$min": [
+            self.burst,
+            {"$add": [
+                {"$ifNull": ["$tokens", self.burst]},
+                {"$multiply": [
+                    self.rate,
+                    {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+                ]}
+            ]}
+        ]}
+        bucket = await self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"admitted": {"$gte": ["$tokens", 1]}}},
+                {"$set": {"tokens": {"$cond": ["$admitted", {"$subtract": ["$tokens", 1]}, "$tokens"]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["admitted"]:
+            return 0.0
+        return (1 - bucket["tokens"]) / self.rate
+
+
+class ConcurrencyLimiter:
+    """Global cap on in-flight calls with a bounded, time-limited wait queue"""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if not self.semaphore.locked():
+            # Free slot: acquire() returns without suspending
+            await self.semaphore.acquire()
+        elif self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(f"{self.name} queue full", self.queue_timeout)
+        else:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise AdmissionRejected(f"{self.name} queue timeout", self.queue_timeout)
+            finally:
+                self.waiting -= 1
+
+        self.in_flight += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue_depth": self.max_waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected
+        }
+
+
+class AdmissionController:
+    """
+    Rate limits generation requests per user and per client IP, and bounds
+    concurrent LLM and TTS calls. ADMISSION_BACKEND=mongo moves the token
+    buckets to Mongo so all workers share them; the concurrency limits stay
+    per worker.
+    """
+
+    def __init__(self, db=None):
+        user_rate = float(os.environ.get("ADMISSION_USER_PER_MINUTE", "4"))
+        user_burst = int(os.environ.get("ADMISSION_USER_BURST", "4"))
+        ip_rate = float(os.environ.get("ADMISSION_IP_PER_MINUTE", "6"))
+        ip_burst = int(os.environ.get("ADMISSION_IP_BURST", "6"))
+        max_queue = int(os.environ.get("ADMISSION_QUEUE_SIZE", "16"))
+        queue_timeout = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "10"))
+
+        self.backend = os.environ.get("ADMISSION_BACKEND", "memory").lower()
+        if self.backend == "mongo" and db is not None:
+            collection = db.rate_limits
+            self.user_buckets = MongoTokenBuckets(collection, user_rate, user_burst)
+            self.ip_buckets = MongoTokenBuckets(collection, ip_rate, ip_burst)
+        else:
+            self.backend = "memory"
+            self.user_buckets = MemoryTokenBuckets(user_rate, user_burst)
+            self.ip_buckets = MemoryTokenBuckets(ip_rate, ip_burst)
+
+        self.llm = ConcurrencyLimiter(
+            "llm", int(os.environ.get("ADMISSION_LLM_CONCURRENCY", "8")), max_queue, queue_timeout
+        )
+        self.tts = ConcurrencyLimiter(
+            "tts", int(os.environ.get("ADMISSION_TTS_CONCURRENCY", "4")), max_queue, queue_timeout
+        )
+        self.rate_admitted = 0
+        self.rate_rejected = {"user": 0, "ip": 0}
+
+    async def check_rate(self, user_id: Optional[str], client_ip: Optional[str]):
+        """Raise AdmissionRejected if the user's or the IP's bucket is empty"""
+        if user_id:
+            wait = await self.user_buckets.take(f"user:{user_id}")
+            if wait > 0:
+                self.rate_rejected["user"] += 1
+                raise AdmissionRejected("user rate limit", wait)
+        if client_ip:
+            wait = await self.ip_buckets.take(f"ip:{client_ip}")
+            if wait > 0:
+                self.rate_rejected["ip"] += 1
+                raise AdmissionRejected("ip rate limit", wait)
+        self.rate_admitted += 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "rate_admitted": self.rate_admitted,
+            "rate_rejected": self.rate_rejected,
+            "llm": self.llm.stats(),
+            "tts": self.tts.stats()
+        }
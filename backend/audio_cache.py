@@ -0,0 +1,255 @@
+"""
+MASAL SEPETİ - TTS ses önbelleği
+(metin, ses ayarları) anahtarlı içerik adresli ses önbelleği: yerel disk veya GridFS,
+boyut sınırlı LRU tahliyesi ve isabet oranı
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_tts_text(text: str) -> str:
+    """Canonical form of a synthesis input: NFC, collapsed whitespace, stripped"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def audio_cache_key(text: str, voice_name: str, speaking_rate: float, pitch: float, encoding: str) -> str:
+    """Content address of one synthesis request"""
+    material = "\x1f".join([
+        normalize_tts_text(text),
+        voice_name,
+        f"{speaking_rate:.3f}",
+        f"{pitch:.3f}",
+        encoding
+    ])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Base class: hit/miss accounting shared by the storage backends"""
+
+    backend = "off"
+
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[bytes]:
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes):
+        return None
+
+    def size_bytes(self) -> int:
+        return 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self.size_bytes(),
+            "max_bytes": self.max_bytes
+        }
+
+
+class LocalAudioCache(AudioCache):
+    """
+    One file per key in a directory, shared by every worker on the host.
+
+    The directory itself is the index: lookups read the file, hits refresh its
+    mtime, and eviction rescans the directory so max_bytes holds across
+    processes. Nothing touches the disk until the first put.
+    """
+
+    backend = "local"
+
+    def __init__(self, directory: Path, max_bytes: int):
+        super().__init__(max_bytes)
+        self.directory = Path(directory)
+        self.total_bytes = None  # disk usage as of the last scan
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}.bin"
+
+    def size_bytes(self) -> int:
+        return self.total_bytes or 0
+
+    def read(self, path: Path) -> bytes:
+        data = path.read_bytes()
+        # Touch for LRU order (mtime is what every worker's eviction sorts by)
+        os.utime(path)
+        return data
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            data = await asyncio.to_thread(self.read, self.path_for(key))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except OSError as e:
+            logger.warning(f"TTS cache read failed for {key}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def write(self, path: Path, data: bytes):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Per-process temp name: workers may write the same key at once
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    async def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        path = self.path_for(key)
+        try:
+            if await asyncio.to_thread(path.exists):
+                return
+            await asyncio.to_thread(self.write, path, data)
+        except OSError as e:
+            logger.warning(f"TTS cache write failed for {key}: {e}")
+            return
+        await self.evict()
+
+    def evict_from_disk(self) -> int:
+        """Rescan the directory and unlink least recently used files over max_bytes"""
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".bin"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # evicted by another worker mid-scan
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                evicted += 1
+            except FileNotFoundError:
+                pass  # another worker got there first
+            total -= size
+        self.total_bytes = total
+        return evicted
+
+    async def evict(self):
+        try:
+            self.evictions += await asyncio.to_thread(self.evict_from_disk)
+        except OSError as e:
+            logger.warning(f"TTS cache eviction failed: {e}")
+
+
+class GridFSAudioCache(AudioCache):
+    """
+    GridFS bucket shared by all workers; metadata.last_used drives LRU eviction.
+
+    The bucket size is recomputed from the files collection before each
+    eviction pass, so max_bytes holds across workers.
+    """
+
+    backend = "gridfs"
+
+    def __init__(self, db, max_bytes: int, bucket_name: str = "tts_cache"):
+        super().__init__(max_bytes)
+        from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+        self.files = db[f"{bucket_name}.files"]
+        self.total_bytes = None  # bucket size as of the last eviction pass
+
+    def size_bytes(self) -> int:
+        return self.total_bytes or 0
+
+    async def load_total(self) -> int:
+        result = await self.files.aggregate([
+            {"$group": {"_id": None, "total": {"$sum": "$length"}}}
+        ]).to_list(1)
+        self.total_bytes = result[0]["total"] if result else 0
+        return self.total_bytes
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            entry = await self.files.find_one_and_update(
+                {"filename": key},
+                {"$set": {"metadata.last_used": datetime.now(timezone.utc)}},
+                projection={"_id": 1}
+            )
+            if not entry:
+                self.misses += 1
+                return None
+            stream = await self.bucket.open_download_stream(entry["_id"])
+            data = await stream.read()
+        except Exception as e:
+            logger.warning(f"TTS cache read failed for {key}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    async def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        try:
+            if await self.files.find_one({"filename": key}, {"_id": 1}):
+                return
+            await self.bucket.upload_from_stream(
+                key, data, metadata={"last_used": datetime.now(timezone.utc)}
+            )
+            await self.evict()
+        except Exception as e:
+            logger.warning(f"TTS cache write failed for {key}: {e}")
+
+    async def evict(self):
+        # Other workers add and evict files too: start from the shared size
+        if await self.load_total() <= self.max_bytes:
+            return
+        from gridfs.errors import NoFile
+
+        oldest = self.files.find({}, {"_id": 1, "length": 1}).sort("metadata.last_used", 1)
+        async for entry in oldest:
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                await self.bucket.delete(entry["_id"])
+                self.evictions += 1
+            except NoFile:
+                pass  # another worker evicted it first
+            self.total_bytes -= entry["length"]
+
+
+def create_audio_cache(db, default_directory: Path) -> AudioCache:
+    """Build the cache configured by TTS_CACHE_BACKEND (local, gridfs or off)"""
+    backend = os.environ.get("TTS_CACHE_BACKEND", "local").lower()
+    max_bytes = int(os.environ.get("TTS_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+    if backend == "gridfs":
+        return GridFSAudioCache(db, max_bytes)
+    if backend == "local":
+        directory = Path(os.environ.get("TTS_CACHE_DIR", default_directory))
+        return LocalAudioCache(directory, max_bytes)
+    return AudioCache()
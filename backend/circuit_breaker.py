@@ -0,0 +1,108 @@
+"""
+MASAL SEPETİ - Devre kesici
+Tekrarlayan sağlayıcı hatalarında çağrıları hemen reddeder,
+üstel geri çekilmeyle yarı açık deneme yapar
+"""
+
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Call skipped because the breaker is open; retry_after is in seconds"""
+
+    def __init__(self, name: str, retry_after: float, last_error: Optional[str]):
+        super().__init__(f"{name} circuit open")
+        self.retry_after = retry_after
+        self.last_error = last_error
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker.
+
+    CLOSED: calls pass; consecutive failures are counted and the breaker opens
+    at failure_threshold (or at once for a failure recorded with trip=True).
+    OPEN: calls are refused until the backoff elapses.
+    HALF_OPEN: exactly one probe call is let through. Success closes the
+    breaker and resets the backoff; failure reopens it with the backoff doubled,
+    capped at max_backoff.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, base_backoff: float, max_backoff: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.backoff = base_backoff
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.last_error: Optional[str] = None
+        self.opened_count = 0
+        self.short_circuited = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.backoff - time.monotonic())
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go through now"""
+        if self.state == CLOSED:
+            return
+        if self.state == OPEN and self.retry_after() == 0:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            logger.info(f"{self.name} circuit half-open, probing")
+            return
+        self.short_circuited += 1
+        raise CircuitOpen(self.name, self.retry_after(), self.last_error)
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"{self.name} circuit closed")
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.backoff = self.base_backoff
+        self.probe_in_flight = False
+
+    def record_failure(self, error: str, trip: bool = False):
+        self.last_error = error
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self.backoff = min(self.backoff * 2, self.max_backoff)
+            self.open()
+        elif trip or self.consecutive_failures >= self.failure_threshold:
+            self.open()
+
+    def record_ignored(self):
+        """The call failed for a reason that says nothing about provider health"""
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = False
+
+    def open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        self.opened_count += 1
+        logger.warning(f"{self.name} circuit open for {self.backoff:.0f}s: {self.last_error}")
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "backoff_seconds": self.backoff,
+            "retry_after_seconds": round(self.retry_after(), 1) if self.state != CLOSED else 0,
+            "opened_count": self.opened_count,
+            "short_circuited": self.short_circuited,
+            "last_error": self.last_error
+        }
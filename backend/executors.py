@@ -0,0 +1,112 @@
+"""
+MASAL SEPETİ - CPU iş yükü yürütücüleri
+Olay döngüsünü bloke eden işler için paylaşılan thread/process havuzları ve kuyruk metrikleri
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Workload:
+    """
+    One named class of blocking work with its own pool.
+
+    kind="thread" suits work that releases the GIL (bcrypt, gRPC I/O, zlib);
+    kind="process" suits pure-Python CPU work. Pools are created on first use
+    and sized from EXECUTOR_<NAME>_WORKERS.
+    """
+
+    def __init__(self, name: str, kind: str, default_workers: int):
+        self.name = name
+        self.kind = kind
+        self.max_workers = int(os.environ.get(f"EXECUTOR_{name.upper()}_WORKERS", default_workers))
+        self.executor: Optional[Executor] = None
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_seconds = 0.0
+
+    def get_executor(self) -> Executor:
+        if self.executor is None:
+            if self.kind == "process":
+                # spawn: children import only the target function's module,
+                # never fork a process that already runs an event loop and threads
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self.executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=f"{self.name}-worker"
+                )
+        return self.executor
+
+    async def run(self, fn, *args, **kwargs):
+        if self.max_workers <= 0:
+            # Pool disabled: run inline on the event loop
+            return fn(*args, **kwargs)
+
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            result = await loop.run_in_executor(self.get_executor(), functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        # avg_ms is over successful jobs only
+        self.completed += 1
+        self.total_seconds += time.perf_counter() - started
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.max_workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.max_workers),
+            "max_in_flight": self.max_in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_ms": round(self.total_seconds / self.completed * 1000, 2) if self.completed else 0.0
+        }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+
+WORKLOADS: Dict[str, Workload] = {
+    "password": Workload("password", "thread", 4),
+    "encoding": Workload("encoding", "thread", 2),
+    "tts": Workload("tts", "thread", 8),
+    "moderation": Workload("moderation", "process", 2),
+}
+
+
+async def run_blocking(workload: str, fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) on the named workload's pool"""
+    return await WORKLOADS[workload].run(fn, *args, **kwargs)
+
+
+def executor_stats() -> dict:
+    return {name: workload.stats() for name, workload in WORKLOADS.items()}
+
+
+def shutdown_executors():
+    for workload in WORKLOADS.values():
+        workload.shutdown()
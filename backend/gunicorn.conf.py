@@ -0,0 +1,74 @@
+"""
+MASAL SEPETİ - Üretim sunucusu ayarları
+gunicorn + uvicorn işçileri (uvloop / httptools), CPU sayısına göre işçi sayısı,
+paylaşılan salt-okunur verinin önceden yüklenmesi ve kontrollü kapanış
+
+    gunicorn server:app -c gunicorn.conf.py
+"""
+
+import gc
+import math
+import os
+
+
+def available_cpus() -> int:
+    """CPUs this container may use: cgroup v2 quota if set, else the affinity mask"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return len(os.sched_getaffinity(0))
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8001')}"
+
+# One event loop per core; WEB_CONCURRENCY overrides
+workers = int(os.environ.get("WEB_CONCURRENCY", "0")) or min(
+    available_cpus(), int(os.environ.get("WEB_MAX_WORKERS", "8"))
+)
+# Picks uvloop and httptools when installed
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import server.py once in the master: TOPICS_DATABASE, the pre-serialized
+# topic JSON and the moderation word lists are shared copy-on-write by the
+# workers. Mongo, grpc and OpenAI clients connect lazily, after the fork.
+preload_app = True
+
+# SIGTERM: stop accepting, let in-flight generations finish (the app drains its
+# own background work for SHUTDOWN_DRAIN_TIMEOUT seconds), then exit
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "90"))
+timeout = int(os.environ.get("WORKER_TIMEOUT", "120"))
+keepalive = 5
+
+# Railway's edge proxy appends the client address to X-Forwarded-For; the app
+# trusts exactly that hop for per-IP rate limits (see get_client_ip)
+os.environ.setdefault("TRUSTED_PROXY_COUNT", "1")
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    from moderation import get_profanity
+
+    get_profanity()
+    # Keep the preloaded objects out of the collector so it does not touch
+    # (and copy) their pages in every worker
+    gc.collect()
+    gc.freeze()
+    server.log.info(f"Preloaded shared data, starting {workers} workers")
+
+
+def pre_fork(server, worker):
+    # Exactly one worker runs the periodic jobs (stats reconciliation, story
+    # pool, audio backfill); a respawned worker takes over when it dies
+    worker.runs_background_jobs = not any(
+        getattr(other, "runs_background_jobs", False) for other in server.WORKERS.values()
+    )
+
+
+def post_fork(server, worker):
+    os.environ["BACKGROUND_JOBS_ENABLED"] = "true" if worker.runs_background_jobs else "false"
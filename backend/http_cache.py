@@ -0,0 +1,145 @@
+"""
+MASAL SEPETİ - HTTP koşullu önbellekleme
+Okuma endpoint'leri için güçlü ETag, If-None-Match -> 304, rota bazlı Cache-Control
+ve byte aralığı (Range) ayrıştırma
+"""
+
+import hashlib
+import re
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+
+def compile_route_template(template: str) -> re.Pattern:
+    """Convert a route template like /api/masal/{slug} into an anchored regex"""
+    pattern = re.sub(r"\\\{[^/]+?\\\}", "[^/]+", re.escape(template))
+    return re.compile(f"^{pattern}/?$")
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag derived from the exact response bytes"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of If-None-Match against an ETag (RFC 7232 section 3.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class RangeNotSatisfiable(Exception):
+    """The requested byte range starts past the end of the body (416)"""
+
+
+def parse_byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive (start, end) of a single "bytes=" range (RFC 7233), or None to
+    send the whole body: no header, another unit, multiple ranges or a
+    malformed spec. Raises RangeNotSatisfiable when no byte of it exists.
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, separator, last = spec.strip().partition("-")
+    if not separator or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+
+    if not first:
+        # bytes=-N: the last N bytes
+        if not last:
+            return None
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise RangeNotSatisfiable()
+        return max(0, size - suffix), size - 1
+
+    start = int(first)
+    end = int(last) if last else None
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, size - 1 if end is None else min(end, size - 1)
+
+
+class ConditionalCacheMiddleware:
+    """
+    Pure ASGI middleware for cacheable GET routes.
+
+    Only paths matching one of the configured route templates are touched; every
+    other request streams through untouched. Matching 200 responses get a strong
+    ETag and the route's Cache-Control, and a matching If-None-Match turns the
+    response into a bodiless 304.
+    """
+
+    def __init__(self, app, policies: List[Tuple[str, str]]):
+        self.app = app
+        self.policies = [(compile_route_template(template), cache_control) for template, cache_control in policies]
+
+    def match_policy(self, path: str) -> Optional[str]:
+        for pattern, cache_control in self.policies:
+            if pattern.match(path):
+                return cache_control
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        cache_control = self.match_policy(scope["path"])
+        if cache_control is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        body_parts = []
+
+        async def buffered_send(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                await self.send_with_validators(scope, start_message, b"".join(body_parts), cache_control, send)
+                return
+            await send(message)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def send_with_validators(self, scope, start_message, body: bytes, cache_control: str, send):
+        if start_message["status"] != 200:
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        etag = compute_etag(body)
+        headers = MutableHeaders(scope=start_message)
+        headers["ETag"] = etag
+        headers["Cache-Control"] = cache_control
+
+        if etag_matches(Headers(scope=scope).get("if-none-match"), etag):
+            del headers["content-length"]
+            del headers["content-type"]
+            start_message["status"] = 304
+            await send(start_message)
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,375 @@
+"""
+MASAL SEPETİ - Önbellek geçersizleştirme veri yolu
+stories / users / user_sessions change stream'lerini izler ve kayıtlı süreç içi
+önbelleklere tipli geçersizleştirme olayları yayar. Change stream yoksa
+(standalone Mongo, mongomock) yalnızca TTL ile çalışılır.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from cachetools import TTLCache
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INSERT = "insert"
+UPDATE = "update"
+REPLACE = "replace"
+DELETE = "delete"
+# Events may have been missed (stream restarted without a resume token):
+# subscribers drop everything they hold for the collection
+RESYNC = "resync"
+
+CHANGE_STREAMS = "change_streams"
+TTL_ONLY = "ttl_only"
+STARTING = "starting"
+
+# $changeStream is only supported on replica sets / sharded clusters
+_UNSUPPORTED_CODES = {40573}
+# The resume token fell off the oplog or can no longer be used
+_HISTORY_LOST_CODES = {260, 280, 286}
+
+
+class InvalidationEvent:
+    """
+    One change to a watched collection. fields holds the document's _id (as a
+    string) and, when the change carries an image of the document, the key
+    fields the bus was configured to look up.
+    """
+
+    def __init__(self, collection: str, operation: str, fields: Optional[dict] = None, updated_fields: Iterable[str] = ()):
+        self.collection = collection
+        self.operation = operation
+        self.fields = fields or {}
+        self.updated_fields = set(updated_fields)
+
+    def __repr__(self):
+        return f"InvalidationEvent({self.collection}, {self.operation}, {self.fields})"
+
+
+def change_stream_pipeline(key_fields: List[str], ignored_updates: List[str]) -> list:
+    """
+    Server-side filtering and projection: counter-only updates are dropped and
+    only the key fields travel back (never content or audio)
+    """
+    pipeline = []
+    if ignored_updates:
+        pipeline.append({"$match": {
+            f"updateDescription.updatedFields.{field}": {"$exists": False} for field in ignored_updates
+        }})
+    projection = {
+        "operationType": 1,
+        "documentKey": 1,
+        "updateDescription.removedFields": 1,
+        "updatedFieldNames": {"$map": {
+            "input": {"$objectToArray": {"$ifNull": ["$updateDescription.updatedFields", {}]}},
+            "in": "$$this.k"
+        }}
+    }
+    for field in key_fields:
+        projection[f"fullDocument.{field}"] = 1
+        projection[f"fullDocumentBeforeChange.{field}"] = 1
+    pipeline.append({"$project": projection})
+    return pipeline
+
+
+def event_from_change(collection: str, change: dict, key_fields: List[str]) -> InvalidationEvent:
+    image = change.get("fullDocument") or change.get("fullDocumentBeforeChange") or {}
+    fields = {field: image[field] for field in key_fields if field in image}
+    fields["_id"] = str(change["documentKey"]["_id"])
+    removed = (change.get("updateDescription") or {}).get("removedFields", [])
+    return InvalidationEvent(collection, change["operationType"], fields, list(change.get("updatedFieldNames", [])) + removed)
+
+
+class InvalidatingCache:
+    """
+    TTL cache whose entries are tagged with the documents they were built from,
+    as (collection, field, value) triples. An invalidation event drops every
+    entry tagged with the changed document; a RESYNC drops every entry that
+    depends on that collection.
+
+    With require_live the cache only serves entries while every change stream
+    is open; in TTL-only mode it is bypassed.
+
+    Every invalidation bumps generation. Callers take snapshot() before reading
+    from Mongo and pass it to set(), which drops the value if an invalidation
+    arrived in between (the read may have returned the document's old state).
+    """
+
+    def __init__(self, bus: "InvalidationBus", name: str, maxsize: int, ttl: float, require_live: bool = False):
+        self.bus = bus
+        self.name = name
+        self.maxsize = maxsize
+        self.require_live = require_live
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.tags: Dict[Tuple[str, str, str], set] = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.stale_skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.bus.live or not self.require_live
+
+    def get(self, key: Hashable):
+        if not self.enabled:
+            return None
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def snapshot(self) -> int:
+        return self.generation
+
+    def set(self, key: Hashable, value, depends_on: Iterable[Tuple[str, str, object]], since: Optional[int] = None):
+        if not self.enabled:
+            return
+        if since is not None and since != self.generation:
+            self.stale_skipped += 1
+            return
+        tags = [(collection, field, str(value_)) for collection, field, value_ in depends_on]
+        self.entries[key] = (value, tags)
+        for tag in tags:
+            self.tags.setdefault(tag, set()).add(key)
+        if len(self.tags) > 4 * self.maxsize:
+            self.prune_tags()
+
+    def prune_tags(self):
+        """Rebuild the tag index from live entries (expired keys are evicted silently)"""
+        self.tags = {}
+        for key, (_, tags) in list(self.entries.items()):
+            for tag in tags:
+                self.tags.setdefault(tag, set()).add(key)
+
+    def invalidate(self, collection: str, field: str, value):
+        self.generation += 1
+        for key in self.tags.pop((collection, field, str(value)), ()):
+            if self.entries.pop(key, None) is not None:
+                self.invalidated += 1
+
+    def invalidate_collection(self, collection: str):
+        self.generation += 1
+        for tag in [tag for tag in self.tags if tag[0] == collection]:
+            self.invalidate(*tag)
+
+    def handle(self, event: InvalidationEvent):
+        if event.operation == RESYNC:
+            self.invalidate_collection(event.collection)
+            return
+        for field, value in event.fields.items():
+            self.invalidate(event.collection, field, value)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidated": self.invalidated,
+            "stale_skipped": self.stale_skipped
+        }
+
+
+class InvalidationBus:
+    """
+    Tails one change stream per watched collection and publishes
+    InvalidationEvents to the subscribers of that collection. Streams resume
+    from their last token after errors; a restart without a usable token
+    publishes RESYNC. Deployments without change streams run in TTL-only mode.
+
+    collections maps a collection name to the fields subscribers need from
+    the document (update events look them up); ignored_updates lists fields
+    whose updates are not worth an event (counters).
+    """
+
+    def __init__(
+        self,
+        db,
+        collections: Dict[str, List[str]],
+        ignored_updates: Optional[Dict[str, List[str]]] = None,
+        enabled: bool = True,
+        pre_images: bool = False,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 60.0
+    ):
+        self.db = db
+        self.collections = collections
+        self.ignored_updates = ignored_updates or {}
+        self.enabled = enabled
+        self.pre_images = pre_images
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.mode = STARTING
+        self.fallback_reason: Optional[str] = None
+        self.subscribers: Dict[str, List[Callable[[InvalidationEvent], None]]] = {name: [] for name in collections}
+        self.caches: List[InvalidatingCache] = []
+        self.open_streams: set = set()
+        self.tasks: List[asyncio.Task] = []
+        self.events: Dict[str, int] = {name: 0 for name in collections}
+        self.resyncs = 0
+        self.handler_errors = 0
+        self.last_event_at: Optional[float] = None
+
+    @property
+    def live(self) -> bool:
+        """Every change stream is open, so subscribers hear about every change"""
+        return self.mode == CHANGE_STREAMS and len(self.open_streams) == len(self.collections)
+
+    def subscribe(self, collection: str, handler: Callable[[InvalidationEvent], None]):
+        self.subscribers[collection].append(handler)
+
+    def cache(self, name: str, maxsize: int, ttl: float, require_live: bool = False) -> InvalidatingCache:
+        """An InvalidatingCache subscribed to every watched collection"""
+        cache = InvalidatingCache(self, name, maxsize, ttl, require_live)
+        for collection in self.collections:
+            self.subscribe(collection, cache.handle)
+        self.caches.append(cache)
+        return cache
+
+    def publish(self, event: InvalidationEvent):
+        self.events[event.collection] = self.events.get(event.collection, 0) + 1
+        self.last_event_at = time.time()
+        if event.operation == RESYNC:
+            self.resyncs += 1
+        for handler in self.subscribers.get(event.collection, []):
+            try:
+                handler(event)
+            except Exception as e:
+                self.handler_errors += 1
+                logger.error(f"Invalidation handler failed for {event}: {e}")
+
+    def fall_back(self, reason: str):
+        self.mode = TTL_ONLY
+        self.fallback_reason = reason
+        self.open_streams.clear()
+        logger.warning(f"Cache invalidation bus in TTL-only mode: {reason}")
+
+    async def start(self):
+        if not self.enabled:
+            self.fall_back("disabled (INVALIDATION_BUS_ENABLED=false)")
+            return
+        try:
+            hello = await self.db.client.admin.command("hello")
+        except Exception as e:
+            self.fall_back(f"cannot inspect deployment: {e}")
+            return
+        if not hello.get("setName") and hello.get("msg") != "isdbgrid":
+            self.fall_back("standalone server, change streams need a replica set")
+            return
+
+        if self.pre_images:
+            await self.enable_pre_images()
+        self.mode = CHANGE_STREAMS
+        self.tasks = [asyncio.create_task(self.watch(collection)) for collection in self.collections]
+
+    async def enable_pre_images(self):
+        """Best effort: delete events then carry the key fields (MongoDB 6.0+)"""
+        for collection in self.collections:
+            try:
+                await self.db.command("collMod", collection, changeStreamPreAndPostImages={"enabled": True})
+            except Exception as e:
+                logger.warning(f"Pre-images unavailable for {collection}: {e}")
+                self.pre_images = False
+                return
+
+    async def watch(self, collection: str):
+        key_fields = self.collections[collection]
+        pipeline = change_stream_pipeline(key_fields, self.ignored_updates.get(collection, []))
+        resume_token = None
+        delay = self.retry_delay
+        while True:
+            try:
+                async with self.db[collection].watch(
+                    pipeline,
+                    full_document="updateLookup" if key_fields else None,
+                    full_document_before_change="whenAvailable" if self.pre_images and key_fields else None,
+                    resume_after=resume_token
+                ) as stream:
+                    if resume_token is None and self.events[collection]:
+                        # Reopened from scratch: whatever happened in between is unknown
+                        self.publish(InvalidationEvent(collection, RESYNC))
+                    self.open_streams.add(collection)
+                    delay = self.retry_delay
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        if "documentKey" not in change:
+                            # drop / rename / invalidate: the stream ends after this
+                            if change["operationType"] == "invalidate":
+                                resume_token = None
+                            self.publish(InvalidationEvent(collection, RESYNC))
+                            continue
+                        self.publish(event_from_change(collection, change, key_fields))
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in _UNSUPPORTED_CODES:
+                    self.fall_back(f"change streams unsupported: {e}")
+                    for task in self.tasks:
+                        if task is not asyncio.current_task():
+                            task.cancel()
+                    return
+                if e.code in _HISTORY_LOST_CODES:
+                    resume_token = None
+                logger.warning(f"Change stream on {collection} failed: {e}; retrying in {delay:.0f}s")
+            except Exception as e:
+                logger.warning(f"Change stream on {collection} failed: {e}; retrying in {delay:.0f}s")
+            finally:
+                self.open_streams.discard(collection)
+
+            # Entries cached while the stream was down may be stale
+            self.publish(InvalidationEvent(collection, RESYNC))
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.open_streams.clear()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "live": self.live,
+            "fallback_reason": self.fallback_reason,
+            "pre_images": self.pre_images,
+            "open_streams": sorted(self.open_streams),
+            "events": dict(self.events),
+            "resyncs": self.resyncs,
+            "handler_errors": self.handler_errors,
+            "last_event_at": self.last_event_at,
+            "caches": {cache.name: cache.stats() for cache in self.caches}
+        }
+
+
+def create_invalidation_bus(db) -> InvalidationBus:
+    """
+    Bus over stories, users and user_sessions. Story play-count updates are
+    filtered out server-side: caches that show play counts rely on their TTL.
+    """
+    return InvalidationBus(
+        db,
+        collections={
+            "stories": ["user_id"],
+            # Cache entries of users / sessions are tagged with the document _id,
+            # which every event carries: no lookups needed
+            "users": [],
+            "user_sessions": []
+        },
+        ignored_updates={"stories": ["play_count"]},
+        enabled=os.environ.get("INVALIDATION_BUS_ENABLED", "true").lower() == "true",
+        pre_images=os.environ.get("INVALIDATION_PRE_IMAGES", "false").lower() == "true",
+        max_retry_delay=float(os.environ.get("INVALIDATION_MAX_RETRY_DELAY", "60"))
+    )
@@ -0,0 +1,362 @@
+"""
+MASAL SEPETİ - Çoklu LLM sağlayıcı yönlendirici
+OpenAI, Gemini ve test için yerel stub; kayan gecikme / hata oranına göre seçim
+ve p95 gecikmesinden sonra ikinci (hedge) istek
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+from admission import AdmissionRejected
+from metrics import track_dependency
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailable(Exception):
+    """Every provider failed (or none is configured)"""
+
+
+class LLMProvider:
+    """
+    One text-generation backend; complete() returns the raw completion text.
+    SDK clients are built on first use (get_client) so importing this module
+    does not import the provider SDKs.
+    """
+
+    name = "base"
+
+    def __init__(self, model: str):
+        self.model = model
+        self.client = None
+
+    def create_client(self):
+        return None
+
+    def get_client(self):
+        if self.client is None:
+            self.client = self.create_client()
+        return self.client
+
+    async def complete(self, system: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        raise NotImplementedError
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(self, model: str, api_key: str):
+        super().__init__(model)
+        self.api_key = api_key
+
+    def create_client(self):
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=self.api_key)
+
+    async def complete(self, system: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        response = await self.get_client().chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return response.choices[0].message.content
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model: str, api_key: str):
+        super().__init__(model)
+        self.api_key = api_key
+
+    def create_client(self):
+        from google import genai
+
+        return genai.Client(api_key=self.api_key)
+
+    async def complete(self, system: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        from google.genai import types
+
+        response = await self.get_client().aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                system_instruction=system,
+                temperature=temperature,
+                max_output_tokens=max_tokens
+            )
+        )
+        if not response.text:
+            raise ValueError("Gemini returned an empty response")
+        return response.text
+
+
+class StubProvider(LLMProvider):
+    """Offline backend for tests and load runs: a fixed story after LLM_STUB_DELAY seconds"""
+
+    name = "stub"
+
+    def __init__(self, model: str = "stub", delay: float = 0.0):
+        super().__init__(model)
+        self.delay = delay
+
+    async def complete(self, system: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        theme = next((line[5:].strip() for line in prompt.splitlines() if line.startswith("Tema:")), "dostluk")
+        paragraph = (
+            f"Bir varmış bir yokmuş, uzak bir ormanda {theme} hakkında çok şey öğrenmek "
+            "isteyen küçük bir tavşan yaşarmış. Her sabah arkadaşlarıyla buluşur, "
+            "birlikte yeni şeyler keşfederlermiş."
+        )
+        return f"Başlık: {theme.capitalize()} Masalı\n\n" + "\n\n".join([paragraph] * 3) + \
+            "\n\nKazanım: Paylaşmak ve birlikte öğrenmek bizi mutlu eder."
+
+
+class ProviderStats:
+    """
+    Rolling window of (finished_at, latency, ok) samples for one provider.
+
+    Cancelled calls (lost hedges, abandoned requests) are censored: their true
+    latency is unknown, only that it exceeded the time they ran, so they are
+    counted but never enter the latency quantiles.
+    """
+
+    def __init__(self, window_seconds: float, max_samples: int = 200):
+        self.window_seconds = window_seconds
+        self.samples = deque(maxlen=max_samples)
+        self.requests = 0
+        self.failures = 0
+        self.censored = 0
+        self.hedges_won = 0
+
+    def record(self, latency: float, ok: bool):
+        self.samples.append((time.monotonic(), latency, ok))
+        self.requests += 1
+        if not ok:
+            self.failures += 1
+
+    def record_censored(self):
+        self.requests += 1
+        self.censored += 1
+
+    def recent(self) -> list:
+        horizon = time.monotonic() - self.window_seconds
+        while self.samples and self.samples[0][0] < horizon:
+            self.samples.popleft()
+        return list(self.samples)
+
+    def latency_quantile(self, q: float) -> Optional[float]:
+        latencies = sorted(latency for _, latency, ok in self.recent() if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def error_rate(self) -> float:
+        samples = self.recent()
+        if not samples:
+            return 0.0
+        return sum(1 for _, _, ok in samples if not ok) / len(samples)
+
+    def score(self) -> float:
+        """Lower is better: median latency inflated by the recent error rate"""
+        median = self.latency_quantile(0.5)
+        if median is None:
+            # No recent successes: untried providers get a chance, failing ones sink
+            return 0.0 if not self.recent() else float("inf")
+        return median * (1 + 10 * self.error_rate())
+
+
+class LLMRouter:
+    """
+    Routes each completion to the provider with the best rolling score and
+    fails over to the next one on error. With hedging on, a second request
+    goes to the runner-up (or the same provider if it is the only one) once
+    the primary has been pending for its p95 latency; the first successful
+    answer wins and the other request is cancelled.
+
+    With a limiter (admission.ConcurrencyLimiter), every provider call holds
+    its own slot, hedges included, and a hedge is only sent while a slot is
+    free. AdmissionRejected is raised as is, without failing over.
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        hedge: bool = False,
+        hedge_min_delay: float = 5.0,
+        window_seconds: float = 300.0,
+        limiter=None
+    ):
+        self.providers = providers
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.limiter = limiter
+        self.stats: Dict[str, ProviderStats] = {p.name: ProviderStats(window_seconds) for p in providers}
+        self.hedges_sent = 0
+
+    def warm_up(self):
+        """Build every provider's SDK client (blocking: imports the SDKs)"""
+        for provider in self.providers:
+            provider.get_client()
+
+    def ranked(self) -> List[LLMProvider]:
+        return sorted(self.providers, key=lambda p: self.stats[p.name].score())
+
+    def hedge_delay(self, provider: LLMProvider) -> float:
+        p95 = self.stats[provider.name].latency_quantile(0.95)
+        return max(self.hedge_min_delay, p95 or 0.0)
+
+    def slot(self):
+        return self.limiter.slot() if self.limiter is not None else nullcontext()
+
+    def can_hedge(self) -> bool:
+        """A hedge must not queue behind (or push out) primary requests"""
+        return self.limiter is None or not self.limiter.semaphore.locked()
+
+    async def call(self, provider: LLMProvider, system: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        # Time spent waiting for a slot is neither provider latency nor a failure
+        async with self.slot():
+            started = time.perf_counter()
+            try:
+                with track_dependency(provider.name, "completion"):
+                    text = await provider.complete(system, prompt, temperature, max_tokens)
+            except asyncio.CancelledError:
+                # Lost a hedge race: not a failure, and its latency is unknown
+                self.stats[provider.name].record_censored()
+                raise
+            except Exception:
+                self.stats[provider.name].record(time.perf_counter() - started, False)
+                raise
+            self.stats[provider.name].record(time.perf_counter() - started, True)
+            return text
+
+    async def complete(
+        self, system: str, prompt: str, temperature: float = 0.8, max_tokens: int = 2000
+    ) -> Tuple[str, str]:
+        """Returns (completion text, provider name)"""
+        if not self.providers:
+            raise LLMUnavailable("no LLM provider configured")
+
+        candidates = self.ranked()
+        tried = set()
+        last_error: Optional[Exception] = None
+        while candidates:
+            primary = candidates[0]
+            hedge_to = None
+            if self.hedge:
+                hedge_to = candidates[1] if len(candidates) > 1 else primary
+            try:
+                return await self.race(primary, hedge_to, tried, system, prompt, temperature, max_tokens)
+            except AdmissionRejected:
+                raise
+            except Exception as e:
+                logger.warning(f"LLM provider {primary.name} failed: {e}")
+                last_error = e
+            candidates = [p for p in candidates if p.name not in tried]
+        raise LLMUnavailable(str(last_error))
+
+    async def race(
+        self, primary: LLMProvider, hedge_to: Optional[LLMProvider], tried: set,
+        system: str, prompt: str, temperature: float, max_tokens: int
+    ) -> Tuple[str, str]:
+        args = (system, prompt, temperature, max_tokens)
+        tried.add(primary.name)
+        if hedge_to is None:
+            return await self.call(primary, *args), primary.name
+
+        first = asyncio.create_task(self.call(primary, *args))
+        owners = {first: primary}
+        pending = {first}
+        error: Optional[BaseException] = None
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay(primary))
+            if done:
+                return first.result(), primary.name
+            if not self.can_hedge():
+                return await first, primary.name
+
+            self.hedges_sent += 1
+            tried.add(hedge_to.name)
+            logger.info(f"LLM hedge: {primary.name} slow, also asking {hedge_to.name}")
+            second = asyncio.create_task(self.call(hedge_to, *args))
+            owners[second] = hedge_to
+            pending.add(second)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.stats[hedge_to.name].hedges_won += 1
+                        return task.result(), owners[task].name
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats_snapshot(self) -> dict:
+        providers = {}
+        for provider in self.providers:
+            stats = self.stats[provider.name]
+            p50 = stats.latency_quantile(0.5)
+            p95 = stats.latency_quantile(0.95)
+            providers[provider.name] = {
+                "model": provider.model,
+                "requests": stats.requests,
+                "failures": stats.failures,
+                "cancelled": stats.censored,
+                "recent_error_rate": round(stats.error_rate(), 4),
+                "p50_ms": round(p50 * 1000) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000) if p95 is not None else None,
+                "hedges_won": stats.hedges_won
+            }
+        return {
+            "order": [p.name for p in self.ranked()],
+            "hedge": self.hedge,
+            "hedges_sent": self.hedges_sent,
+            "providers": providers
+        }
+
+
+def create_llm_router(limiter=None) -> LLMRouter:
+    """
+    Build the router from LLM_PROVIDERS (comma separated: openai, gemini, stub).
+    Providers without credentials or without their client library are skipped.
+    limiter bounds concurrent provider calls (see LLMRouter).
+    """
+    providers: List[LLMProvider] = []
+    for name in os.environ.get("LLM_PROVIDERS", "openai").split(","):
+        name = name.strip().lower()
+        try:
+            if name == "openai" and os.environ.get("OPENAI_API_KEY"):
+                providers.append(OpenAIProvider(
+                    os.environ.get("OPENAI_MODEL", "gpt-4o"), os.environ["OPENAI_API_KEY"]
+                ))
+            elif name == "gemini" and (os.environ.get("GEMINI_API_KEY") or os.environ.get("GOOGLE_API_KEY")):
+                providers.append(GeminiProvider(
+                    os.environ.get("GEMINI_MODEL", "gemini-2.0-flash"),
+                    os.environ.get("GEMINI_API_KEY") or os.environ["GOOGLE_API_KEY"]
+                ))
+            elif name == "stub":
+                providers.append(StubProvider(delay=float(os.environ.get("LLM_STUB_DELAY", "0"))))
+        except ImportError as e:
+            logger.warning(f"LLM provider {name} unavailable: {e}")
+
+    return LLMRouter(
+        providers,
+        hedge=os.environ.get("LLM_HEDGE_ENABLED", "false").lower() == "true",
+        hedge_min_delay=float(os.environ.get("LLM_HEDGE_MIN_DELAY", "5")),
+        window_seconds=float(os.environ.get("LLM_ROUTER_WINDOW", "300")),
+        limiter=limiter
+    )
@@ -0,0 +1,253 @@
+"""
+MASAL SEPETİ - Metrikler
+Prometheus metin formatında sayaç / gösterge / histogram, rota şablonu bazlı
+istek metrikleri ve bağımlılık (Mongo, LLM, moderasyon, TTS) süreleri
+"""
+
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Tuple
+
+from pymongo import monitoring
+
+INF_LABEL = 'le="+Inf"'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    Base for labelled metrics. Values are keyed by the tuple of label values;
+    updates take a lock because pymongo listeners fire on driver threads.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values: Dict[tuple, object] = {}
+
+    def key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self.lock:
+            self.values[self.key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = self.key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self.lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self.values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, INF_LABEL)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "masal_http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status")
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "masal_http_requests_in_flight", "HTTP requests currently being served"
+))
+HTTP_RESPONSES = REGISTRY.register(Counter(
+    "masal_http_responses_total", "HTTP responses by status class", ("method", "route", "status_class")
+))
+MONGO_COMMAND_SECONDS = REGISTRY.register(Histogram(
+    "masal_mongo_command_duration_seconds", "MongoDB command latency by collection",
+    ("collection", "command", "outcome")
+))
+DEPENDENCY_SECONDS = REGISTRY.register(Histogram(
+    "masal_dependency_duration_seconds", "External call latency (LLM providers, moderation, TTS)",
+    ("dependency", "operation", "outcome")
+))
+MODERATION_VERDICTS = REGISTRY.register(Counter(
+    "masal_moderation_verdicts_total", "Moderation decisions", ("stage", "checker", "verdict")
+))
+AUDIO_BYTES = REGISTRY.register(Counter(
+    "masal_tts_audio_bytes_total", "Synthesized audio bytes served to generation", ("rendition", "source")
+))
+
+
+@contextmanager
+def track_dependency(dependency: str, operation: str):
+    """Time one external call into masal_dependency_duration_seconds"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    finally:
+        DEPENDENCY_SECONDS.observe(
+            time.perf_counter() - started, dependency=dependency, operation=operation, outcome=outcome
+        )
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every driver command per collection (pass via event_listeners=)"""
+
+    def __init__(self):
+        self.pending: Dict[int, Tuple[str, str]] = {}
+
+    def started(self, event):
+        value = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            value = event.command.get("collection")
+        collection = value if isinstance(value, str) else "-"
+        self.pending[event.request_id] = (collection, event.command_name)
+
+    def record(self, event, outcome: str):
+        collection, command = self.pending.pop(event.request_id, ("-", event.command_name))
+        MONGO_COMMAND_SECONDS.observe(
+            event.duration_micros / 1_000_000, collection=collection, command=command, outcome=outcome
+        )
+
+    def succeeded(self, event):
+        self.record(event, "ok")
+
+    def failed(self, event):
+        self.record(event, "error")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware: latency histogram, status counts and in-flight gauge.
+    The route label is the matched route template (/api/masal/{slug}), never
+    the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route_label = getattr(route, "path_format", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, method=scope["method"], route=route_label, status=status
+            )
+            HTTP_RESPONSES.inc(method=scope["method"], route=route_label, status_class=f"{status // 100}xx")
@@ -0,0 +1,93 @@
+"""
+MASAL SEPETİ - Yerel içerik denetimi
+Türkçe uygunsuz kelime listesi ve metin normalizasyonu. Saf Python modülüdür;
+süreç havuzu işçileri yalnızca bu modülü içe aktarır.
+"""
+
+import re
+import threading
+
+# Turkish bad words list (common profanity and inappropriate terms)
+TURKISH_BAD_WORDS = [
+    # Küfürler
+    "amk", "aq", "amına", "amını", "orospu", "oç", "piç", "sikik", "siktir", 
+    "yarrak", "yarak", "göt", "götün", "taşak", "taşşak", "meme", "kaltak",
+    "fahişe", "pezevenk", "ibne", "götveren", "puşt", "kahpe", "şerefsiz",
+    "dangalak", "gerizekalı", "salak", "aptal", "mal", "hıyar", "dalyarak",
+    # Şiddet içeren
+    "öldür", "gebertir", "boğazını", "kafasını kes", "parçala",
+    # Cinsel içerik
+    "seks", "porno", "erotik", "çıplak",
+    # Irkçılık / nefret
+    "gavur", "zenci", "çingene",
+    # Diğer uygunsuz
+    "bok", "boktan", "pislik", "lanet", "cehennem",
+]
+
+_profanity = None
+_profanity_lock = threading.Lock()
+
+
+def get_profanity():
+    """
+    The profanity filter with English + custom Turkish words, loaded on first
+    use (importing better_profanity and building its word list is slow)
+    """
+    global _profanity
+    if _profanity is None:
+        with _profanity_lock:
+            if _profanity is None:
+                from better_profanity import profanity
+                
+                profanity.load_censor_words()
+                profanity.add_censor_words(TURKISH_BAD_WORDS)
+                _profanity = profanity
+    return _profanity
+
+def normalize_text(text: str) -> str:
+    """Normalize text for better matching (handle Turkish chars, numbers as letters)"""
+    if not text:
+        return ""
+    
+    text = text.lower()
+    
+    # Common letter substitutions used to bypass filters
+    substitutions = {
+        '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', 
+        '7': 't', '8': 'b', '@': 'a', '$': 's', '!': 'i',
+        'ı': 'i', 'ğ': 'g', 'ü': 'u', 'ş': 's', 'ö': 'o', 'ç': 'c'
+    }
+    
+    for old, new in substitutions.items():
+        text = text.replace(old, new)
+    
+    # Remove special characters but keep spaces
+    text = re.sub(r'[^a-z0-9\s]', '', text)
+    
+    return text
+
+def contains_bad_content(text: str) -> tuple[bool, str]:
+    """Check if text contains inappropriate content. Returns (is_bad, reason)"""
+    if not text:
+        return False, ""
+    
+    # Normalize text
+    normalized = normalize_text(text)
+    original_lower = text.lower()
+    
+    # Check with profanity library
+    profanity = get_profanity()
+    if profanity.contains_profanity(text) or profanity.contains_profanity(normalized):
+        return True, "Uygunsuz kelime tespit edildi"
+    
+    # Check Turkish bad words directly (handles spacing tricks like "a m k")
+    for bad_word in TURKISH_BAD_WORDS:
+        # Check normal
+        if bad_word in original_lower or bad_word in normalized:
+            return True, f"Uygunsuz içerik tespit edildi"
+        
+        # Check with spaces removed
+        if bad_word in original_lower.replace(" ", "") or bad_word in normalized.replace(" ", ""):
+            return True, f"Uygunsuz içerik tespit edildi"
+    
+    return False, ""
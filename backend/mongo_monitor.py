@@ -0,0 +1,202 @@
+"""
+MASAL SEPETİ - Mongo komut izleme
+Komut başına süre, namespace ve filtre şekli; HTTP isteği başına komut sayısı,
+yavaş sorgu ve N+1 tespiti
+"""
+
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Commands whose filter lives under a different key
+_FILTER_KEYS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query",
+}
+# Driver housekeeping that says nothing about application queries
+_IGNORED_COMMANDS = {"hello", "isMaster", "ismaster", "ping", "endSessions", "saslStart", "saslContinue", "buildInfo"}
+
+
+def shape_of(value):
+    """Replace literal values with 1, keeping field names and operators"""
+    if isinstance(value, dict):
+        return {key: shape_of(item) for key, item in value.items()}
+    if isinstance(value, list) and value and all(isinstance(item, dict) for item in value):
+        # $and / $or clauses
+        return [shape_of(item) for item in value]
+    return 1
+
+
+def command_filter(command_name: str, command: dict) -> Optional[dict]:
+    if command_name in _FILTER_KEYS:
+        return command.get(_FILTER_KEYS[command_name])
+    if command_name == "update":
+        return (command.get("updates") or [{}])[0].get("q")
+    if command_name == "delete":
+        return (command.get("deletes") or [{}])[0].get("q")
+    if command_name == "aggregate":
+        for stage in command.get("pipeline", []):
+            if "$match" in stage:
+                return stage["$match"]
+        return None
+    return None
+
+
+def command_collection(command_name: str, command: dict) -> str:
+    if command_name == "getMore":
+        return command.get("collection", "-")
+    value = command.get(command_name)
+    return value if isinstance(value, str) else "-"
+
+
+class RequestCommandStats:
+    """Commands issued while serving one HTTP request"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.commands = 0
+        self.total_ms = 0.0
+        self.shapes: Dict[str, int] = {}
+
+    def record(self, shape_key: str, milliseconds: float):
+        with self.lock:
+            self.commands += 1
+            self.total_ms += milliseconds
+            self.shapes[shape_key] = self.shapes.get(shape_key, 0) + 1
+
+
+# Set per HTTP request; Motor copies the context into its executor threads,
+# so the listener sees the request that issued each command.
+_current_request: ContextVar[Optional[RequestCommandStats]] = ContextVar("mongo_request_stats", default=None)
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """
+    Records duration, namespace and filter shape of every command. Shapes are
+    aggregated process-wide (bounded to max_shapes); commands slower than
+    slow_ms are logged and counted against their shape.
+    """
+
+    def __init__(self, slow_ms: float = 100, max_shapes: int = 1000):
+        self.slow_ms = slow_ms
+        self.max_shapes = max_shapes
+        self.lock = threading.Lock()
+        self.pending: Dict[int, tuple] = {}
+        self.shapes: Dict[str, dict] = {}
+
+    def started(self, event):
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+        collection = command_collection(event.command_name, event.command)
+        query = command_filter(event.command_name, event.command)
+        shape = json.dumps(shape_of(query), sort_keys=True) if query is not None else ""
+        shape_key = f"{event.database_name}.{collection} {event.command_name} {shape}".rstrip()
+        with self.lock:
+            self.pending[event.request_id] = (shape_key, f"{event.database_name}.{collection}", event.command_name, shape)
+
+    def finished(self, event, failed: bool):
+        with self.lock:
+            pending = self.pending.pop(event.request_id, None)
+        if pending is None:
+            return
+        shape_key, namespace, command_name, shape = pending
+        milliseconds = event.duration_micros / 1000
+
+        request_stats = _current_request.get()
+        if request_stats is not None:
+            request_stats.record(shape_key, milliseconds)
+
+        slow = milliseconds >= self.slow_ms
+        if slow:
+            logger.warning(f"Slow Mongo command ({milliseconds:.0f} ms): {shape_key}")
+
+        with self.lock:
+            entry = self.shapes.get(shape_key)
+            if entry is None:
+                if len(self.shapes) >= self.max_shapes:
+                    return
+                entry = self.shapes[shape_key] = {
+                    "namespace": namespace,
+                    "command": command_name,
+                    "filter_shape": shape,
+                    "count": 0,
+                    "failed": 0,
+                    "slow_count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0
+                }
+            entry["count"] += 1
+            entry["total_ms"] += milliseconds
+            entry["max_ms"] = max(entry["max_ms"], milliseconds)
+            if failed:
+                entry["failed"] += 1
+            if slow:
+                entry["slow_count"] += 1
+                entry["last_slow_at"] = time.time()
+
+    def succeeded(self, event):
+        self.finished(event, False)
+
+    def failed(self, event):
+        self.finished(event, True)
+
+    def top_slow_shapes(self, limit: int = 20) -> list:
+        """Shapes with at least one slow execution, by total time spent"""
+        with self.lock:
+            entries = [dict(entry) for entry in self.shapes.values() if entry["slow_count"]]
+        entries.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        for entry in entries[:limit]:
+            entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 2)
+            entry["total_ms"] = round(entry["total_ms"], 2)
+            entry["max_ms"] = round(entry["max_ms"], 2)
+        return entries[:limit]
+
+
+class MongoRequestBudgetMiddleware:
+    """
+    Pure ASGI middleware: counts Mongo commands per HTTP request and logs
+    requests over the round-trip or latency budget, and requests that repeat
+    one query shape n_plus_one times or more (an N+1 pattern).
+    """
+
+    def __init__(self, app, max_commands: int = 20, max_mongo_ms: float = 500, n_plus_one: int = 5):
+        self.app = app
+        self.max_commands = max_commands
+        self.max_mongo_ms = max_mongo_ms
+        self.n_plus_one = n_plus_one
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestCommandStats()
+        token = _current_request.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_request.reset(token)
+            self.check_budget(scope, stats)
+
+    def check_budget(self, scope, stats: RequestCommandStats):
+        repeated = {shape: count for shape, count in stats.shapes.items() if count >= self.n_plus_one}
+        if stats.commands <= self.max_commands and stats.total_ms <= self.max_mongo_ms and not repeated:
+            return
+        route = getattr(scope.get("route"), "path_format", scope["path"])
+        logger.warning(json.dumps({
+            "event": "mongo_request_budget",
+            "method": scope["method"],
+            "route": route,
+            "commands": stats.commands,
+            "mongo_ms": round(stats.total_ms, 1),
+            "repeated_shapes": repeated
+        }))
@@ -1,13 +1,16 @@
 from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, Request, Response, Depends
-from fastapi.responses import StreamingResponse, JSONResponse
+from fastapi.responses import StreamingResponse, JSONResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 import re
 import unicodedata
 import base64
+import json
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
@@ -16,36 +19,112 @@ from datetime import datetime, timezone, timedelta
 import httpx
 import hashlib
 import secrets
-from better_profanity import profanity
+import bcrypt
+import asyncio
+import time
+import math
+import weakref
+from zoneinfo import ZoneInfo
+from cachetools import TTLCache
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# OpenAI for text generation
-from openai import AsyncOpenAI
-
-# Google Cloud TTS for Turkish voice
-from google.cloud import texttospeech
+# Heavy SDKs (openai, google.cloud.texttospeech + grpc, better_profanity) are
+# imported on first use and warmed in the background after startup, so the
+# process answers /api/health without waiting for them
 
 # Topics database
 from topics_database import (
     TOPICS_DATABASE, 
-    get_all_topics, 
+    KAZANIM_CATEGORIES,
+    turkish_fold,
     get_topic_detail, 
-    get_subtopics,
     get_subtopic_by_id,
     search_by_kazanim,
-    get_all_subtopics_flat
+    TOPICS_JSON,
+    TOPIC_DETAIL_JSON,
+    TOPIC_SUBTOPICS_JSON,
+    SUBTOPICS_FLAT_JSON
+)
+
+# Local content moderation (pure functions, safe for the process pool)
+from moderation import TURKISH_BAD_WORDS, normalize_text, contains_bad_content, get_profanity
+
+# Shared executors for blocking / CPU-heavy work
+from executors import run_blocking, executor_stats, shutdown_executors
+
+# Admission control for generation endpoints
+from admission import AdmissionController, AdmissionRejected
+
+# Story generation across LLM providers (OpenAI, Gemini, stub)
+from llm_router import create_llm_router, LLMUnavailable
+
+# HTTP conditional caching for read endpoints
+from http_cache import ConditionalCacheMiddleware, RangeNotSatisfiable, compute_etag, etag_matches, parse_byte_range
+
+# Prometheus-style metrics
+from metrics import (
+    REGISTRY,
+    MetricsMiddleware,
+    MongoCommandMetrics,
+    MODERATION_VERDICTS,
+    AUDIO_BYTES,
+    track_dependency
 )
 
+# Per-stage Server-Timing for slow endpoints
+from server_timing import ServerTimingMiddleware, span
+
+# Mongo command monitoring: slow query shapes and per-request round trips
+from mongo_monitor import CommandMonitor, MongoRequestBudgetMiddleware
+
+# TTS audio cache
+from audio_cache import create_audio_cache, audio_cache_key
+
+# Change-stream invalidation of in-process caches across workers
+from invalidation import create_invalidation_bus, InvalidationEvent
+
+# Circuit breaker around the TTS provider
+from circuit_breaker import CLOSED, CircuitBreaker, CircuitOpen
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+mongo_monitor = CommandMonitor(slow_ms=float(os.environ.get("MONGO_SLOW_MS", "100")))
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandMetrics(), mongo_monitor])
 db = client[os.environ['DB_NAME']]
 
-# Create the main app
-app = FastAPI()
+# Create the main app (validated responses are rendered with orjson)
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Rate limits and LLM/TTS concurrency caps (ADMISSION_BACKEND=memory|mongo)
+admission = AdmissionController(db)
+
+# Tails stories / users / user_sessions change streams (TTL-only without a replica set)
+invalidation_bus = create_invalidation_bus(db)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    logger.warning(f"Admission rejected ({exc.reason}) for {request.url.path}")
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Şu anda çok fazla masal isteği var. Lütfen biraz sonra tekrar deneyin."},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+# Set when the process starts shutting down; background loops stop at their next wait
+shutdown_event = asyncio.Event()
+
+
+async def wait_for_shutdown(seconds: float) -> bool:
+    """Sleep up to seconds; True as soon as shutdown has started"""
+    try:
+        await asyncio.wait_for(shutdown_event.wait(), seconds)
+        return True
+    except asyncio.TimeoutError:
+        return False
 
 # Create a router with /api prefix
 api_router = APIRouter(prefix="/api")
@@ -59,85 +138,22 @@ logger = logging.getLogger(__name__)
 
 # ============= CONTENT MODERATION =============
 
-# Turkish bad words list (common profanity and inappropriate terms)
-TURKISH_BAD_WORDS = [
-    # Küfürler
-    "amk", "aq", "amına", "amını", "orospu", "oç", "piç", "sikik", "siktir", 
-    "yarrak", "yarak", "göt", "götün", "taşak", "taşşak", "meme", "kaltak",
-    "fahişe", "pezevenk", "ibne", "götveren", "puşt", "kahpe", "şerefsiz",
-    "dangalak", "gerizekalı", "salak", "aptal", "mal", "hıyar", "dalyarak",
-    # Şiddet içeren
-    "öldür", "gebertir", "boğazını", "kafasını kes", "parçala",
-    # Cinsel içerik
-    "seks", "porno", "erotik", "çıplak",
-    # Irkçılık / nefret
-    "gavur", "zenci", "çingene",
-    # Diğer uygunsuz
-    "bok", "boktan", "pislik", "lanet", "cehennem",
-]
-
-# Initialize profanity filter with English + custom Turkish words
-profanity.load_censor_words()
-profanity.add_censor_words(TURKISH_BAD_WORDS)
-
-def normalize_text(text: str) -> str:
-    """Normalize text for better matching (handle Turkish chars, numbers as letters)"""
-    if not text:
-        return ""
-    
-    text = text.lower()
-    
-    # Common letter substitutions used to bypass filters
-    substitutions = {
-        '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', 
-        '7': 't', '8': 'b', '@': 'a', '$': 's', '!': 'i',
-        'ı': 'i', 'ğ': 'g', 'ü': 'u', 'ş': 's', 'ö': 'o', 'ç': 'c'
-    }
-    
-    for old, new in substitutions.items():
-        text = text.replace(old, new)
-    
-    # Remove special characters but keep spaces
-    text = re.sub(r'[^a-z0-9\s]', '', text)
-    
-    return text
-
-def contains_bad_content(text: str) -> tuple[bool, str]:
-    """Check if text contains inappropriate content. Returns (is_bad, reason)"""
-    if not text:
-        return False, ""
-    
-    # Normalize text
-    normalized = normalize_text(text)
-    original_lower = text.lower()
-    
-    # Check with profanity library
-    if profanity.contains_profanity(text) or profanity.contains_profanity(normalized):
-        return True, "Uygunsuz kelime tespit edildi"
-    
-    # Check Turkish bad words directly (handles spacing tricks like "a m k")
-    for bad_word in TURKISH_BAD_WORDS:
-        # Check normal
-        if bad_word in original_lower or bad_word in normalized:
-            return True, f"Uygunsuz içerik tespit edildi"
-        
-        # Check with spaces removed
-        if bad_word in original_lower.replace(" ", "") or bad_word in normalized.replace(" ", ""):
-            return True, f"Uygunsuz içerik tespit edildi"
-    
-    return False, ""
-
 async def check_content_with_openai(text: str) -> tuple[bool, str]:
     """Use OpenAI Moderation API to check content (free API)"""
     openai_key = os.environ.get('OPENAI_API_KEY')
     if not openai_key:
+        MODERATION_VERDICTS.inc(stage="input", checker="openai", verdict="skipped")
         return False, ""  # Skip if no API key
     
     try:
+        from openai import AsyncOpenAI
+        
         client = AsyncOpenAI(api_key=openai_key)
-        response = await client.moderations.create(input=text)
+        with track_dependency("openai", "moderation"):
+            response = await client.moderations.create(input=text)
         
         result = response.results[0]
+        MODERATION_VERDICTS.inc(stage="input", checker="openai", verdict="blocked" if result.flagged else "allowed")
         
         if result.flagged:
             # Get the categories that were flagged
@@ -161,6 +177,7 @@ async def check_content_with_openai(text: str) -> tuple[bool, str]:
     
     except Exception as e:
         logger.error(f"OpenAI moderation error: {e}")
+        MODERATION_VERDICTS.inc(stage="input", checker="openai", verdict="error")
         return False, ""  # Don't block on API errors
 
 async def validate_story_request(
@@ -184,14 +201,18 @@ async def validate_story_request(
     # First pass: Local Turkish filter (fast)
     for field_value, field_name in fields_to_check:
         if field_value:
-            is_bad, reason = contains_bad_content(field_value)
+            with span("moderation_local"), track_dependency("moderation", "local_input"):
+                is_bad, reason = contains_bad_content(field_value)
             if is_bad:
+                MODERATION_VERDICTS.inc(stage="input", checker="local", verdict="blocked")
                 logger.warning(f"Bad content detected in {field_name}: {field_value[:50]}...")
                 return False, f"{field_name} alanında uygunsuz içerik tespit edildi. Lütfen uygun bir içerik girin."
+    MODERATION_VERDICTS.inc(stage="input", checker="local", verdict="allowed")
     
     # Second pass: OpenAI Moderation API (comprehensive)
     all_text = " ".join(filter(None, [topic_name, subtopic_name, theme, character, kazanim]))
-    is_flagged, openai_reason = await check_content_with_openai(all_text)
+    with span("moderation_openai"):
+        is_flagged, openai_reason = await check_content_with_openai(all_text)
     
     if is_flagged:
         logger.warning(f"OpenAI flagged content: {all_text[:100]}...")
@@ -245,7 +266,7 @@ class StoryResponse(BaseModel):
     theme: Optional[str] = None  # Made optional for legacy stories
     age_group: Optional[str] = None  # Made optional for legacy stories
     character: Optional[str] = None
-    audio_base64: Optional[str] = None
+    audio_pending: bool = False  # no audio yet; audio itself is served by /stories/{id}/audio
     duration: Optional[int] = None
     play_count: int = 0
     created_at: Optional[str] = None
@@ -254,6 +275,32 @@ class StoryResponse(BaseModel):
     creator_id: Optional[str] = None
     creator_picture: Optional[str] = None
 
+# Stories are validated by the Story model when they are written, so read
+# endpoints send the Mongo documents straight to orjson instead of
+# re-validating them through response_model on every request: the projection
+# limits them to the StoryResponse fields and missing optional fields get the
+# model defaults, which is all that validation did for these documents.
+# Legacy documents without a required field still go through validation.
+STORY_RESPONSE_FIELDS = list(StoryResponse.model_fields)
+STORY_RESPONSE_REQUIRED = [name for name, field in StoryResponse.model_fields.items() if field.is_required()]
+STORY_RESPONSE_DEFAULTS = {
+    name: field.get_default() for name, field in StoryResponse.model_fields.items() if not field.is_required()
+}
+# Field order of the model; required fields are always present on this path
+STORY_RESPONSE_SLOTS = {name: STORY_RESPONSE_DEFAULTS.get(name) for name in STORY_RESPONSE_FIELDS}
+STORY_RESPONSE_PROJECTION = {"_id": 0, **{name: 1 for name in STORY_RESPONSE_FIELDS}}
+
+def story_payload(story: dict) -> dict:
+    """StoryResponse-shaped dict of a trusted story document"""
+    if not all(map(story.get, STORY_RESPONSE_REQUIRED)):
+        # Missing, null or empty required field: validate, as response_model did
+        return StoryResponse.model_validate(story).model_dump()
+    return {name: story.get(name, default) for name, default in STORY_RESPONSE_SLOTS.items()}
+
+def story_list_response(stories: list, next_cursor: Optional[str] = None) -> ORJSONResponse:
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return ORJSONResponse([story_payload(story) for story in stories], headers=headers)
+
 class TopicInfo(BaseModel):
     id: str
     name: str
@@ -322,26 +369,34 @@ class CreditRequestCreate(BaseModel):
     requested_credits: int = 10
     message: Optional[str] = None
 
+class FavoriteCheckRequest(BaseModel):
+    story_ids: List[str]
+
 class AdminLogin(BaseModel):
     username: str
     password: str
 
 # ============= PASSWORD HELPERS =============
 
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+
 def hash_password(password: str) -> str:
-    """Hash password with salt"""
-    salt = secrets.token_hex(16)
-    hashed = hashlib.sha256(f"{password}{salt}".encode()).hexdigest()
-    return f"{salt}:{hashed}"
+    """Hash password with bcrypt (blocking - run via run_blocking("password", ...))"""
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
 
 def verify_password(password: str, stored_hash: str) -> bool:
-    """Verify password against stored hash"""
+    """Verify password against a bcrypt hash or a legacy "salt:sha256" hash"""
     try:
+        if stored_hash.startswith("$2"):
+            return bcrypt.checkpw(password.encode(), stored_hash.encode())
         salt, hashed = stored_hash.split(":")
         return hashlib.sha256(f"{password}{salt}".encode()).hexdigest() == hashed
     except:
         return False
 
+def is_legacy_password_hash(stored_hash: str) -> bool:
+    return not stored_hash.startswith("$2")
+
 # ============= SLUG HELPERS =============
 
 # Turkish character mapping
@@ -412,8 +467,315 @@ async def ensure_unique_slug(base_slug: str, story_id: str = None) -> str:
             slug = f"{base_slug}-{secrets.token_hex(4)}"
             return slug
 
+# ============= CREATOR SNAPSHOT =============
+
+# Creator name/picture are copied onto each story at write time so story reads
+# need a single query. Profile changes fan out to the stories in the background.
+CREATOR_FIELDS = {"_id": 0, "user_id": 1, "name": 1, "surname": 1, "picture": 1}
+# Snapshot of a creator whose account no longer exists: resolved, nothing to look up
+CREATOR_TOMBSTONE = {"creator_name": None, "creator_id": None, "creator_picture": None, "creator_deleted": True}
+
+def creator_snapshot(user: dict) -> dict:
+    """Denormalized creator fields stored on a story"""
+    return {
+        "creator_name": f"{user.get('name', '')} {user.get('surname', '')}".strip(),
+        "creator_id": user["user_id"],
+        "creator_picture": user.get("picture")
+    }
+
+async def enrich_creators(stories: list) -> list:
+    """Fill creator info for legacy stories saved before the snapshot existed"""
+    user_ids = list(set(
+        s["user_id"] for s in stories
+        if s.get("user_id") and "creator_name" not in s
+    ))
+    if not user_ids:
+        return stories
+    
+    users = await db.users.find(
+        {"user_id": {"$in": user_ids}}, 
+        CREATOR_FIELDS
+    ).to_list(len(user_ids))
+    user_map = {u["user_id"]: u for u in users}
+    
+    # Creators that no longer exist get a stored tombstone so these stories
+    # are never looked up again
+    deleted = [user_id for user_id in user_ids if user_id not in user_map]
+    if deleted:
+        await db.stories.update_many(
+            {"user_id": {"$in": deleted}, "creator_name": {"$exists": False}},
+            {"$set": CREATOR_TOMBSTONE}
+        )
+    
+    for story in stories:
+        if "creator_name" in story or not story.get("user_id"):
+            continue
+        if story["user_id"] in user_map:
+            story.update(creator_snapshot(user_map[story["user_id"]]))
+        else:
+            story.update(CREATOR_TOMBSTONE)
+    
+    return stories
+
+async def fan_out_creator_snapshot(user_id: str):
+    """Background job: push a user's current name/picture to all their stories"""
+    user = await db.users.find_one({"user_id": user_id}, CREATOR_FIELDS)
+    if not user:
+        await clear_creator_snapshot(user_id)
+        return
+    
+    result = await db.stories.update_many(
+        {"user_id": user_id},
+        {"$set": creator_snapshot(user)}
+    )
+    logger.info(f"Creator snapshot fan-out for {user_id}: {result.modified_count} stories updated")
+
+async def clear_creator_snapshot(user_id: str):
+    """Background job: replace a deleted user's snapshot with a tombstone on their stories"""
+    await db.stories.update_many(
+        {"user_id": user_id},
+        {"$set": CREATOR_TOMBSTONE}
+    )
+
+# ============= STATS COUNTERS =============
+
+# Dashboard numbers are maintained with $inc on every write instead of being
+# counted on each page load. A periodic reconciliation corrects any drift.
+STATS_COUNTERS_ID = "global"
+STATS_RECONCILE_INTERVAL = int(os.environ.get("STATS_RECONCILE_INTERVAL", "3600"))
+DAILY_STAT_FIELDS = ["stories_created", "plays", "signups", "credits_granted"]
+
+async def bump_stats(counters: Optional[dict] = None, daily: Optional[dict] = None):
+    """Increment global counters and today's pre-aggregated bucket"""
+    try:
+        if counters:
+            await db.counters.update_one(
+                {"_id": STATS_COUNTERS_ID},
+                {"$inc": counters},
+                upsert=True
+            )
+        if daily:
+            today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            await db.daily_stats.update_one(
+                {"_id": today},
+                {"$inc": daily},
+                upsert=True
+            )
+    except Exception as e:
+        # Stats must never fail a user request; reconciliation repairs counters
+        logger.error(f"Stats counter update failed: {e}")
+
+async def reconcile_counters() -> dict:
+    """Recompute counters from the source collections"""
+    counters = {
+        "users": await db.users.count_documents({"role": "user"}),
+        "stories": await db.stories.count_documents({}),
+        "pending_requests": await db.credit_requests.count_documents({"status": "pending"}),
+        "reconciled_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.counters.update_one(
+        {"_id": STATS_COUNTERS_ID},
+        {"$set": counters},
+        upsert=True
+    )
+    return counters
+
+async def run_counter_reconciliation():
+    """Background loop: reconcile counters every STATS_RECONCILE_INTERVAL seconds"""
+    while True:
+        try:
+            await reconcile_counters()
+        except Exception as e:
+            logger.error(f"Counter reconciliation failed: {e}")
+        if await wait_for_shutdown(STATS_RECONCILE_INTERVAL):
+            return
+
+# ============= CREATOR PROFILE STATS =============
+
+# Public profile aggregates (one pipeline per creator), cached in-process and
+# invalidated when the creator adds or deletes a story - here, or in another
+# worker via the invalidation bus. The TTL bounds the staleness of play counts.
+PROFILE_STATS_TTL = int(os.environ.get("PROFILE_STATS_TTL", "300"))
+PROFILE_STATS_CACHE = TTLCache(maxsize=2048, ttl=PROFILE_STATS_TTL)
+PROFILE_TOP_TOPICS = 3
+
+async def get_creator_stats(user_id: str) -> dict:
+    """Story count, total plays, total duration and top topics of a creator"""
+    cached = PROFILE_STATS_CACHE.get(user_id)
+    if cached is not None:
+        return cached
+    
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "totals": [
+                {"$group": {
+                    "_id": None,
+                    "story_count": {"$sum": 1},
+                    "total_plays": {"$sum": {"$ifNull": ["$play_count", 0]}},
+                    "total_duration": {"$sum": {"$ifNull": ["$duration", 0]}}
+                }}
+            ],
+            "top_topics": [
+                {"$match": {"topic_id": {"$ne": None}}},
+                {"$group": {
+                    "_id": "$topic_id",
+                    "topic_name": {"$first": "$topic_name"},
+                    "story_count": {"$sum": 1}
+                }},
+                {"$sort": {"story_count": -1, "_id": 1}},
+                {"$limit": PROFILE_TOP_TOPICS}
+            ]
+        }}
+    ]
+    result = await db.stories.aggregate(pipeline).to_list(1)
+    facets = result[0] if result else {"totals": [], "top_topics": []}
+    totals = facets["totals"][0] if facets["totals"] else {}
+    
+    stats = {
+        "story_count": totals.get("story_count", 0),
+        "total_plays": totals.get("total_plays", 0),
+        "total_duration": totals.get("total_duration", 0),
+        "top_topics": [
+            {"topic_id": t["_id"], "topic_name": t.get("topic_name"), "story_count": t["story_count"]}
+            for t in facets["top_topics"]
+        ]
+    }
+    PROFILE_STATS_CACHE[user_id] = stats
+    return stats
+
+def invalidate_creator_stats(user_id: str):
+    PROFILE_STATS_CACHE.pop(user_id, None)
+
+def on_story_changed(event: InvalidationEvent):
+    user_id = event.fields.get("user_id")
+    if user_id:
+        invalidate_creator_stats(user_id)
+    else:
+        # Delete without a pre-image, or a resync: the creator is unknown
+        PROFILE_STATS_CACHE.clear()
+
+invalidation_bus.subscribe("stories", on_story_changed)
+
+async def after_story_deleted(story_id: str, user_id: Optional[str]):
+    """Bookkeeping shared by every story deletion path"""
+    await bump_stats({"stories": -1})
+    await db.favorites.delete_many({"story_id": story_id})
+    await db.audio_renditions.delete_many({"story_id": story_id})
+    if user_id:
+        invalidate_creator_stats(user_id)
+
+# ============= PAGINATION HELPERS =============
+
+MAX_PAGE_SIZE = 100
+
+def encode_cursor(sort_value, doc_id: str) -> str:
+    """Opaque keyset cursor: base64url(JSON [sort_value, id])"""
+    raw = json.dumps([sort_value, doc_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a cursor created by encode_cursor - raises 400 if tampered"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+    
+    if not isinstance(doc_id, str) or not isinstance(sort_value, (str, int, float, type(None))):
+        raise HTTPException(status_code=400, detail="Geçersiz sayfa imleci")
+    
+    return sort_value, doc_id
+
+def keyset_query(query: dict, sort_field: str, sort_order: int, cursor: Optional[str], id_field: str = "id") -> dict:
+    """Restrict query to documents strictly after the cursor in (sort_field, id_field) order"""
+    if not cursor:
+        return query
+    
+    sort_value, doc_id = decode_cursor(cursor)
+    op = "$lt" if sort_order == -1 else "$gt"
+    after = {"$or": [
+        {sort_field: {op: sort_value}},
+        {sort_field: sort_value, id_field: {op: doc_id}}
+    ]}
+    return {"$and": [query, after]} if query else after
+
+async def fetch_page(
+    collection,
+    query: dict,
+    projection: dict,
+    sort_field: str,
+    sort_order: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    id_field: str = "id",
+    skip: int = 0
+) -> tuple[list, Optional[str]]:
+    """
+    Keyset pagination served by a compound (sort_field, id_field) index.
+    Returns (documents, next_cursor); next_cursor is None on the last page.
+    `skip` is only honoured without a cursor, for legacy clients.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    
+    find = collection.find(
+        keyset_query(query, sort_field, sort_order, cursor, id_field),
+        projection
+    ).sort([(sort_field, sort_order), (id_field, sort_order)])
+    
+    if skip and not cursor:
+        find = find.skip(skip)
+    
+    # Fetch one extra document to know whether there is a next page
+    docs = await find.limit(limit + 1).to_list(limit + 1)
+    
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last[id_field])
+    
+    return docs, next_cursor
+
 # ============= AUTH HELPERS =============
 
+# session_token -> (session, user), skipping two lookups per authenticated
+# request. Only used while the invalidation bus is live, so logouts, credit
+# changes and admin edits in any worker evict the entry within milliseconds.
+SESSION_CACHE_TTL = int(os.environ.get("SESSION_CACHE_TTL", "300"))
+session_cache = invalidation_bus.cache("sessions", maxsize=10000, ttl=SESSION_CACHE_TTL, require_live=True)
+
+def forget_user(user_id: str):
+    """Evict a user's cached sessions right away after writing to their document"""
+    session_cache.invalidate("users", "user_id", user_id)
+
+async def load_session(session_token: str) -> tuple[Optional[dict], Optional[dict]]:
+    """(session, user) for a token, from the session cache or Mongo"""
+    cached = session_cache.get(session_token)
+    if cached is not None:
+        session, user = cached
+        return session, dict(user)
+    
+    # Not cached if the session or user changes while they are being read
+    generation = session_cache.snapshot()
+    session = await db.user_sessions.find_one({"session_token": session_token})
+    if not session:
+        return None, None
+    
+    # Legacy favorites array is not needed - see db.favorites
+    user = await db.users.find_one({"user_id": session["user_id"]}, {"favorites": 0})
+    if not user:
+        return session, None
+    
+    session_id, user_object_id = session.pop("_id"), user.pop("_id")
+    session_cache.set(session_token, (session, user), [
+        ("user_sessions", "_id", session_id),
+        ("user_sessions", "session_token", session_token),
+        ("users", "_id", user_object_id),
+        ("users", "user_id", user["user_id"])
+    ], since=generation)
+    return session, dict(user)
+
 async def get_current_user(request: Request) -> Optional[dict]:
     """Get current user from session token"""
     # Try cookie first
@@ -428,11 +790,8 @@ async def get_current_user(request: Request) -> Optional[dict]:
     if not session_token:
         return None
     
-    # Find session
-    session = await db.user_sessions.find_one(
-        {"session_token": session_token},
-        {"_id": 0}
-    )
+    # Find session and its user
+    session, user = await load_session(session_token)
     
     if not session:
         return None
@@ -446,12 +805,6 @@ async def get_current_user(request: Request) -> Optional[dict]:
     if expires_at < datetime.now(timezone.utc):
         return None
     
-    # Get user
-    user = await db.users.find_one(
-        {"user_id": session["user_id"]},
-        {"_id": 0}
-    )
-    
     if user:
         # Check for monthly credit reset
         user = await check_monthly_credit_reset(user)
@@ -478,11 +831,36 @@ async def check_monthly_credit_reset(user: dict) -> dict:
                 }
             }
         )
+        forget_user(user["user_id"])
         user["credits"] = 10
         user["last_credit_reset"] = current_month
     
     return user
 
+# Reverse proxies in front of the app that append to X-Forwarded-For
+# (gunicorn.conf.py sets 1 for Railway's edge). 0 = use the socket peer.
+TRUSTED_PROXY_COUNT = int(os.environ.get("TRUSTED_PROXY_COUNT", "0"))
+
+def get_client_ip(request: Request) -> Optional[str]:
+    """Client IP as recorded by the outermost trusted proxy.
+    
+    Each proxy appends the address it received the request from, so the client
+    is the TRUSTED_PROXY_COUNT-th hop from the right; hops further left are
+    whatever the client sent and are ignored."""
+    peer = request.client.host if request.client else None
+    if TRUSTED_PROXY_COUNT <= 0:
+        return peer
+    
+    hops = [
+        hop.strip()
+        for header in request.headers.getlist("X-Forwarded-For")
+        for hop in header.split(",")
+        if hop.strip()
+    ]
+    if len(hops) < TRUSTED_PROXY_COUNT:
+        return peer
+    return hops[-TRUSTED_PROXY_COUNT]
+
 async def require_auth(request: Request) -> dict:
     """Require authentication - raises 401 if not authenticated"""
     user = await get_current_user(request)
@@ -506,13 +884,33 @@ async def health_check():
     try:
         # Check MongoDB connection
         await db.command("ping")
-        return {"status": "healthy", "database": "connected"}
+        return {
+            "status": "healthy",
+            "database": "connected",
+            "tts": tts_breaker.stats(),
+            "cache_invalidation": invalidation_bus.mode
+        }
     except Exception as e:
-        return {"status": "unhealthy", "database": str(e)}
+        return {"status": "unhealthy", "database": str(e), "tts": tts_breaker.stats()}
+
+
+@api_router.get("/metrics")
+async def get_metrics(request: Request):
+    """Prometheus text exposition of this worker's metrics (METRICS_TOKEN bearer if set)"""
+    metrics_token = os.environ.get("METRICS_TOKEN")
+    if metrics_token and request.headers.get("Authorization") != f"Bearer {metrics_token}":
+        raise HTTPException(status_code=401, detail="Yetkisiz")
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 
 # ============= AI HELPERS =============
 
+# LLM_PROVIDERS=openai,gemini,stub; LLM_HEDGE_ENABLED=true sends a second
+# request to the runner-up provider once the first exceeds its p95 latency.
+# Each provider call, hedges included, takes its own admission.llm slot.
+llm_router = create_llm_router(limiter=admission.llm)
+
+
 async def generate_story_with_ai(
     topic_name: str, 
     subtopic_name: Optional[str],
@@ -521,13 +919,10 @@ async def generate_story_with_ai(
     character: Optional[str] = None,
     kazanim: Optional[str] = None
 ) -> dict:
-    """Generate a fairy tale using OpenAI API"""
+    """Generate a fairy tale with the best-performing configured LLM provider"""
     
-    # Check for OpenAI API key
-    openai_key = os.environ.get('OPENAI_API_KEY')
-    
-    if not openai_key:
-        raise HTTPException(status_code=500, detail="OPENAI_API_KEY yapılandırılmamış")
+    if not llm_router.providers:
+        raise HTTPException(status_code=500, detail="LLM sağlayıcısı yapılandırılmamış (OPENAI_API_KEY / GEMINI_API_KEY)")
     
     # Create prompt for Turkish fairy tale
     character_text = f"Ana karakter: {character}" if character else "Ana karakteri sen belirle (çocuk dostu bir karakter)"
@@ -565,19 +960,11 @@ Yaş Grubu: {age_group}
 Bu bilgilere göre eğitici ve eğlenceli bir masal yaz."""
 
     try:
-        # Use direct OpenAI API
-        client = AsyncOpenAI(api_key=openai_key)
-        
-        response = await client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.8,
-            max_tokens=2000
+        # Routed by rolling latency / error rate, optionally hedged
+        result, provider = await llm_router.complete(
+            system_message, user_prompt, temperature=0.8, max_tokens=2000
         )
-        result = response.choices[0].message.content
+        logger.info(f"Story generated by {provider}")
         
         # Parse response to extract title and content
         lines = result.strip().split('\n')
@@ -592,13 +979,83 @@ Bu bilgilere göre eğitici ve eğlenceli bir masal yaz."""
         
         return {"title": title, "content": content}
         
+    except AdmissionRejected:
+        raise
+    except LLMUnavailable as e:
+        logger.error(f"All LLM providers failed: {e}")
+        raise HTTPException(status_code=503, detail="Masal servisi şu anda yanıt vermiyor. Lütfen biraz sonra tekrar deneyin.")
     except Exception as e:
         logger.error(f"AI story generation error: {e}")
         raise HTTPException(status_code=500, detail=f"Masal üretilirken hata oluştu: {str(e)}")
 
 
-async def generate_audio_for_story(text: str) -> tuple[str, int]:
-    """Generate TTS audio using Google Cloud TTS for natural Turkish speech"""
+# Voice settings - part of the TTS cache key
+TTS_VOICE_NAME = "tr-TR-Wavenet-E"  # Turkish female WaveNet voice (high quality)
+TTS_SPEAKING_RATE = 0.9  # Slightly slower for children
+TTS_PITCH = 1.0  # Normal pitch
+TTS_MAX_CHARS = 4500  # Google Cloud has 5000 byte limit
+
+# Audio renditions. "mp3" is the original audio_base64 on the story; the others
+# are synthesized at generation time (AUDIO_RENDITIONS_AT_GENERATION) or lazily
+# on first request and stored in db.audio_renditions.
+AUDIO_RENDITIONS = {
+    "mp3": {"encoding": "MP3", "speaking_rate": TTS_SPEAKING_RATE, "sample_rate_hertz": None, "media_type": "audio/mpeg"},
+    # Low-bitrate Opus at 16 kHz for slow mobile connections
+    "opus": {"encoding": "OGG_OPUS", "speaking_rate": TTS_SPEAKING_RATE, "sample_rate_hertz": 16000, "media_type": "audio/ogg"},
+    # Slower narration for the youngest age group
+    "slow": {"encoding": "MP3", "speaking_rate": 0.8, "sample_rate_hertz": None, "media_type": "audio/mpeg"},
+}
+YOUNGEST_AGE_GROUP = "4-5"
+AUDIO_RENDITIONS_AT_GENERATION = [
+    name.strip() for name in os.environ.get("AUDIO_RENDITIONS_AT_GENERATION", "").split(",")
+    if name.strip() in AUDIO_RENDITIONS and name.strip() != "mp3"
+]
+
+# Content-addressed cache of synthesized audio (TTS_CACHE_BACKEND=local|gridfs|off)
+audio_cache = create_audio_cache(db, ROOT_DIR / "tts_cache")
+
+# Circuit breaker: while open, TTS is skipped at once and stories are saved
+# without audio. Quota exhaustion opens it immediately; transient errors after
+# TTS_BREAKER_THRESHOLD consecutive failures. Probes back off exponentially.
+tts_breaker = CircuitBreaker(
+    "tts",
+    failure_threshold=int(os.environ.get("TTS_BREAKER_THRESHOLD", "3")),
+    base_backoff=float(os.environ.get("TTS_BREAKER_BACKOFF", "30")),
+    max_backoff=float(os.environ.get("TTS_BREAKER_MAX_BACKOFF", "3600"))
+)
+TTS_QUOTA_CODES = {"RESOURCE_EXHAUSTED"}
+TTS_TRANSIENT_CODES = {"UNAVAILABLE", "DEADLINE_EXCEEDED"}
+
+
+def tts_status_code(error: Exception) -> Optional[str]:
+    """gRPC status code name of a TTS error, if it carries one"""
+    from google.api_core import exceptions as google_exceptions
+    
+    if isinstance(error, google_exceptions.GoogleAPICallError) and error.grpc_status_code is not None:
+        return error.grpc_status_code.name
+    code = getattr(error, "code", None)
+    if callable(code):  # raw grpc.RpcError
+        try:
+            return code().name
+        except Exception:
+            return None
+    return None
+
+
+async def synthesize_speech(text_chunk: str, rendition: str = "mp3") -> bytes:
+    """Synthesize one text chunk with Google Cloud TTS in the given rendition (cached)"""
+    settings = AUDIO_RENDITIONS[rendition]
+    encoding_key = settings["encoding"]
+    if settings["sample_rate_hertz"]:
+        encoding_key = f"{encoding_key}@{settings['sample_rate_hertz']}"
+    
+    # Identical synthesis requests are served from the cache without touching the provider
+    cache_key = audio_cache_key(text_chunk, TTS_VOICE_NAME, settings["speaking_rate"], TTS_PITCH, encoding_key)
+    audio_content = await audio_cache.get(cache_key)
+    if audio_content is not None:
+        AUDIO_BYTES.inc(len(audio_content), rendition=rendition, source="cache")
+        logger.info(f"TTS cache hit ({rendition}): {len(audio_content)} bytes")
+        return audio_content
     
     # Check for Google Cloud credentials
     google_creds = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
@@ -608,10 +1065,21 @@ async def generate_audio_for_story(text: str) -> tuple[str, int]:
         raise HTTPException(status_code=500, detail="Google Cloud TTS credentials not configured")
     
     try:
+        tts_breaker.before_call()
+    except CircuitOpen as e:
+        logger.warning(f"TTS skipped, circuit open (retry in {e.retry_after:.0f}s)")
+        raise HTTPException(
+            status_code=503,
+            detail="Ses üretim servisi art arda gelen hatalar nedeniyle kısa bir süre için durduruldu. Masal metin olarak kaydedildi ancak ses eklenemedi. Lütfen birkaç dakika sonra tekrar deneyin.",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+        )
+    
+    try:
+        from google.cloud import texttospeech
+        
         # Initialize the Google Cloud TTS client
         if google_api_key:
             # Use API key authentication
-            from google.cloud import texttospeech_v1
             from google.api_core import client_options
             
             client = texttospeech.TextToSpeechClient(
@@ -623,55 +1091,524 @@ async def generate_audio_for_story(text: str) -> tuple[str, int]:
             # Use service account credentials
             client = texttospeech.TextToSpeechClient()
         
-        # Limit text for API (Google Cloud has 5000 byte limit)
-        text_chunk = text[:4500] if len(text) > 4500 else text
-        
         # Set the text input
         synthesis_input = texttospeech.SynthesisInput(text=text_chunk)
         
-        # Build the voice request - Turkish female Neural2 voice for children's stories
+        # Build the voice request - Turkish female voice for children's stories
         voice = texttospeech.VoiceSelectionParams(
             language_code="tr-TR",
-            name="tr-TR-Wavenet-E",  # Turkish female WaveNet voice (high quality)
+            name=TTS_VOICE_NAME,
             ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
         )
         
         # Select the audio file type and speaking rate
         audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.MP3,
-            speaking_rate=0.9,  # Slightly slower for children
-            pitch=1.0  # Normal pitch
+            audio_encoding=getattr(texttospeech.AudioEncoding, settings["encoding"]),
+            speaking_rate=settings["speaking_rate"],
+            pitch=TTS_PITCH,
+            sample_rate_hertz=settings["sample_rate_hertz"] or 0  # 0 = provider default
         )
         
-        # Perform the text-to-speech request
-        response = client.synthesize_speech(
-            input=synthesis_input,
-            voice=voice,
-            audio_config=audio_config
-        )
-        
-        # Convert to base64
-        audio_base64 = base64.b64encode(response.audio_content).decode()
+        # Perform the text-to-speech request (blocking gRPC call - TTS thread pool)
+        async with admission.tts.slot():
+            with track_dependency("tts", rendition):
+                response = await run_blocking(
+                    "tts",
+                    client.synthesize_speech,
+                    input=synthesis_input,
+                    voice=voice,
+                    audio_config=audio_config
+                )
+        tts_breaker.record_success()
+        AUDIO_BYTES.inc(len(response.audio_content), rendition=rendition, source="provider")
         
-        # Estimate duration (roughly 150 words per minute at 0.9x speed)
-        word_count = len(text.split())
-        duration = int((word_count / 135) * 60)  # in seconds, adjusted for slower rate
+        await audio_cache.put(cache_key, response.audio_content)
         
-        logger.info(f"Successfully generated audio: {len(response.audio_content)} bytes")
-        return audio_base64, duration
+        logger.info(f"Successfully generated audio ({rendition}): {len(response.audio_content)} bytes")
+        return response.audio_content
         
+    except AdmissionRejected as e:
+        # TTS saturated: same fallback as quota exhaustion (story saved without audio)
+        tts_breaker.record_ignored()
+        logger.warning(f"TTS admission rejected: {e.reason}")
+        raise HTTPException(
+            status_code=503,
+            detail="Ses üretim kapasitesi dolu. Masal metin olarak kaydedildi ancak ses eklenemedi. Lütfen daha sonra tekrar deneyin."
+        )
     except Exception as e:
         error_msg = str(e)
-        logger.error(f"Google Cloud TTS error: {error_msg}")
+        status_code = tts_status_code(e)
+        logger.error(f"Google Cloud TTS error ({status_code}): {error_msg}")
         
-        # Check for quota exceeded error
-        if "quota" in error_msg.lower() or "limit" in error_msg.lower() or "exceeded" in error_msg.lower():
+        if status_code in TTS_QUOTA_CODES:
+            tts_breaker.record_failure(status_code, trip=True)
             raise HTTPException(
                 status_code=503, 
                 detail="Ses üretim kotası doldu. Masal metin olarak kaydedildi ancak ses eklenemedi. Lütfen daha sonra tekrar deneyin."
             )
+        if status_code in TTS_TRANSIENT_CODES:
+            tts_breaker.record_failure(status_code)
+            raise HTTPException(
+                status_code=503,
+                detail="Ses üretim servisi geçici olarak kullanılamıyor. Masal metin olarak kaydedildi ancak ses eklenemedi. Lütfen daha sonra tekrar deneyin."
+            )
         
+        # Request-specific errors (bad input, credentials) say nothing about provider health
+        tts_breaker.record_ignored()
         raise HTTPException(status_code=500, detail=f"Ses üretilirken hata oluştu: {error_msg}")
+    except BaseException:
+        # Cancelled mid-call (client gone, hedging, shutdown): free a half-open probe slot
+        tts_breaker.record_ignored()
+        raise
+
+
+def tts_text_chunk(text: str) -> str:
+    # Limit text for API (Google Cloud has 5000 byte limit)
+    return text[:TTS_MAX_CHARS] if len(text) > TTS_MAX_CHARS else text
+
+
+async def generate_audio_for_story(text: str) -> tuple[str, int]:
+    """Generate TTS audio using Google Cloud TTS for natural Turkish speech"""
+    
+    audio_content = await synthesize_speech(tts_text_chunk(text), "mp3")
+    
+    # Convert to base64 (off the event loop - MP3s are hundreds of KB)
+    audio_base64 = (await run_blocking("encoding", base64.b64encode, audio_content)).decode()
+    
+    # Estimate duration (roughly 150 words per minute at 0.9x speed)
+    word_count = len(text.split())
+    duration = int((word_count / 135) * 60)  # in seconds, adjusted for slower rate
+    
+    return audio_base64, duration
+
+
+def rendition_available(story: dict, rendition: str) -> bool:
+    if rendition == "slow":
+        return story.get("age_group") == YOUNGEST_AGE_GROUP
+    return rendition in AUDIO_RENDITIONS
+
+
+# One synthesis per (story, rendition) in this process: concurrent first
+# requests wait for it instead of each calling TTS. Entries go away with the
+# last waiter.
+rendition_locks: "weakref.WeakValueDictionary[tuple, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+async def find_rendition(story_id: str, rendition: str) -> Optional[bytes]:
+    stored = await db.audio_renditions.find_one(
+        {"story_id": story_id, "rendition": rendition},
+        {"_id": 0, "audio": 1}
+    )
+    return bytes(stored["audio"]) if stored else None
+
+async def get_or_create_rendition(story: dict, rendition: str) -> bytes:
+    """Stored rendition bytes, synthesizing and storing them on first request"""
+    audio_content = await find_rendition(story["id"], rendition)
+    if audio_content is not None:
+        return audio_content
+    
+    lock = rendition_locks.setdefault((story["id"], rendition), asyncio.Lock())
+    async with lock:
+        # Whoever held the lock before us may have stored it already
+        audio_content = await find_rendition(story["id"], rendition)
+        if audio_content is not None:
+            return audio_content
+        
+        audio_content = await synthesize_speech(tts_text_chunk(story["content"]), rendition)
+        await db.audio_renditions.update_one(
+            {"story_id": story["id"], "rendition": rendition},
+            {"$setOnInsert": {
+                "audio": audio_content,
+                "bytes": len(audio_content),
+                "created_at": datetime.now(timezone.utc).isoformat()
+            }},
+            upsert=True
+        )
+    return audio_content
+
+
+async def create_renditions(story: dict, renditions: List[str]):
+    """Background job: produce the configured renditions right after generation"""
+    for rendition in renditions:
+        if not rendition_available(story, rendition):
+            continue
+        try:
+            await get_or_create_rendition(story, rendition)
+        except HTTPException as e:
+            logger.warning(f"Rendition {rendition} for {story['id']} failed: {e.detail}")
+            return
+
+
+def negotiate_rendition(accept: Optional[str]) -> str:
+    """Pick a rendition from the Accept header (Opus if the client prefers Ogg)"""
+    if not accept:
+        return "mp3"
+    preferences = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        preferences.append((-quality, position, media_type.strip().lower()))
+    for _, _, media_type in sorted(preferences):
+        if media_type in ("audio/ogg", "audio/opus"):
+            return "opus"
+        if media_type in ("audio/mpeg", "audio/mp3", "audio/*", "*/*"):
+            return "mp3"
+    return "mp3"
+
+
+async def produce_story(
+    topic_name: str,
+    subtopic_name: Optional[str],
+    theme: str,
+    age_group: str,
+    character: Optional[str] = None,
+    kazanim: Optional[str] = None
+) -> tuple[dict, Optional[str], Optional[int], Optional[str]]:
+    """
+    LLM generation, output moderation and TTS for one story.
+    Returns (story_data, audio_base64, duration, audio_error).
+    """
+    
+    # Generate story with AI
+    with span("llm"):
+        story_data = await generate_story_with_ai(
+            topic_name=topic_name,
+            subtopic_name=subtopic_name,
+            theme=theme,
+            age_group=age_group,
+            character=character,
+            kazanim=kazanim
+        )
+    
+    # ============= CHECK GENERATED CONTENT =============
+    # Also validate the AI-generated content
+    generated_text = f"{story_data['title']} {story_data['content']}"
+    with span("moderation_output"), track_dependency("moderation", "local_output"):
+        is_output_valid, output_error = await run_blocking("moderation", contains_bad_content, generated_text)
+    MODERATION_VERDICTS.inc(stage="output", checker="local", verdict="blocked" if is_output_valid else "allowed")
+    
+    if is_output_valid:  # Note: is_output_valid=True means BAD content
+        logger.error(f"AI generated inappropriate content, blocking")
+        raise HTTPException(
+            status_code=500,
+            detail="Üretilen içerik uygunluk kontrolünden geçemedi. Lütfen farklı bir tema veya karakter deneyin."
+        )
+    # ===================================================
+    
+    # Generate audio (with fallback if quota exceeded)
+    audio_base64 = None
+    duration = None
+    audio_error = None
+    
+    try:
+        with span("tts"):
+            audio_base64, duration = await generate_audio_for_story(story_data["content"])
+    except HTTPException as e:
+        if e.status_code == 503:  # Quota exceeded, provider unavailable or circuit open
+            audio_error = e.detail
+            logger.warning(f"Audio unavailable, saving story without audio")
+        else:
+            raise e
+    
+    return story_data, audio_base64, duration, audio_error
+
+
+# ============= STORY WARM POOL =============
+
+# Opt-in pool of pre-generated, moderated and voiced stories for popular
+# (subtopic, age_group) combinations. Only "generic" requests are served from
+# it: no custom character and the theme is the subtopic itself. A background
+# filler tops the pool up while the server is idle, within a daily budget.
+# Idleness is shared across workers: each generation is recorded in
+# generation_activity (TTL-indexed) while the filler runs in a single worker.
+STORY_POOL_ENABLED = os.environ.get("STORY_POOL_ENABLED", "false").lower() == "true"
+STORY_POOL_SIZE = int(os.environ.get("STORY_POOL_SIZE", "2"))  # max ready stories per combination
+STORY_POOL_COMBINATIONS = int(os.environ.get("STORY_POOL_COMBINATIONS", "20"))
+STORY_POOL_DEMAND_PER_SLOT = int(os.environ.get("STORY_POOL_DEMAND_PER_SLOT", "5"))  # requests (30 days) per pooled story
+STORY_POOL_DAILY_BUDGET = int(os.environ.get("STORY_POOL_DAILY_BUDGET", "50"))  # pooled generations per day
+STORY_POOL_INTERVAL = int(os.environ.get("STORY_POOL_INTERVAL", "300"))
+STORY_POOL_IDLE_SECONDS = int(os.environ.get("STORY_POOL_IDLE_SECONDS", "60"))
+STORY_POOL_HISTORY_DAYS = 30
+# An unfinished activity record older than this is from a worker that died mid-generation
+GENERATION_ACTIVITY_STALE_SECONDS = 900
+
+generation_activity = {"in_flight": 0}
+
+def is_poolable_request(story_input: StoryCreate, subtopic_name: Optional[str]) -> bool:
+    """Generic requests only: a subtopic, no character and the subtopic as theme"""
+    if not STORY_POOL_ENABLED or not subtopic_name or story_input.character:
+        return False
+    return turkish_fold(story_input.theme.strip()) == turkish_fold(subtopic_name)
+
+async def claim_pooled_story(story_input: StoryCreate) -> Optional[dict]:
+    """Atomically take the oldest ready story for this combination"""
+    pooled = await db.story_pool.find_one_and_delete(
+        {
+            "topic_id": story_input.topic_id,
+            "subtopic_id": story_input.subtopic_id,
+            "age_group": story_input.age_group,
+            "kazanim_based": story_input.kazanim_based
+        },
+        projection={"_id": 0},
+        sort=[("pooled_at", 1)]
+    )
+    if pooled:
+        await bump_stats(daily={"pool_hits": 1})
+        logger.info(f"Story pool hit: {story_input.subtopic_id}/{story_input.age_group}")
+    return pooled
+
+async def popular_pool_targets() -> list:
+    """(combination, target size) pairs derived from recent request history"""
+    since = (datetime.now(timezone.utc) - timedelta(days=STORY_POOL_HISTORY_DAYS)).isoformat()
+    pipeline = [
+        # Poolable demand only: custom characters or themes are never served from the pool
+        {"$match": {
+            "created_at": {"$gte": since},
+            "subtopic_id": {"$ne": None},
+            "character": {"$in": [None, ""]},
+            "$expr": {"$eq": ["$theme", "$subtopic_name"]}
+        }},
+        {"$group": {
+            "_id": {
+                "topic_id": "$topic_id",
+                "subtopic_id": "$subtopic_id",
+                "age_group": "$age_group",
+                "kazanim_based": {"$ne": [{"$ifNull": ["$kazanim", None]}, None]}
+            },
+            "requests": {"$sum": 1}
+        }},
+        {"$sort": {"requests": -1}},
+        {"$limit": STORY_POOL_COMBINATIONS}
+    ]
+    groups = await db.stories.aggregate(pipeline).to_list(STORY_POOL_COMBINATIONS)
+    return [
+        (group["_id"], min(STORY_POOL_SIZE, max(1, group["requests"] // STORY_POOL_DEMAND_PER_SLOT)))
+        for group in groups
+    ]
+
+async def pool_budget_remaining() -> int:
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    bucket = await db.daily_stats.find_one({"_id": today}, {"pool_generated": 1})
+    return STORY_POOL_DAILY_BUDGET - (bucket or {}).get("pool_generated", 0)
+
+async def reserve_pool_budget() -> bool:
+    """Atomically take one pooled generation from today's budget (False when spent)"""
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    try:
+        # $not/$gte rather than $lt so a bucket without the field still matches
+        bucket = await db.daily_stats.find_one_and_update(
+            {"_id": today, "pool_generated": {"$not": {"$gte": STORY_POOL_DAILY_BUDGET}}},
+            {"$inc": {"pool_generated": 1}},
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Today's bucket exists but the guard failed: budget spent
+        return False
+    return bucket is not None
+
+async def record_generation_start() -> str:
+    """Shared marker of an in-flight generation, read by server_is_idle in any worker"""
+    activity_id = str(uuid.uuid4())
+    await db.generation_activity.insert_one({
+        "_id": activity_id,
+        "started_at": datetime.now(timezone.utc),
+        "finished_at": None
+    })
+    return activity_id
+
+async def record_generation_end(activity_id: str):
+    try:
+        await db.generation_activity.update_one(
+            {"_id": activity_id},
+            {"$set": {"finished_at": datetime.now(timezone.utc)}}
+        )
+    except Exception as e:
+        # Only delays the pool filler until the record goes stale
+        logger.warning(f"Failed to record generation end: {e}")
+
+async def server_is_idle() -> bool:
+    """No generation in flight and none started in the last STORY_POOL_IDLE_SECONDS, in any worker"""
+    if generation_activity["in_flight"]:
+        return False
+    now = datetime.now(timezone.utc)
+    busy = await db.generation_activity.count_documents({"$or": [
+        {"started_at": {"$gte": now - timedelta(seconds=STORY_POOL_IDLE_SECONDS)}},
+        {
+            "finished_at": None,
+            "started_at": {"$gte": now - timedelta(seconds=GENERATION_ACTIVITY_STALE_SECONDS)}
+        }
+    ]}, limit=1)
+    return busy == 0
+
+async def fill_story_pool():
+    """One filler pass: generate missing pooled stories while idle and within budget"""
+    for combination, target in await popular_pool_targets():
+        topic = get_topic_detail(combination["topic_id"])
+        subtopic = get_subtopic_by_id(combination["topic_id"], combination["subtopic_id"])
+        if not topic or not subtopic:
+            continue
+        
+        ready = await db.story_pool.count_documents(combination)
+        for _ in range(target - ready):
+            if shutdown_event.is_set() or not await server_is_idle():
+                return
+            if tts_breaker.state != CLOSED:
+                # Pooled stories need audio; don't spend LLM calls while TTS is down
+                return
+            if not await reserve_pool_budget():
+                return
+            
+            story_data, audio_base64, duration, audio_error = await produce_story(
+                topic_name=topic["name"],
+                subtopic_name=subtopic["name"],
+                theme=subtopic["name"],
+                age_group=combination["age_group"],
+                kazanim=subtopic["kazanim"] if combination["kazanim_based"] else None
+            )
+            if not audio_base64:
+                # Only fully voiced stories are pooled
+                logger.warning(f"Story pool: no audio for {combination}, discarding")
+                return
+            
+            await db.story_pool.insert_one({
+                **combination,
+                "title": story_data["title"],
+                "content": story_data["content"],
+                "audio_base64": audio_base64,
+                "duration": duration,
+                "pooled_at": datetime.now(timezone.utc).isoformat()
+            })
+            logger.info(f"Story pool: added story for {combination}")
+
+async def run_story_pool_filler():
+    """Background loop for fill_story_pool"""
+    while not await wait_for_shutdown(STORY_POOL_INTERVAL):
+        try:
+            await fill_story_pool()
+        except Exception as e:
+            logger.error(f"Story pool filler error: {e}")
+
+
+# ============= AUDIO BACKFILL =============
+
+# Stories saved without audio (TTS quota, outage or open breaker) carry
+# audio_pending=True, covered by a partial index. A background worker voices
+# them newest first during off-peak hours, one synthesis every
+# AUDIO_BACKFILL_DELAY seconds, within a daily character budget. Opt-in: it
+# spends TTS quota without a user waiting for it.
+AUDIO_BACKFILL_ENABLED = os.environ.get("AUDIO_BACKFILL_ENABLED", "false").lower() == "true"
+AUDIO_BACKFILL_DAILY_CHARS = int(os.environ.get("AUDIO_BACKFILL_DAILY_CHARS", "200000"))
+AUDIO_BACKFILL_BATCH = int(os.environ.get("AUDIO_BACKFILL_BATCH", "10"))
+AUDIO_BACKFILL_DELAY = float(os.environ.get("AUDIO_BACKFILL_DELAY", "5"))
+AUDIO_BACKFILL_INTERVAL = int(os.environ.get("AUDIO_BACKFILL_INTERVAL", "600"))
+AUDIO_BACKFILL_HOURS = os.environ.get("AUDIO_BACKFILL_HOURS", "1-7")  # local hours, end exclusive
+AUDIO_BACKFILL_TIMEZONE = ZoneInfo(os.environ.get("AUDIO_BACKFILL_TIMEZONE", "Europe/Istanbul"))
+AUDIO_BACKFILL_MAX_ATTEMPTS = 3
+
+audio_backfill_progress = {"last_run": None, "last_result": None}
+
+def in_backfill_window(now: Optional[datetime] = None) -> bool:
+    """Is the local hour inside AUDIO_BACKFILL_HOURS (e.g. "1-7" or "22-6")?"""
+    start, _, end = AUDIO_BACKFILL_HOURS.partition("-")
+    start, end = int(start), int(end)
+    hour = (now or datetime.now(timezone.utc)).astimezone(AUDIO_BACKFILL_TIMEZONE).hour
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+async def reserve_backfill_chars(chars: int) -> bool:
+    """Atomically take chars from today's backfill budget before synthesis (False when it would overrun)"""
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    try:
+        # $not/$gt rather than $lte so a bucket without the field still matches
+        bucket = await db.daily_stats.find_one_and_update(
+            {"_id": today, "audio_backfill_chars": {"$not": {"$gt": AUDIO_BACKFILL_DAILY_CHARS - chars}}},
+            {"$inc": {"audio_backfill_chars": chars}},
+            projection={"_id": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Today's bucket exists but the guard failed: not enough budget left
+        return False
+    return bucket is not None
+
+async def refund_backfill_chars(chars: int):
+    """Give back a reservation whose synthesis failed"""
+    await bump_stats(daily={"audio_backfill_chars": -chars})
+
+async def backfill_audio_batch(ignore_window: bool = False) -> dict:
+    """One worker pass: voice up to AUDIO_BACKFILL_BATCH pending stories"""
+    result = {"backfilled": 0, "failed": 0, "chars": 0, "stopped": None}
+    if not ignore_window and not in_backfill_window():
+        result["stopped"] = "outside_window"
+        return result
+    
+    pending = await db.stories.find(
+        {"audio_pending": True, "audio_backfill_attempts": {"$not": {"$gte": AUDIO_BACKFILL_MAX_ATTEMPTS}}},
+        {"_id": 0, "id": 1, "content": 1}
+    ).sort("created_at", -1).limit(AUDIO_BACKFILL_BATCH).to_list(AUDIO_BACKFILL_BATCH)
+    
+    for story in pending:
+        if tts_breaker.state != CLOSED:
+            result["stopped"] = "tts_unavailable"
+            break
+        chars = len(tts_text_chunk(story["content"]))
+        if not await reserve_backfill_chars(chars):
+            result["stopped"] = "daily_budget"
+            break
+        
+        try:
+            audio_base64, duration = await generate_audio_for_story(story["content"])
+        except HTTPException as e:
+            await refund_backfill_chars(chars)
+            if e.status_code == 503:
+                # Quota, outage or saturation: leave the rest for a later pass
+                result["stopped"] = "tts_unavailable"
+                break
+            await db.stories.update_one({"id": story["id"]}, {"$inc": {"audio_backfill_attempts": 1}})
+            result["failed"] += 1
+            logger.warning(f"Audio backfill failed for {story['id']}: {e.detail}")
+            continue
+        except BaseException:
+            await refund_backfill_chars(chars)
+            raise
+        
+        result["chars"] += chars
+        await db.stories.update_one(
+            {"id": story["id"], "audio_pending": True},
+            {
+                "$set": {"audio_base64": audio_base64, "duration": duration},
+                "$unset": {"audio_pending": "", "audio_backfill_attempts": ""}
+            }
+        )
+        await bump_stats(daily={"audio_backfilled": 1})
+        result["backfilled"] += 1
+        if await wait_for_shutdown(AUDIO_BACKFILL_DELAY):
+            result["stopped"] = "shutdown"
+            break
+    
+    audio_backfill_progress["last_run"] = datetime.now(timezone.utc).isoformat()
+    audio_backfill_progress["last_result"] = result
+    if result["backfilled"] or result["failed"]:
+        logger.info(f"Audio backfill pass: {result}")
+    return result
+
+async def run_audio_backfill():
+    """Background loop for backfill_audio_batch"""
+    while not await wait_for_shutdown(AUDIO_BACKFILL_INTERVAL):
+        try:
+            await backfill_audio_batch()
+        except Exception as e:
+            logger.error(f"Audio backfill error: {e}")
 
 
 # ============= API ENDPOINTS =============
@@ -684,38 +1621,42 @@ async def root():
 @api_router.get("/topics", response_model=List[TopicInfo])
 async def get_topics_list():
     """Get all available main topic categories"""
-    return get_all_topics()
+    # Static catalog - serve the JSON pre-serialized at import
+    return Response(content=TOPICS_JSON, media_type="application/json")
 
 
 @api_router.get("/topics/{topic_id}", response_model=TopicDetail)
 async def get_topic_details(topic_id: str):
     """Get details of a specific topic including subtopics"""
-    topic = get_topic_detail(topic_id)
-    if not topic:
+    body = TOPIC_DETAIL_JSON.get(topic_id)
+    if body is None:
         raise HTTPException(status_code=404, detail="Konu bulunamadı")
-    return topic
+    return Response(content=body, media_type="application/json")
 
 
 @api_router.get("/topics/{topic_id}/subtopics", response_model=List[SubtopicInfo])
 async def get_topic_subtopics(topic_id: str):
     """Get subtopics for a specific topic"""
-    subtopics = get_subtopics(topic_id)
-    if not subtopics:
+    body = TOPIC_SUBTOPICS_JSON.get(topic_id)
+    if body is None:
         raise HTTPException(status_code=404, detail="Konu bulunamadı")
-    return subtopics
+    return Response(content=body, media_type="application/json")
 
 
 @api_router.get("/subtopics/all")
 async def get_all_subtopics():
     """Get all subtopics in a flat list"""
-    return get_all_subtopics_flat()
+    return Response(content=SUBTOPICS_FLAT_JSON, media_type="application/json")
 
 
 @api_router.get("/kazanim/search")
-async def search_kazanim(q: str):
-    """Search topics by kazanım keyword"""
-    results = search_by_kazanim(q)
-    return results
+async def search_kazanim(q: str, limit: int = 20, category: Optional[str] = None):
+    """Fuzzy, ranked search over subtopics, kazanımlar and kazanım categories"""
+    if category and category not in KAZANIM_CATEGORIES:
+        raise HTTPException(status_code=400, detail="Geçersiz kazanım kategorisi")
+    
+    limit = max(1, min(limit, 100))
+    return search_by_kazanim(q, limit=limit, category=category)
 
 
 @api_router.get("/stories", response_model=List[StoryResponse])
@@ -724,9 +1665,11 @@ async def get_stories(
     subtopic_id: Optional[str] = None,
     search: Optional[str] = None, 
     sort_by: Optional[str] = None,  # "newest", "oldest", "popular"
-    limit: int = 20
+    limit: int = 20,
+    cursor: Optional[str] = None
 ):
-    """Get all stories, optionally filtered by topic, subtopic or search query"""
+    """Get all stories, optionally filtered by topic, subtopic or search query.
+    The next page cursor is returned in the X-Next-Cursor header."""
     
     query = {}
     
@@ -752,100 +1695,67 @@ async def get_stories(
     else:  # default: popular
         sort_field, sort_order = "play_count", -1
     
-    stories = await db.stories.find(query, {"_id": 0}).sort(sort_field, sort_order).limit(limit).to_list(limit)
+    stories, next_cursor = await fetch_page(
+        db.stories, query, STORY_RESPONSE_PROJECTION, sort_field, sort_order, limit, cursor
+    )
     
-    # Batch fetch creator info for better performance
-    user_ids = list(set(s.get("user_id") for s in stories if s.get("user_id")))
-    if user_ids:
-        users = await db.users.find(
-            {"user_id": {"$in": user_ids}}, 
-            {"_id": 0, "user_id": 1, "name": 1, "surname": 1, "picture": 1}
-        ).to_list(len(user_ids))
-        user_map = {u["user_id"]: u for u in users}
-        
-        for story in stories:
-            if story.get("user_id") and story["user_id"] in user_map:
-                user = user_map[story["user_id"]]
-                story["creator_name"] = f"{user.get('name', '')} {user.get('surname', '')}".strip()
-                story["creator_id"] = story["user_id"]
-                story["creator_picture"] = user.get("picture")
+    # Creator info is denormalized on the story; only legacy stories need a lookup
+    await enrich_creators(stories)
     
-    return stories
+    return story_list_response(stories, next_cursor)
 
 
 @api_router.get("/stories/popular", response_model=List[StoryResponse])
 async def get_popular_stories(limit: int = 6):
     """Get most popular stories by play count"""
-    stories = await db.stories.find({}, {"_id": 0}).sort("play_count", -1).limit(limit).to_list(limit)
-    
-    # Batch fetch creator info for better performance
-    user_ids = list(set(s.get("user_id") for s in stories if s.get("user_id")))
-    if user_ids:
-        users = await db.users.find(
-            {"user_id": {"$in": user_ids}}, 
-            {"_id": 0, "user_id": 1, "name": 1, "surname": 1, "picture": 1}
-        ).to_list(len(user_ids))
-        user_map = {u["user_id"]: u for u in users}
-        
-        for story in stories:
-            if story.get("user_id") and story["user_id"] in user_map:
-                user = user_map[story["user_id"]]
-                story["creator_name"] = f"{user.get('name', '')} {user.get('surname', '')}".strip()
-                story["creator_id"] = story["user_id"]
-                story["creator_picture"] = user.get("picture")
+    stories = await db.stories.find({}, STORY_RESPONSE_PROJECTION).sort("play_count", -1).limit(limit).to_list(limit)
     
-    return stories
+    # Creator info is denormalized on the story; only legacy stories need a lookup
+    await enrich_creators(stories)
+    
+    return story_list_response(stories)
 
 
 @api_router.get("/masal/{slug}", response_model=StoryResponse)
 async def get_story_by_slug(slug: str):
     """Get a single story by SEO-friendly slug"""
-    story = await db.stories.find_one({"slug": slug}, {"_id": 0})
+    story = await db.stories.find_one({"slug": slug}, STORY_RESPONSE_PROJECTION)
     
     if not story:
         raise HTTPException(status_code=404, detail="Masal bulunamadı")
     
-    # Enrich with creator info
-    if story.get("user_id"):
-        user = await db.users.find_one({"user_id": story["user_id"]}, {"_id": 0, "name": 1, "surname": 1, "picture": 1})
-        if user:
-            story["creator_name"] = f"{user.get('name', '')} {user.get('surname', '')}".strip()
-            story["creator_id"] = story["user_id"]
-            story["creator_picture"] = user.get("picture")
+    # Creator info is denormalized on the story; only legacy stories need a lookup
+    await enrich_creators([story])
     
-    return story
+    return ORJSONResponse(story_payload(story))
 
 
 @api_router.get("/stories/{story_id}", response_model=StoryResponse)
 async def get_story(story_id: str):
     """Get a single story by ID (legacy support)"""
     # First try to find by ID
-    story = await db.stories.find_one({"id": story_id}, {"_id": 0})
+    story = await db.stories.find_one({"id": story_id}, STORY_RESPONSE_PROJECTION)
     
     # If not found by ID, try by slug (backward compatibility)
     if not story:
-        story = await db.stories.find_one({"slug": story_id}, {"_id": 0})
+        story = await db.stories.find_one({"slug": story_id}, STORY_RESPONSE_PROJECTION)
     
     if not story:
         raise HTTPException(status_code=404, detail="Masal bulunamadı")
     
-    # Enrich with creator info
-    if story.get("user_id"):
-        user = await db.users.find_one({"user_id": story["user_id"]}, {"_id": 0, "name": 1, "surname": 1, "picture": 1})
-        if user:
-            story["creator_name"] = f"{user.get('name', '')} {user.get('surname', '')}".strip()
-            story["creator_id"] = story["user_id"]
-            story["creator_picture"] = user.get("picture")
+    # Creator info is denormalized on the story; only legacy stories need a lookup
+    await enrich_creators([story])
     
-    return story
+    return ORJSONResponse(story_payload(story))
 
 
 @api_router.post("/stories/generate", response_model=StoryResponse)
-async def generate_story(story_input: StoryCreate, request: Request):
-    """Generate a new story using AI and TTS"""
+async def generate_story(story_input: StoryCreate, request: Request, background_tasks: BackgroundTasks):
+    """Generate a new story using AI and TTS (stage durations in Server-Timing)"""
     
     # Check if user is logged in and has credits
-    user = await get_current_user(request)
+    with span("auth"):
+        user = await get_current_user(request)
     user_id = None
     
     if user:
@@ -874,62 +1784,58 @@ async def generate_story(story_input: StoryCreate, request: Request):
             if story_input.kazanim_based:
                 kazanim = subtopic["kazanim"]
     
-    # ============= CONTENT MODERATION CHECK =============
-    # Validate all input fields for inappropriate content before generation
-    is_valid, validation_error = await validate_story_request(
-        topic_name=topic_name,
-        subtopic_name=subtopic_name,
-        theme=story_input.theme,
-        character=story_input.character,
-        kazanim=kazanim
-    )
-    
-    if not is_valid:
-        logger.warning(f"Content moderation blocked story creation: {validation_error}")
-        raise HTTPException(
-            status_code=400, 
-            detail=validation_error
-        )
-    # ===================================================
-    
-    logger.info(f"Generating story: topic={topic_name}, subtopic={subtopic_name}, theme={story_input.theme}")
-    
-    # Generate story with AI
-    story_data = await generate_story_with_ai(
-        topic_name=topic_name,
-        subtopic_name=subtopic_name,
-        theme=story_input.theme,
-        age_group=story_input.age_group,
-        character=story_input.character,
-        kazanim=kazanim
-    )
-    
-    # ============= CHECK GENERATED CONTENT =============
-    # Also validate the AI-generated content
-    generated_text = f"{story_data['title']} {story_data['content']}"
-    is_output_valid, output_error = contains_bad_content(generated_text)
-    
-    if is_output_valid:  # Note: is_output_valid=True means BAD content
-        logger.error(f"AI generated inappropriate content, blocking")
-        raise HTTPException(
-            status_code=500,
-            detail="Üretilen içerik uygunluk kontrolünden geçemedi. Lütfen farklı bir tema veya karakter deneyin."
+    # Per-user and per-IP token buckets (raises 429 with Retry-After). Taken
+    # after the request is known to be valid and before moderation, the pool
+    # and the LLM, which are what the limit protects
+    with span("rate_limit"):
+        await admission.check_rate(user_id, get_client_ip(request))
+    
+    pooled = None
+    if is_poolable_request(story_input, subtopic_name):
+        with span("pool"):
+            pooled = await claim_pooled_story(story_input)
+    
+    if pooled:
+        # Warm pool hit: already moderated and voiced
+        story_data = {"title": pooled["title"], "content": pooled["content"]}
+        audio_base64 = pooled.get("audio_base64")
+        duration = pooled.get("duration")
+        audio_error = None
+    else:
+        # ============= CONTENT MODERATION CHECK =============
+        # Validate all input fields for inappropriate content before generation
+        is_valid, validation_error = await validate_story_request(
+            topic_name=topic_name,
+            subtopic_name=subtopic_name,
+            theme=story_input.theme,
+            character=story_input.character,
+            kazanim=kazanim
         )
-    # ===================================================
-    
-    # Generate audio (with fallback if quota exceeded)
-    audio_base64 = None
-    duration = None
-    audio_error = None
-    
-    try:
-        audio_base64, duration = await generate_audio_for_story(story_data["content"])
-    except HTTPException as e:
-        if e.status_code == 503:  # Quota exceeded
-            audio_error = "Ses kotası doldu. Masal sessiz kaydedildi."
-            logger.warning(f"Audio quota exceeded, saving story without audio")
-        else:
-            raise e
+        
+        if not is_valid:
+            logger.warning(f"Content moderation blocked story creation: {validation_error}")
+            raise HTTPException(
+                status_code=400, 
+                detail=validation_error
+            )
+        # ===================================================
+        
+        logger.info(f"Generating story: topic={topic_name}, subtopic={subtopic_name}, theme={story_input.theme}")
+        
+        generation_activity["in_flight"] += 1
+        activity_id = await record_generation_start()
+        try:
+            story_data, audio_base64, duration, audio_error = await produce_story(
+                topic_name=topic_name,
+                subtopic_name=subtopic_name,
+                theme=story_input.theme,
+                age_group=story_input.age_group,
+                character=story_input.character,
+                kazanim=kazanim
+            )
+        finally:
+            generation_activity["in_flight"] -= 1
+            await record_generation_end(activity_id)
     
     # Create story object
     story = Story(
@@ -948,26 +1854,40 @@ async def generate_story(story_input: StoryCreate, request: Request):
     )
     
     # Generate SEO-friendly slug
-    base_slug = generate_slug(story_data["title"], story_input.age_group)
-    story.slug = await ensure_unique_slug(base_slug, story.id)
+    with span("slug"):
+        base_slug = generate_slug(story_data["title"], story_input.age_group)
+        story.slug = await ensure_unique_slug(base_slug, story.id)
     
     # Save to database
     story_dict = story.model_dump()
+    if not audio_base64:
+        # Picked up later by the audio backfill worker
+        story_dict["audio_pending"] = True
     
     # Add user_id if logged in
     if user_id:
         story_dict["user_id"] = user_id
+        story_dict.update(creator_snapshot(user))
         # Deduct credit
-        await db.users.update_one(
-            {"user_id": user_id},
-            {"$inc": {"credits": -1}}
-        )
+        with span("db_credit"):
+            await db.users.update_one(
+                {"user_id": user_id},
+                {"$inc": {"credits": -1}}
+            )
+            forget_user(user_id)
     
-    await db.stories.insert_one(story_dict)
+    with span("db_insert"):
+        await db.stories.insert_one(story_dict)
+        await bump_stats({"stories": 1}, {"stories_created": 1})
+    if user_id:
+        invalidate_creator_stats(user_id)
     
     # Remove _id for response
     story_dict.pop('_id', None)
     
+    if audio_base64 and AUDIO_RENDITIONS_AT_GENERATION:
+        background_tasks.add_task(create_renditions, story_dict, AUDIO_RENDITIONS_AT_GENERATION)
+    
     # Add warning if audio failed
     if audio_error:
         story_dict["warning"] = audio_error
@@ -976,6 +1896,62 @@ async def generate_story(story_input: StoryCreate, request: Request):
     return story_dict
 
 
+# Audio sets its own validators and serves byte ranges, so it is kept out of
+# ConditionalCacheMiddleware (which buffers the body and only knows 200/304)
+AUDIO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@api_router.get("/stories/{story_id}/audio")
+async def get_story_audio(story_id: str, request: Request, rendition: Optional[str] = None):
+    """Serve a story's audio as raw bytes. Rendition from ?rendition= or the Accept header:
+    mp3 (original), opus (low bitrate), slow (youngest age group only).
+    Single byte ranges get a 206 so players can seek."""
+    rendition = rendition or negotiate_rendition(request.headers.get("accept"))
+    if rendition not in AUDIO_RENDITIONS:
+        raise HTTPException(status_code=400, detail="Geçersiz ses formatı")
+    
+    # Only the original mp3 needs the base64 blob; other renditions just need it to exist
+    projection = {"_id": 0, "id": 1, "content": 1, "age_group": 1}
+    if rendition == "mp3":
+        projection["audio_base64"] = 1
+    story = await db.stories.find_one({"id": story_id, "audio_base64": {"$ne": None}}, projection)
+    
+    if not story or not rendition_available(story, rendition):
+        raise HTTPException(status_code=404, detail="Bu masal için ses bulunamadı")
+    
+    if rendition == "mp3":
+        audio_content = await run_blocking("encoding", base64.b64decode, story["audio_base64"])
+    else:
+        audio_content = await get_or_create_rendition(story, rendition)
+    
+    etag = compute_etag(audio_content)
+    headers = {"Vary": "Accept", "Accept-Ranges": "bytes", "Cache-Control": AUDIO_CACHE_CONTROL, "ETag": etag}
+    media_type = AUDIO_RENDITIONS[rendition]["media_type"]
+    size = len(audio_content)
+    
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    # If-Range: a range only applies to the representation the client already has
+    if_range = request.headers.get("if-range")
+    byte_range = None
+    if not if_range or if_range.strip() == etag:
+        try:
+            byte_range = parse_byte_range(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    
+    if byte_range:
+        start, end = byte_range
+        return Response(
+            content=audio_content[start:end + 1],
+            status_code=206,
+            media_type=media_type,
+            headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"}
+        )
+    
+    return Response(content=audio_content, media_type=media_type, headers=headers)
+
+
 @api_router.post("/stories/{story_id}/play")
 async def increment_play_count(story_id: str):
     """Increment the play count for a story"""
@@ -988,6 +1964,8 @@ async def increment_play_count(story_id: str):
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Masal bulunamadı")
     
+    await bump_stats(daily={"plays": 1})
+    
     return {"success": True, "message": "Dinleme sayısı güncellendi"}
 
 
@@ -1012,6 +1990,8 @@ async def delete_story(story_id: str, request: Request):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Masal bulunamadı")
     
+    await after_story_deleted(story_id, story.get("user_id"))
+    
     return {"success": True, "message": "Masal silindi"}
 
 
@@ -1034,7 +2014,7 @@ async def register_user(user_data: UserRegister):
         "surname": user_data.surname,
         "email": user_data.email,
         "phone": user_data.phone,
-        "password_hash": hash_password(user_data.password),
+        "password_hash": await run_blocking("password", hash_password, user_data.password),
         "picture": None,
         "credits": 10,  # Initial credits
         "role": "user",
@@ -1044,6 +2024,7 @@ async def register_user(user_data: UserRegister):
     }
     
     await db.users.insert_one(user)
+    await bump_stats({"users": 1}, {"signups": 1})
     
     # Remove sensitive data
     user.pop("password_hash", None)
@@ -1066,9 +2047,17 @@ async def login_user(login_data: UserLogin, response: Response):
         raise HTTPException(status_code=400, detail="Bu hesap Google ile giriş yapmaktadır")
     
     # Verify password
-    if not verify_password(login_data.password, user.get("password_hash", "")):
+    stored_hash = user.get("password_hash", "")
+    if not await run_blocking("password", verify_password, login_data.password, stored_hash):
         raise HTTPException(status_code=401, detail="Email veya şifre hatalı")
     
+    # Upgrade legacy salted SHA-256 hashes to bcrypt on successful login
+    if is_legacy_password_hash(stored_hash):
+        await db.users.update_one(
+            {"user_id": user["user_id"]},
+            {"$set": {"password_hash": await run_blocking("password", hash_password, login_data.password)}}
+        )
+    
     # Create session
     session_token = secrets.token_urlsafe(32)
     session = {
@@ -1098,7 +2087,7 @@ async def login_user(login_data: UserLogin, response: Response):
 
 
 @api_router.post("/auth/google/session")
-async def google_session(request: Request, response: Response):
+async def google_session(request: Request, response: Response, background_tasks: BackgroundTasks):
     """Process Google OAuth authorization code"""
     
     try:
@@ -1189,6 +2178,11 @@ async def google_session(request: Request, response: Response):
             {"$set": update_data}
         )
         user_id = existing_user["user_id"]
+        forget_user(user_id)
+        
+        # Propagate a changed name or picture to the user's stories
+        if any(update_data.get(field, existing_user.get(field)) != existing_user.get(field) for field in ("name", "picture")):
+            background_tasks.add_task(fan_out_creator_snapshot, user_id)
     else:
         # Create new user
         user_id = f"user_{uuid.uuid4().hex[:12]}"
@@ -1206,6 +2200,7 @@ async def google_session(request: Request, response: Response):
             "created_at": datetime.now(timezone.utc).isoformat()
         }
         await db.users.insert_one(new_user)
+        await bump_stats({"users": 1}, {"signups": 1})
     
     # Create our own session
     session_token = secrets.token_urlsafe(32)
@@ -1260,6 +2255,7 @@ async def logout(request: Request, response: Response):
     
     if session_token:
         await db.user_sessions.delete_one({"session_token": session_token})
+        session_cache.invalidate("user_sessions", "session_token", session_token)
     
     response.delete_cookie(key="session_token", path="/")
     
@@ -1327,8 +2323,8 @@ async def admin_login(login_data: AdminLogin, response: Response):
 # ============= USER ENDPOINTS =============
 
 @api_router.get("/users/public/{user_id}")
-async def get_public_profile(user_id: str):
-    """Get public profile of a user"""
+async def get_public_profile(user_id: str, limit: int = 20, cursor: Optional[str] = None):
+    """Get public profile of a user with creator stats and a page of stories"""
     user = await db.users.find_one(
         {"user_id": user_id}, 
         {"_id": 0, "name": 1, "surname": 1, "picture": 1, "created_at": 1}
@@ -1337,11 +2333,14 @@ async def get_public_profile(user_id: str):
     if not user:
         raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
     
+    stats = await get_creator_stats(user_id)
+    
     # Get user's stories (public info only)
-    stories = await db.stories.find(
-        {"user_id": user_id},
-        {"_id": 0, "id": 1, "title": 1, "topic_name": 1, "play_count": 1, "duration": 1, "created_at": 1}
-    ).sort("created_at", -1).to_list(50)
+    stories, next_cursor = await fetch_page(
+        db.stories, {"user_id": user_id},
+        {"_id": 0, "id": 1, "slug": 1, "title": 1, "topic_name": 1, "play_count": 1, "duration": 1, "created_at": 1},
+        "created_at", -1, limit, cursor
+    )
     
     return {
         "user_id": user_id,
@@ -1349,8 +2348,12 @@ async def get_public_profile(user_id: str):
         "surname": user.get("surname", ""),
         "picture": user.get("picture"),
         "member_since": user.get("created_at"),
-        "story_count": len(stories),
-        "stories": stories
+        "story_count": stats["story_count"],
+        "total_plays": stats["total_plays"],
+        "total_duration": stats["total_duration"],
+        "top_topics": stats["top_topics"],
+        "stories": stories,
+        "next_cursor": next_cursor
     }
 
 
@@ -1363,7 +2366,7 @@ async def get_profile(request: Request):
 
 
 @api_router.put("/users/profile")
-async def update_profile(request: Request):
+async def update_profile(request: Request, background_tasks: BackgroundTasks):
     """Update user profile"""
     user = await require_auth(request)
     body = await request.json()
@@ -1381,22 +2384,26 @@ async def update_profile(request: Request):
             {"user_id": user["user_id"]},
             {"$set": update_data}
         )
+        forget_user(user["user_id"])
+        if "name" in update_data or "surname" in update_data:
+            background_tasks.add_task(fan_out_creator_snapshot, user["user_id"])
     
     updated_user = await db.users.find_one({"user_id": user["user_id"]}, {"_id": 0, "password_hash": 0})
     return {"success": True, "user": updated_user}
 
 
 @api_router.get("/users/stories")
-async def get_user_stories(request: Request, skip: int = 0, limit: int = 20):
-    """Get stories created by current user"""
+async def get_user_stories(request: Request, skip: int = 0, limit: int = 20, cursor: Optional[str] = None):
+    """Get stories created by current user (next page cursor in X-Next-Cursor)"""
     user = await require_auth(request)
     
-    stories = await db.stories.find(
-        {"user_id": user["user_id"]},
-        {"_id": 0}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    stories, next_cursor = await fetch_page(
+        db.stories, {"user_id": user["user_id"]}, {"_id": 0, "audio_base64": 0},
+        "created_at", -1, limit, cursor, skip=skip
+    )
     
-    return stories
+    # Trusted documents: straight to orjson, no jsonable_encoder pass
+    return ORJSONResponse(stories, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
 
 
 @api_router.delete("/users/stories/{story_id}")
@@ -1412,45 +2419,118 @@ async def delete_user_story(story_id: str, request: Request):
     if story.get("user_id") != user["user_id"]:
         raise HTTPException(status_code=403, detail="Bu masalı silme yetkiniz yok")
     
-    await db.stories.delete_one({"id": story_id})
+    result = await db.stories.delete_one({"id": story_id})
+    if result.deleted_count:
+        await after_story_deleted(story_id, story.get("user_id"))
     
     return {"success": True, "message": "Masal silindi"}
 
 
 # ============= FAVORITES ENDPOINTS =============
 
+# Favorites live in their own collection: one document per (user_id, story_id)
+# with a unique index, paginated by added_at.
+
+async def upsert_favorite(user_id: str, story_id: str, added_at: str):
+    """Insert a favorite if missing; a concurrent upsert of the same pair is a no-op"""
+    try:
+        await db.favorites.update_one(
+            {"user_id": user_id, "story_id": story_id},
+            {"$setOnInsert": {"added_at": added_at}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Two upserts raced on the unique index; the other one inserted it
+        pass
+
+
+async def migrate_legacy_favorites() -> int:
+    """
+    Move legacy users.favorites arrays into the favorites collection.
+    Idempotent (upserts, then unsets the array), so it runs at startup and
+    from the admin endpoint. The arrays were appended to, so later items get
+    later added_at values and the list keeps its original order.
+    """
+    users = await db.users.find(
+        {"favorites.0": {"$exists": True}},
+        {"_id": 0, "user_id": 1, "favorites": 1}
+    ).to_list(None)
+    
+    migrated_count = 0
+    migrated_at = datetime.now(timezone.utc)
+    for user in users:
+        story_ids = user["favorites"]
+        for i, story_id in enumerate(story_ids):
+            added_at = migrated_at - timedelta(milliseconds=len(story_ids) - 1 - i)
+            await upsert_favorite(user["user_id"], story_id, added_at.isoformat())
+            migrated_count += 1
+        await db.users.update_one({"user_id": user["user_id"]}, {"$unset": {"favorites": ""}})
+    
+    if users:
+        logger.info(f"Migrated {migrated_count} legacy favorites of {len(users)} users")
+    return migrated_count
+
+
+async def run_legacy_favorites_migration():
+    """Background job: migrate legacy favorites once at startup"""
+    try:
+        await migrate_legacy_favorites()
+    except Exception as e:
+        logger.error(f"Legacy favorites migration failed: {e}")
+
+
 @api_router.get("/favorites")
-async def get_favorites(request: Request):
-    """Get current user's favorite stories"""
+async def get_favorites(request: Request, limit: int = 20, cursor: Optional[str] = None):
+    """Get current user's favorite stories, newest first (next page cursor in X-Next-Cursor)"""
     user = await require_auth(request)
     
-    favorites = user.get("favorites", [])
+    favorites, next_cursor = await fetch_page(
+        db.favorites, {"user_id": user["user_id"]}, {"_id": 0, "story_id": 1, "added_at": 1},
+        "added_at", -1, limit, cursor, id_field="story_id"
+    )
     if not favorites:
         return []
     
-    # Get story details for favorites
+    # Get story details for favorites (list view - no audio payload)
+    story_ids = [f["story_id"] for f in favorites]
     stories = await db.stories.find(
-        {"id": {"$in": favorites}},
-        {"_id": 0}
-    ).to_list(100)
-    
-    # Enrich with creator info
-    user_ids = list(set(s.get("user_id") for s in stories if s.get("user_id")))
-    if user_ids:
-        users = await db.users.find(
-            {"user_id": {"$in": user_ids}}, 
-            {"_id": 0, "user_id": 1, "name": 1, "surname": 1, "picture": 1}
-        ).to_list(len(user_ids))
-        user_map = {u["user_id"]: u for u in users}
-        
-        for story in stories:
-            if story.get("user_id") and story["user_id"] in user_map:
-                u = user_map[story["user_id"]]
-                story["creator_name"] = f"{u.get('name', '')} {u.get('surname', '')}".strip()
-                story["creator_id"] = story["user_id"]
-                story["creator_picture"] = u.get("picture")
+        {"id": {"$in": story_ids}},
+        {"_id": 0, "audio_base64": 0}
+    ).to_list(len(story_ids))
     
-    return stories
+    # Keep favorites order
+    story_map = {s["id"]: s for s in stories}
+    stories = [story_map[story_id] for story_id in story_ids if story_id in story_map]
+    
+    # Creator info is denormalized on the story; only legacy stories need a lookup
+    await enrich_creators(stories)
+    
+    # Trusted documents: straight to orjson, no jsonable_encoder pass
+    return ORJSONResponse(stories, headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+
+@api_router.get("/favorites/count")
+async def get_favorites_count(request: Request):
+    """Total number of the current user's favorites (the list endpoint is paginated)"""
+    user = await require_auth(request)
+    count = await db.favorites.count_documents({"user_id": user["user_id"]})
+    return {"count": count}
+
+
+@api_router.post("/favorites/check")
+async def check_favorites_batch(check_data: FavoriteCheckRequest, request: Request):
+    """Return which of the given story ids are in the user's favorites"""
+    user = await get_current_user(request)
+    if not user or not check_data.story_ids:
+        return {"favorites": []}
+    
+    story_ids = check_data.story_ids[:MAX_PAGE_SIZE]
+    favorites = await db.favorites.find(
+        {"user_id": user["user_id"], "story_id": {"$in": story_ids}},
+        {"_id": 0, "story_id": 1}
+    ).to_list(len(story_ids))
+    
+    return {"favorites": [f["story_id"] for f in favorites]}
 
 
 @api_router.post("/favorites/{story_id}")
@@ -1463,11 +2543,8 @@ async def add_favorite(story_id: str, request: Request):
     if not story:
         raise HTTPException(status_code=404, detail="Masal bulunamadı")
     
-    # Add to favorites (avoid duplicates)
-    await db.users.update_one(
-        {"user_id": user["user_id"]},
-        {"$addToSet": {"favorites": story_id}}
-    )
+    # Add to favorites (unique index keeps this idempotent)
+    await upsert_favorite(user["user_id"], story_id, datetime.now(timezone.utc).isoformat())
     
     return {"success": True, "message": "Favorilere eklendi"}
 
@@ -1477,10 +2554,7 @@ async def remove_favorite(story_id: str, request: Request):
     """Remove a story from favorites"""
     user = await require_auth(request)
     
-    await db.users.update_one(
-        {"user_id": user["user_id"]},
-        {"$pull": {"favorites": story_id}}
-    )
+    await db.favorites.delete_one({"user_id": user["user_id"], "story_id": story_id})
     
     return {"success": True, "message": "Favorilerden çıkarıldı"}
 
@@ -1492,10 +2566,11 @@ async def check_favorite(story_id: str, request: Request):
     if not user:
         return {"is_favorite": False}
     
-    favorites = user.get("favorites", [])
-    return {"is_favorite": story_id in favorites}
-
-
+    favorite = await db.favorites.find_one(
+        {"user_id": user["user_id"], "story_id": story_id},
+        {"_id": 1}
+    )
+    return {"is_favorite": favorite is not None}
 
 
 # ============= CREDIT ENDPOINTS =============
@@ -1525,6 +2600,7 @@ async def create_credit_request(request_data: CreditRequestCreate, request: Requ
     }
     
     await db.credit_requests.insert_one(credit_request)
+    await bump_stats({"pending_requests": 1})
     credit_request.pop("_id", None)
     
     return {"success": True, "message": "Kredi talebiniz oluşturuldu", "request": credit_request}
@@ -1546,18 +2622,19 @@ async def get_my_credit_requests(request: Request):
 # ============= ADMIN ENDPOINTS =============
 
 @api_router.get("/admin/users")
-async def admin_get_users(request: Request, skip: int = 0, limit: int = 50):
+async def admin_get_users(request: Request, skip: int = 0, limit: int = 50, cursor: Optional[str] = None):
     """Get all users (admin only)"""
     await require_admin(request)
     
-    users = await db.users.find(
-        {},
-        {"_id": 0, "password_hash": 0}
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    users, next_cursor = await fetch_page(
+        db.users, {}, {"_id": 0, "password_hash": 0},
+        "created_at", -1, limit, cursor, id_field="user_id", skip=skip
+    )
     
-    total = await db.users.count_documents({})
+    # Unfiltered total from collection metadata - no collection scan
+    total = await db.users.estimated_document_count()
     
-    return {"users": users, "total": total}
+    return {"users": users, "total": total, "next_cursor": next_cursor}
 
 
 @api_router.put("/admin/users/{user_id}")
@@ -1575,41 +2652,58 @@ async def admin_update_user(user_id: str, request: Request):
         update_data["is_verified"] = body["is_verified"]
     
     if update_data:
-        await db.users.update_one(
+        previous = await db.users.find_one_and_update(
             {"user_id": user_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            projection={"_id": 0, "role": 1}
         )
+        forget_user(user_id)
+        # Keep the "users" counter (role == user) in step with role changes
+        if previous and "role" in update_data and previous.get("role") != update_data["role"]:
+            if previous.get("role") == "user":
+                await bump_stats({"users": -1})
+            elif update_data["role"] == "user":
+                await bump_stats({"users": 1})
     
     return {"success": True, "message": "Kullanıcı güncellendi"}
 
 
 @api_router.delete("/admin/users/{user_id}")
-async def admin_delete_user(user_id: str, request: Request):
+async def admin_delete_user(user_id: str, request: Request, background_tasks: BackgroundTasks):
     """Delete a user (admin only)"""
     await require_admin(request)
     
     if user_id == "admin_master":
         raise HTTPException(status_code=400, detail="Admin kullanıcısı silinemez")
     
-    await db.users.delete_one({"user_id": user_id})
+    deleted = await db.users.find_one_and_delete(
+        {"user_id": user_id},
+        projection={"_id": 0, "role": 1}
+    )
+    if deleted and deleted.get("role") == "user":
+        await bump_stats({"users": -1})
     await db.user_sessions.delete_many({"user_id": user_id})
+    forget_user(user_id)
+    await db.favorites.delete_many({"user_id": user_id})
+    background_tasks.add_task(clear_creator_snapshot, user_id)
     
     return {"success": True, "message": "Kullanıcı silindi"}
 
 
 @api_router.get("/admin/stories")
-async def admin_get_stories(request: Request, skip: int = 0, limit: int = 50):
+async def admin_get_stories(request: Request, skip: int = 0, limit: int = 50, cursor: Optional[str] = None):
     """Get all stories (admin only)"""
     await require_admin(request)
     
-    stories = await db.stories.find(
-        {},
-        {"_id": 0, "audio_base64": 0}  # Exclude large audio data
-    ).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
+    stories, next_cursor = await fetch_page(
+        db.stories, {}, {"_id": 0, "audio_base64": 0},  # Exclude large audio data
+        "created_at", -1, limit, cursor, skip=skip
+    )
     
-    total = await db.stories.count_documents({})
+    # Unfiltered total from collection metadata - no collection scan
+    total = await db.stories.estimated_document_count()
     
-    return {"stories": stories, "total": total}
+    return {"stories": stories, "total": total, "next_cursor": next_cursor}
 
 
 @api_router.delete("/admin/stories/{story_id}")
@@ -1617,11 +2711,16 @@ async def admin_delete_story(story_id: str, request: Request):
     """Delete any story (admin only)"""
     await require_admin(request)
     
-    result = await db.stories.delete_one({"id": story_id})
+    deleted = await db.stories.find_one_and_delete(
+        {"id": story_id},
+        projection={"_id": 0, "user_id": 1}
+    )
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Masal bulunamadı")
     
+    await after_story_deleted(story_id, deleted.get("user_id"))
+    
     return {"success": True, "message": "Masal silindi"}
 
 
@@ -1660,6 +2759,11 @@ async def admin_update_credit_request(request_id: str, request: Request):
         {"$set": {"status": new_status}}
     )
     
+    if credit_req["status"] == "pending" and new_status != "pending":
+        await bump_stats({"pending_requests": -1})
+    elif credit_req["status"] != "pending" and new_status == "pending":
+        await bump_stats({"pending_requests": 1})
+    
     # If approved, add credits to user
     if new_status == "approved":
         credits_to_add = body.get("credits", credit_req["requested_credits"])
@@ -1667,6 +2771,8 @@ async def admin_update_credit_request(request_id: str, request: Request):
             {"user_id": credit_req["user_id"]},
             {"$inc": {"credits": credits_to_add}}
         )
+        forget_user(credit_req["user_id"])
+        await bump_stats(daily={"credits_granted": credits_to_add})
     
     return {"success": True, "message": "Talep güncellendi"}
 
@@ -1676,9 +2782,9 @@ async def admin_get_stats(request: Request):
     """Get admin dashboard stats"""
     await require_admin(request)
     
-    total_users = await db.users.count_documents({"role": "user"})
-    total_stories = await db.stories.count_documents({})
-    pending_requests = await db.credit_requests.count_documents({"status": "pending"})
+    counters = await db.counters.find_one({"_id": STATS_COUNTERS_ID})
+    if not counters or "reconciled_at" not in counters:
+        counters = await reconcile_counters()
     
     # Recent users
     recent_users = await db.users.find(
@@ -1687,13 +2793,151 @@ async def admin_get_stats(request: Request):
     ).sort("created_at", -1).limit(5).to_list(5)
     
     return {
-        "total_users": total_users,
-        "total_stories": total_stories,
-        "pending_requests": pending_requests,
+        "total_users": counters.get("users", 0),
+        "total_stories": counters.get("stories", 0),
+        "pending_requests": counters.get("pending_requests", 0),
         "recent_users": recent_users
     }
 
 
+@api_router.get("/admin/stats/timeseries")
+async def admin_get_stats_timeseries(request: Request, days: int = 30):
+    """Daily stories created, plays, signups and credits granted (admin only)"""
+    await require_admin(request)
+    
+    days = max(1, min(days, 365))
+    today = datetime.now(timezone.utc).date()
+    dates = [(today - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+    
+    buckets = await db.daily_stats.find(
+        {"_id": {"$gte": dates[0]}}
+    ).to_list(days)
+    bucket_map = {b["_id"]: b for b in buckets}
+    
+    series = []
+    for date in dates:
+        bucket = bucket_map.get(date, {})
+        series.append({"date": date, **{field: bucket.get(field, 0) for field in DAILY_STAT_FIELDS}})
+    
+    return {"days": days, "series": series}
+
+
+@api_router.get("/admin/story-pool")
+async def admin_get_story_pool(request: Request):
+    """Warm pool contents and today's budget usage (admin only)"""
+    await require_admin(request)
+    
+    pipeline = [
+        {"$group": {
+            "_id": {
+                "topic_id": "$topic_id",
+                "subtopic_id": "$subtopic_id",
+                "age_group": "$age_group",
+                "kazanim_based": "$kazanim_based"
+            },
+            "ready": {"$sum": 1}
+        }},
+        {"$sort": {"ready": -1}}
+    ]
+    groups = await db.story_pool.aggregate(pipeline).to_list(None)
+    
+    return {
+        "enabled": STORY_POOL_ENABLED,
+        "combinations": [{**g["_id"], "ready": g["ready"]} for g in groups],
+        "budget_remaining_today": await pool_budget_remaining()
+    }
+
+
+@api_router.get("/admin/tts-cache")
+async def admin_get_tts_cache(request: Request):
+    """TTS audio cache size and hit rate (admin only)"""
+    await require_admin(request)
+    return audio_cache.stats()
+
+@api_router.get("/admin/cache-invalidation")
+async def admin_get_cache_invalidation(request: Request):
+    """Invalidation bus mode, change stream events and in-process cache hit rates (admin only)"""
+    await require_admin(request)
+    return invalidation_bus.stats()
+
+
+@api_router.get("/admin/audio-backfill")
+async def admin_get_audio_backfill(request: Request):
+    """Audio backfill backlog, today's budget usage and last pass (admin only)"""
+    await require_admin(request)
+    
+    backlog = await db.stories.aggregate([
+        {"$match": {"audio_pending": True}},
+        {"$group": {
+            "_id": {"$gte": [{"$ifNull": ["$audio_backfill_attempts", 0]}, AUDIO_BACKFILL_MAX_ATTEMPTS]},
+            "stories": {"$sum": 1},
+            "chars": {"$sum": {"$min": [{"$strLenCP": "$content"}, TTS_MAX_CHARS]}}
+        }}
+    ]).to_list(2)
+    remaining = next((b for b in backlog if not b["_id"]), {"stories": 0, "chars": 0})
+    given_up = next((b["stories"] for b in backlog if b["_id"]), 0)
+    
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    bucket = await db.daily_stats.find_one({"_id": today}) or {}
+    chars_used = bucket.get("audio_backfill_chars", 0)
+    
+    return {
+        "enabled": AUDIO_BACKFILL_ENABLED,
+        "window": AUDIO_BACKFILL_HOURS,
+        "in_window": in_backfill_window(),
+        "backlog_stories": remaining["stories"],
+        "backlog_chars": remaining["chars"],
+        "failed_stories": given_up,
+        "backfilled_today": bucket.get("audio_backfilled", 0),
+        "chars_used_today": chars_used,
+        "chars_remaining_today": max(0, AUDIO_BACKFILL_DAILY_CHARS - chars_used),
+        **audio_backfill_progress
+    }
+
+
+@api_router.post("/admin/migrate-audio-backlog")
+async def admin_migrate_audio_backlog(request: Request):
+    """Flag legacy stories without audio for the backfill worker (admin only)"""
+    await require_admin(request)
+    
+    result = await db.stories.update_many(
+        {"audio_base64": None, "audio_pending": {"$exists": False}},
+        {"$set": {"audio_pending": True}}
+    )
+    return {"success": True, "flagged": result.modified_count}
+
+
+@api_router.get("/admin/llm")
+async def admin_get_llm(request: Request):
+    """LLM provider ranking, latency and error rates (admin only)"""
+    await require_admin(request)
+    return llm_router.stats_snapshot()
+
+
+@api_router.get("/admin/mongo/slow-queries")
+async def admin_get_slow_queries(request: Request, limit: int = 20):
+    """Query shapes with slow executions, by total time spent (admin only)"""
+    await require_admin(request)
+    return {
+        "slow_ms": mongo_monitor.slow_ms,
+        "shapes": mongo_monitor.top_slow_shapes(max(1, min(limit, MAX_PAGE_SIZE)))
+    }
+
+
+@api_router.get("/admin/executors")
+async def admin_get_executors(request: Request):
+    """Pool sizes and queue depth of the blocking-work executors (admin only)"""
+    await require_admin(request)
+    return executor_stats()
+
+
+@api_router.get("/admin/admission")
+async def admin_get_admission(request: Request):
+    """Rate limit counters and LLM/TTS queue metrics (admin only)"""
+    await require_admin(request)
+    return admission.stats()
+
+
 @api_router.post("/admin/migrate-slugs")
 async def admin_migrate_slugs(request: Request):
     """Generate slugs for all stories that don't have one (admin only)"""
@@ -1723,6 +2967,40 @@ async def admin_migrate_slugs(request: Request):
     }
 
 
+@api_router.post("/admin/migrate-creators")
+async def admin_migrate_creators(request: Request):
+    """Store the creator snapshot on stories saved before it existed (admin only)"""
+    await require_admin(request)
+    
+    user_ids = await db.stories.distinct(
+        "user_id",
+        {"user_id": {"$nin": [None, ""]}, "creator_name": {"$exists": False}}
+    )
+    
+    for user_id in user_ids:
+        await fan_out_creator_snapshot(user_id)
+    
+    return {
+        "success": True,
+        "message": f"{len(user_ids)} kullanıcının masalları güncellendi",
+        "updated_users": len(user_ids)
+    }
+
+
+@api_router.post("/admin/migrate-favorites")
+async def admin_migrate_favorites(request: Request):
+    """Move legacy users.favorites arrays into the favorites collection (admin only)"""
+    await require_admin(request)
+    
+    migrated_count = await migrate_legacy_favorites()
+    
+    return {
+        "success": True,
+        "message": f"{migrated_count} favori taşındı",
+        "migrated_count": migrated_count
+    }
+
+
 # Include router
 app.include_router(api_router)
 
@@ -1750,15 +3028,167 @@ import os
 extra_origins = os.environ.get("CORS_ORIGINS", "").split(",")
 ALLOWED_ORIGINS.extend([o.strip() for o in extra_origins if o.strip()])
 
+# Conditional caching - route template -> Cache-Control policy
+# Topic catalog only changes with a deploy, but its URLs are unversioned: short
+# max-age and ETag revalidation rather than immutable. Stories only change their play_count
+CACHE_POLICIES = [
+    ("/api/topics", "public, max-age=3600, stale-while-revalidate=86400"),
+    ("/api/topics/{topic_id}", "public, max-age=3600, stale-while-revalidate=86400"),
+    ("/api/topics/{topic_id}/subtopics", "public, max-age=3600, stale-while-revalidate=86400"),
+    ("/api/subtopics/all", "public, max-age=3600, stale-while-revalidate=86400"),
+    ("/api/masal/{slug}", "public, max-age=300, stale-while-revalidate=3600"),
+    ("/api/stories/popular", "public, max-age=60, stale-while-revalidate=300"),
+]
+
+app.add_middleware(ConditionalCacheMiddleware, policies=CACHE_POLICIES)
+
+app.add_middleware(
+    MongoRequestBudgetMiddleware,
+    max_commands=int(os.environ.get("MONGO_REQUEST_MAX_COMMANDS", "20")),
+    max_mongo_ms=float(os.environ.get("MONGO_REQUEST_MAX_MS", "500")),
+    n_plus_one=int(os.environ.get("MONGO_N_PLUS_ONE_THRESHOLD", "5"))
+)
+
+app.add_middleware(
+    ServerTimingMiddleware,
+    paths=["/api/stories/generate"],
+    log_sample_rate=float(os.environ.get("SERVER_TIMING_LOG_SAMPLE", "0.1")),
+    slow_ms=float(os.environ.get("SERVER_TIMING_SLOW_MS", "30000"))
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=ALLOWED_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Outermost (added last) so its latency includes CORS and caching
+app.add_middleware(MetricsMiddleware)
+
+
+@app.on_event("startup")
+async def create_indexes():
+    """Create the indexes the hot queries rely on (idempotent)"""
+    try:
+        # Keyset pagination: (sort key, id) compound indexes
+        await db.stories.create_index([("created_at", -1), ("id", -1)])
+        await db.stories.create_index([("play_count", -1), ("id", -1)])
+        await db.stories.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
+        await db.stories.create_index([("topic_id", 1), ("play_count", -1), ("id", -1)])
+        await db.stories.create_index([("topic_id", 1), ("created_at", -1), ("id", -1)])
+        await db.stories.create_index([("subtopic_id", 1), ("play_count", -1), ("id", -1)])
+        await db.stories.create_index("id")
+        await db.stories.create_index("slug")
+        await db.users.create_index([("created_at", -1), ("user_id", -1)])
+        await db.users.create_index("user_id")
+        await db.users.create_index("email")
+        await db.user_sessions.create_index("session_token")
+        await db.favorites.create_index([("user_id", 1), ("story_id", 1)], unique=True)
+        await db.favorites.create_index([("user_id", 1), ("added_at", -1), ("story_id", -1)])
+        await db.favorites.create_index("story_id")
+        await db.audio_renditions.create_index([("story_id", 1), ("rendition", 1)], unique=True)
+        await db.rate_limits.create_index("updated_at", expireAfterSeconds=3600)
+        await db.generation_activity.create_index("started_at", expireAfterSeconds=3600)
+        # Audio backfill: only stories still waiting for audio are indexed
+        await db.stories.create_index(
+            [("audio_pending", 1), ("created_at", -1)],
+            partialFilterExpression={"audio_pending": True}
+        )
+        await db.story_pool.create_index([
+            ("topic_id", 1), ("subtopic_id", 1), ("age_group", 1), ("kazanim_based", 1), ("pooled_at", 1)
+        ])
+    except Exception as e:
+        logger.error(f"Index creation failed: {e}")
+
+
+background_jobs: List[asyncio.Task] = []
+
+# Import heavy SDKs and load word lists shortly after startup instead of on
+# the first request that needs them
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_DELAY = float(os.environ.get("WARMUP_DELAY", "1"))
+
+
+def import_heavy_dependencies():
+    """Blocking imports for the warm-up thread"""
+    from google.cloud import texttospeech  # noqa: F401 (grpc)
+    from google.api_core import exceptions  # noqa: F401
+    import openai  # noqa: F401
+    
+    get_profanity()
+    llm_router.warm_up()
+
+
+async def warm_up_dependencies():
+    """Warm heavy imports off the event loop once the server is listening"""
+    await asyncio.sleep(WARMUP_DELAY)
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(import_heavy_dependencies)
+        # Spawn the moderation process pool so its workers load the word lists too
+        await run_blocking("moderation", contains_bad_content, "ısınma")
+    except Exception as e:
+        logger.warning(f"Warm-up failed: {e}")
+        return
+    logger.info(f"Warm-up finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+@app.on_event("startup")
+async def start_background_jobs():
+    """Start periodic maintenance loops"""
+    if WARMUP_ENABLED:
+        background_jobs.append(asyncio.create_task(warm_up_dependencies()))
+    # Every worker tails the change streams for its own caches
+    background_jobs.append(asyncio.create_task(invalidation_bus.start()))
+    # Read at startup, not import: gunicorn.conf.py sets it per worker after the fork
+    if os.environ.get("BACKGROUND_JOBS_ENABLED", "true").lower() != "true":
+        return
+    background_jobs.append(asyncio.create_task(run_legacy_favorites_migration()))
+    background_jobs.append(asyncio.create_task(run_counter_reconciliation()))
+    if STORY_POOL_ENABLED:
+        background_jobs.append(asyncio.create_task(run_story_pool_filler()))
+    if AUDIO_BACKFILL_ENABLED:
+        background_jobs.append(asyncio.create_task(run_audio_backfill()))
+
+
+# Upper bound on waiting for in-flight generations and background writes at shutdown
+SHUTDOWN_DRAIN_TIMEOUT = float(os.environ.get("SHUTDOWN_DRAIN_TIMEOUT", "60"))
+
+
+async def drain_in_flight_work(timeout: float) -> bool:
+    """
+    Wait until no story generation, LLM / TTS call or background job is running.
+    The server has stopped accepting requests by now; loops exit at their next
+    wait once shutdown_event is set.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        busy = (
+            generation_activity["in_flight"]
+            + admission.llm.in_flight
+            + admission.tts.in_flight
+            + sum(1 for job in background_jobs if not job.done())
+        )
+        if not busy:
+            return True
+        await asyncio.sleep(0.2)
+    return False
+
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    shutdown_event.set()
+    started = time.monotonic()
+    if await drain_in_flight_work(SHUTDOWN_DRAIN_TIMEOUT):
+        logger.info(f"Drained in-flight work in {time.monotonic() - started:.1f}s")
+    else:
+        logger.warning(f"Shutdown drain timed out after {SHUTDOWN_DRAIN_TIMEOUT:.0f}s, cancelling remaining work")
+    for job in background_jobs:
+        job.cancel()
+    await asyncio.gather(*background_jobs, return_exceptions=True)
+    await invalidation_bus.stop()
+    shutdown_executors()
     client.close()
@@ -0,0 +1,104 @@
+"""
+MASAL SEPETİ - Server-Timing
+İstek kapsamlı aşama süreleri: Server-Timing başlığı ve örneklenmiş yapılandırılmış log
+"""
+
+import json
+import logging
+import random
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from starlette.datastructures import MutableHeaders
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_UNSAFE = re.compile(r"[^A-Za-z0-9_\-]")
+
+
+class SpanRecorder:
+    """Named stage durations of one request; repeated stages accumulate"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: Dict[str, float] = {}  # name -> milliseconds, in first-seen order
+
+    def add(self, name: str, milliseconds: float):
+        self.spans[name] = self.spans.get(name, 0.0) + milliseconds
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def header(self) -> str:
+        parts = [f"{_TOKEN_UNSAFE.sub('_', name)};dur={ms:.1f}" for name, ms in self.spans.items()]
+        parts.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[SpanRecorder]] = ContextVar("server_timing", default=None)
+
+
+@contextmanager
+def span(name: str):
+    """Time a stage of the current request; a no-op outside recorded requests"""
+    recorder = _current.get()
+    if recorder is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add(name, (time.perf_counter() - started) * 1000)
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware for the configured paths: installs a SpanRecorder for
+    the request, adds the Server-Timing header when the response starts and
+    logs one JSON line per request for a sample of requests (always for slow
+    ones).
+    """
+
+    def __init__(self, app, paths: List[str], log_sample_rate: float = 0.1, slow_ms: float = 30000):
+        self.app = app
+        self.paths = set(paths)
+        self.log_sample_rate = log_sample_rate
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        recorder = SpanRecorder()
+        token = _current.set(recorder)
+        status = 500
+        # Snapshot at response start: background tasks run afterwards in the same call
+        snapshot = None
+
+        async def send_with_timing(message):
+            nonlocal status, snapshot
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                snapshot = (recorder.total_ms(), dict(recorder.spans))
+                MutableHeaders(scope=message).append("Server-Timing", recorder.header())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            total_ms, spans = snapshot or (recorder.total_ms(), recorder.spans)
+            if total_ms >= self.slow_ms or random.random() < self.log_sample_rate:
+                logger.info(json.dumps({
+                    "event": "server_timing",
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "total_ms": round(total_ms, 1),
+                    "spans": {name: round(ms, 1) for name, ms in spans.items()}
+                }))
@@ -3,6 +3,11 @@ MASAL SEPETİ - Konu Havuzu ve Kazanım Veritabanı
 Zengin konu listesi ve pedagojik kazanımlar
 """
 
+import json
+import re
+from collections import defaultdict
+from types import MappingProxyType
+
 TOPICS_DATABASE = {
     "vucudumuz": {
         "id": "vucudumuz",
@@ -358,10 +363,27 @@ KAZANIM_CATEGORIES = {
     }
 }
 
-def get_all_topics():
-    """Tüm ana kategorileri döndür"""
-    return [
-        {
+# ============= PRECOMPUTED INDEXES =============
+# Katalog statik veridir: tüm görünümler import sırasında bir kez üretilir ve
+# salt okunur (MappingProxyType / tuple) olarak paylaşılır.
+
+def _freeze(value):
+    """Recursively wrap dicts in MappingProxyType and lists in tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _to_json_bytes(value) -> bytes:
+    """Serialize exactly like FastAPI's JSONResponse so ETags stay stable"""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def _build_indexes():
+    topics = []
+    flat = []
+    for topic_id, topic in TOPICS_DATABASE.items():
+        topics.append({
             "id": topic["id"],
             "name": topic["name"],
             "icon": topic["icon"],
@@ -369,56 +391,218 @@ def get_all_topics():
             "description": topic["description"],
             "image": topic["image"],
             "subtopic_count": len(topic["subtopics"])
-        }
-        for topic in TOPICS_DATABASE.values()
-    ]
+        })
+        for subtopic in topic["subtopics"]:
+            flat.append({
+                "topic_id": topic_id,
+                "topic_name": topic["name"],
+                "topic_color": topic["color"],
+                "subtopic_id": subtopic["id"],
+                "subtopic_name": subtopic["name"],
+                "kazanim": subtopic["kazanim"]
+            })
+    return topics, flat
+
+_all_topics, _all_subtopics_flat = _build_indexes()
+
+# Pre-serialized JSON bodies returned as-is by the /api/topics* routes
+TOPICS_JSON = _to_json_bytes(_all_topics)
+SUBTOPICS_FLAT_JSON = _to_json_bytes(_all_subtopics_flat)
+TOPIC_DETAIL_JSON = MappingProxyType({
+    topic_id: _to_json_bytes(topic) for topic_id, topic in TOPICS_DATABASE.items()
+})
+TOPIC_SUBTOPICS_JSON = MappingProxyType({
+    topic_id: _to_json_bytes(topic["subtopics"]) for topic_id, topic in TOPICS_DATABASE.items()
+})
+
+_ALL_TOPICS = _freeze(_all_topics)
+_ALL_SUBTOPICS_FLAT = _freeze(_all_subtopics_flat)
+_TOPICS = _freeze(TOPICS_DATABASE)
+_SUBTOPIC_INDEX = MappingProxyType({
+    (topic_id, subtopic["id"]): subtopic
+    for topic_id, topic in _TOPICS.items()
+    for subtopic in topic["subtopics"]
+})
+del _all_topics, _all_subtopics_flat
+
+# ============= SEARCH INDEX =============
+# Türkçe büyük/küçük harf katlama + trigram posting listesi. Kelime dağarcığı
+# küçük olduğundan bulanık eşleşme kelime düzeyinde yapılır.
+
+_TURKISH_UPPER = str.maketrans({"İ": "i", "I": "ı"})
+_ASCII_FOLD = str.maketrans({"ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u", "â": "a", "î": "i", "û": "u"})
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+# Field weights for ranking
+SEARCH_FIELD_WEIGHTS = {
+    "subtopic_name": 3.0,
+    "kazanim": 2.0,
+    "topic_name": 1.5,
+    "category_name": 1.0,
+}
+PHRASE_BONUS = 2.0
+MIN_WORD_SIMILARITY = 0.4
+
+def turkish_fold(text: str) -> str:
+    """Turkish-aware lowercase (İ->i, I->ı) followed by diacritic folding"""
+    return text.translate(_TURKISH_UPPER).lower().translate(_ASCII_FOLD)
+
+def _tokenize(text: str):
+    return [word for word in _NON_WORD.split(turkish_fold(text or "")) if len(word) > 1]
+
+def _trigrams(word: str):
+    padded = f"${word}$"
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def _build_search_index():
+    categories_by_kazanim = defaultdict(list)
+    for category_id, category in KAZANIM_CATEGORIES.items():
+        for kazanim in category["kazanimlar"]:
+            categories_by_kazanim[kazanim].append(category_id)
+
+    vocabulary = {}
+    word_postings = []
+    doc_categories = []
+    search_text = []
+    category_docs = defaultdict(set)
+
+    for doc_id, entry in enumerate(_ALL_SUBTOPICS_FLAT):
+        categories = categories_by_kazanim.get(entry["kazanim"], [])
+        doc_categories.append(tuple(categories))
+        for category_id in categories:
+            category_docs[category_id].add(doc_id)
+
+        fields = [
+            ("subtopic_name", entry["subtopic_name"]),
+            ("kazanim", entry["kazanim"]),
+            ("topic_name", entry["topic_name"]),
+        ] + [("category_name", KAZANIM_CATEGORIES[c]["name"]) for c in categories]
+        search_text.append(" ".join(" ".join(_tokenize(text)) for _, text in fields[:2]))
+
+        best_weight = {}
+        for field, text in fields:
+            weight = SEARCH_FIELD_WEIGHTS[field]
+            for word in _tokenize(text):
+                if weight > best_weight.get(word, 0.0):
+                    best_weight[word] = weight
+        for word, weight in best_weight.items():
+            if word not in vocabulary:
+                vocabulary[word] = len(word_postings)
+                word_postings.append([])
+            word_postings[vocabulary[word]].append((doc_id, weight))
+
+    words = tuple(vocabulary)
+    word_trigrams = tuple(_trigrams(word) for word in words)
+    trigram_postings = defaultdict(list)
+    for word_id, grams in enumerate(word_trigrams):
+        for gram in grams:
+            trigram_postings[gram].append(word_id)
+
+    return (
+        words,
+        word_trigrams,
+        MappingProxyType({gram: tuple(ids) for gram, ids in trigram_postings.items()}),
+        tuple(tuple(postings) for postings in word_postings),
+        tuple(doc_categories),
+        tuple(search_text),
+        MappingProxyType({c: frozenset(category_docs[c]) for c in KAZANIM_CATEGORIES}),
+    )
+
+(
+    _WORDS,
+    _WORD_TRIGRAMS,
+    _TRIGRAM_POSTINGS,
+    _WORD_POSTINGS,
+    _DOC_CATEGORIES,
+    _SEARCH_TEXT,
+    _CATEGORY_DOCS,
+) = _build_search_index()
+
+def _similar_words(query_word: str):
+    """Yield (word_id, similarity) for indexed words close to query_word"""
+    query_grams = _trigrams(query_word)
+    shared = defaultdict(int)
+    for gram in query_grams:
+        for word_id in _TRIGRAM_POSTINGS.get(gram, ()):
+            shared[word_id] += 1
+    for word_id, count in shared.items():
+        # Dice coefficient over trigrams
+        similarity = 2.0 * count / (len(query_grams) + len(_WORD_TRIGRAMS[word_id]))
+        # Turkish is agglutinative: "önem" should fully match "önemini"
+        if len(query_word) >= 3 and _WORDS[word_id].startswith(query_word):
+            similarity = max(similarity, 0.9)
+        if similarity >= MIN_WORD_SIMILARITY:
+            yield word_id, similarity
+
+def get_all_topics():
+    """Tüm ana kategorileri döndür (salt okunur)"""
+    return _ALL_TOPICS
 
 def get_topic_detail(topic_id: str):
-    """Belirli bir kategorinin detaylarını döndür"""
-    return TOPICS_DATABASE.get(topic_id)
+    """Belirli bir kategorinin detaylarını döndür (salt okunur)"""
+    return _TOPICS.get(topic_id)
 
 def get_subtopics(topic_id: str):
-    """Bir kategorinin alt konularını döndür"""
-    topic = TOPICS_DATABASE.get(topic_id)
+    """Bir kategorinin alt konularını döndür (salt okunur)"""
+    topic = _TOPICS.get(topic_id)
     if topic:
         return topic["subtopics"]
-    return []
+    return ()
 
 def get_subtopic_by_id(topic_id: str, subtopic_id: str):
-    """Belirli bir alt konuyu döndür"""
-    topic = TOPICS_DATABASE.get(topic_id)
-    if topic:
-        for subtopic in topic["subtopics"]:
-            if subtopic["id"] == subtopic_id:
-                return subtopic
-    return None
+    """Belirli bir alt konuyu döndür (salt okunur)"""
+    return _SUBTOPIC_INDEX.get((topic_id, subtopic_id))
+
+def search_by_kazanim(keyword: str, limit: int = 20, category: str = None):
+    """Kazanım, alt konu ve kategori adlarında bulanık arama (sıralı sonuç)"""
+    query_words = _tokenize(keyword)
+    if not query_words:
+        return []
+
+    allowed = _CATEGORY_DOCS.get(category) if category else None
+    if category and allowed is None:
+        return []
+
+    # Every query word must match some indexed word (typos allowed); a document
+    # scores the best weighted similarity per query word
+    scores = None
+    for query_word in query_words:
+        word_scores = defaultdict(float)
+        for word_id, similarity in _similar_words(query_word):
+            for doc_id, weight in _WORD_POSTINGS[word_id]:
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                score = similarity * weight
+                if score > word_scores[doc_id]:
+                    word_scores[doc_id] = score
+        if scores is None:
+            scores = dict(word_scores)
+        else:
+            scores = {doc_id: scores[doc_id] + score for doc_id, score in word_scores.items() if doc_id in scores}
+        if not scores:
+            return []
+
+    # Exact phrase bonus
+    folded_query = " ".join(query_words)
+    for doc_id in scores:
+        if folded_query in _SEARCH_TEXT[doc_id]:
+            scores[doc_id] += PHRASE_BONUS
 
-def search_by_kazanim(keyword: str):
-    """Kazanıma göre konu ara"""
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
     results = []
-    for topic_id, topic in TOPICS_DATABASE.items():
-        for subtopic in topic["subtopics"]:
-            if keyword.lower() in subtopic["kazanim"].lower():
-                results.append({
-                    "topic_id": topic_id,
-                    "topic_name": topic["name"],
-                    "subtopic_id": subtopic["id"],
-                    "subtopic_name": subtopic["name"],
-                    "kazanim": subtopic["kazanim"]
-                })
+    for doc_id, score in ranked:
+        entry = _ALL_SUBTOPICS_FLAT[doc_id]
+        results.append({
+            "topic_id": entry["topic_id"],
+            "topic_name": entry["topic_name"],
+            "subtopic_id": entry["subtopic_id"],
+            "subtopic_name": entry["subtopic_name"],
+            "kazanim": entry["kazanim"],
+            "categories": list(_DOC_CATEGORIES[doc_id]),
+            "score": round(score, 3)
+        })
     return results
 
 def get_all_subtopics_flat():
-    """Tüm alt konuları düz liste olarak döndür"""
-    results = []
-    for topic_id, topic in TOPICS_DATABASE.items():
-        for subtopic in topic["subtopics"]:
-            results.append({
-                "topic_id": topic_id,
-                "topic_name": topic["name"],
-                "topic_color": topic["color"],
-                "subtopic_id": subtopic["id"],
-                "subtopic_name": subtopic["name"],
-                "kazanim": subtopic["kazanim"]
-            })
-    return results
+    """Tüm alt konuları düz liste olarak döndür (salt okunur)"""
+    return _ALL_SUBTOPICS_FLAT
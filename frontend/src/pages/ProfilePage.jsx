@@ -18,6 +18,9 @@ export default function ProfilePage() {
   const [editing, setEditing] = useState(false);
   const [stories, setStories] = useState([]);
   const [favorites, setFavorites] = useState([]);
+  const [favoritesCount, setFavoritesCount] = useState(0);
+  const [favoritesCursor, setFavoritesCursor] = useState(null);
+  const [loadingMoreFavorites, setLoadingMoreFavorites] = useState(false);
   const [loadingStories, setLoadingStories] = useState(true);
   const [loadingFavorites, setLoadingFavorites] = useState(true);
   const [activeTab, setActiveTab] = useState('stories'); // 'stories' or 'favorites'
@@ -57,8 +60,14 @@ export default function ProfilePage() {
 
   const fetchFavorites = async () => {
     try {
-      const response = await authAxios.get(`${API}/favorites`);
+      // The list is paginated; the tab badge shows the full count
+      const [response, countResponse] = await Promise.all([
+        authAxios.get(`${API}/favorites`),
+        authAxios.get(`${API}/favorites/count`)
+      ]);
       setFavorites(Array.isArray(response.data) ? response.data : []);
+      setFavoritesCursor(response.headers['x-next-cursor'] || null);
+      setFavoritesCount(countResponse.data?.count || 0);
     } catch (error) {
       console.error('Error fetching favorites:', error);
     } finally {
@@ -66,6 +75,23 @@ export default function ProfilePage() {
     }
   };
 
+  const loadMoreFavorites = async () => {
+    if (!favoritesCursor || loadingMoreFavorites) return;
+    setLoadingMoreFavorites(true);
+    try {
+      const response = await authAxios.get(`${API}/favorites`, {
+        params: { cursor: favoritesCursor }
+      });
+      const page = Array.isArray(response.data) ? response.data : [];
+      setFavorites(prev => [...prev, ...page]);
+      setFavoritesCursor(response.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error fetching favorites:', error);
+    } finally {
+      setLoadingMoreFavorites(false);
+    }
+  };
+
   const handleSaveProfile = async () => {
     setSavingProfile(true);
     try {
@@ -278,7 +304,7 @@ export default function ProfilePage() {
               <Heart className="w-4 h-4 inline mr-1 sm:mr-2" />
               <span className="hidden sm:inline">Favorilerim</span>
               <span className="sm:hidden">Favoriler</span>
-              ({favorites.length})
+              ({favoritesCount})
             </button>
             <div className="hidden sm:flex flex-1" />
             {activeTab === 'stories' && (
@@ -354,15 +380,25 @@ export default function ProfilePage() {
                   </Link>
                 </div>
               ) : (
-                <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-6">
-                  {favorites.map((story) => (
-                    <StoryCard 
-                      key={story.id} 
-                      story={story} 
-                      showFavorite={false}
-                    />
-                  ))}
-                </div>
+                <>
+                  <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-6">
+                    {favorites.map((story) => (
+                      <StoryCard 
+                        key={story.id} 
+                        story={story} 
+                        showFavorite={false}
+                      />
+                    ))}
+                  </div>
+                  {favoritesCursor && (
+                    <div className="text-center mt-6">
+                      <Button variant="outline" onClick={loadMoreFavorites} disabled={loadingMoreFavorites}>
+                        {loadingMoreFavorites && <Loader2 className="w-4 h-4 mr-2 animate-spin" />}
+                        Daha fazla göster
+                      </Button>
+                    </div>
+                  )}
+                </>
               )}
             </>
           )}
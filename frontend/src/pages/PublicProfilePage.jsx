@@ -3,6 +3,7 @@ import { useParams, Link } from 'react-router-dom';
 import axios from 'axios';
 import { User, BookOpen, Clock, Play, Calendar, Loader2 } from 'lucide-react';
 import Navbar from '@/components/Navbar';
+import { Button } from '@/components/ui/button';
 import { API } from '@/config/api';
 
 export default function PublicProfilePage() {
@@ -10,6 +11,7 @@ export default function PublicProfilePage() {
   const [profile, setProfile] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchProfile();
@@ -27,6 +29,25 @@ export default function PublicProfilePage() {
     }
   };
 
+  const loadMoreStories = async () => {
+    if (!profile?.next_cursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await axios.get(`${API}/users/public/${userId}`, {
+        params: { cursor: profile.next_cursor }
+      });
+      setProfile(prev => ({
+        ...prev,
+        stories: [...prev.stories, ...response.data.stories],
+        next_cursor: response.data.next_cursor
+      }));
+    } catch (error) {
+      console.error('Error fetching stories:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const formatDate = (dateString) => {
     if (!dateString) return '';
     return new Date(dateString).toLocaleDateString('tr-TR', {
@@ -135,6 +156,14 @@ export default function PublicProfilePage() {
                   </div>
                 </Link>
               ))}
+              {profile?.next_cursor && (
+                <div className="text-center mt-2">
+                  <Button variant="outline" onClick={loadMoreStories} disabled={loadingMore}>
+                    {loadingMore && <Loader2 className="w-4 h-4 mr-2 animate-spin" />}
+                    Daha fazla göster
+                  </Button>
+                </div>
+              )}
             </div>
           )}
         </div>
@@ -39,6 +39,7 @@ export default function StoryDetailPage() {
   const [isPopularStory, setIsPopularStory] = useState(false);
   const [isFavorite, setIsFavorite] = useState(false);
   const [favoriteLoading, setFavoriteLoading] = useState(false);
+  const [audioUnavailable, setAudioUnavailable] = useState(false);
 
   useEffect(() => {
     fetchStory();
@@ -58,6 +59,10 @@ export default function StoryDetailPage() {
     }
   }, [story?.slug, isNewRoute, storyIdentifier, navigate]);
 
+  // Audio is streamed from the rendition endpoint (mp3 or opus, by Accept header)
+  const audioUrl = story ? `${API}/stories/${story.id}/audio` : null;
+  const hasAudio = Boolean(story && !story.audio_pending && !audioUnavailable);
+
   const checkFavorite = async () => {
     try {
       const response = await authAxios.get(`${API}/favorites/check/${story.id}`);
@@ -111,6 +116,7 @@ export default function StoryDetailPage() {
         : `${API}/stories/${storyIdentifier}`;
       const response = await axios.get(endpoint);
       setStory(response.data);
+      setAudioUnavailable(false);
     } catch (error) {
       console.error("Error fetching story:", error);
       toast.error("Masal yüklenirken hata oluştu");
@@ -248,21 +254,19 @@ export default function StoryDetailPage() {
     downloadStory();
   };
 
-  const downloadStory = () => {
-    if (!story || !story.audio_base64) {
+  const downloadStory = async () => {
+    if (!story || !hasAudio) {
       toast.error("Ses dosyası bulunamadı");
       return;
     }
     
     try {
-      // Convert base64 to blob
-      const byteCharacters = atob(story.audio_base64);
-      const byteNumbers = new Array(byteCharacters.length);
-      for (let i = 0; i < byteCharacters.length; i++) {
-        byteNumbers[i] = byteCharacters.charCodeAt(i);
-      }
-      const byteArray = new Uint8Array(byteNumbers);
-      const blob = new Blob([byteArray], { type: 'audio/mpeg' });
+      // Downloads are always the original MP3 rendition
+      const response = await axios.get(audioUrl, {
+        params: { rendition: 'mp3' },
+        responseType: 'blob'
+      });
+      const blob = new Blob([response.data], { type: 'audio/mpeg' });
       
       // Create download link
       const url = URL.createObjectURL(blob);
@@ -396,13 +400,15 @@ export default function StoryDetailPage() {
       />
 
       {/* Hidden Audio Element */}
-      {story.audio_base64 && (
+      {hasAudio && (
         <audio
           ref={audioRef}
-          src={`data:audio/mp3;base64,${story.audio_base64}`}
+          src={audioUrl}
+          preload="metadata"
           onTimeUpdate={handleTimeUpdate}
           onLoadedMetadata={handleLoadedMetadata}
           onEnded={handleEnded}
+          onError={() => setAudioUnavailable(true)}
         />
       )}
 
@@ -531,7 +537,7 @@ export default function StoryDetailPage() {
         )}
 
         {/* Audio Player */}
-        {story.audio_base64 && (
+        {hasAudio && (
           <div className="audio-player mb-8 animate-slide-up stagger-1" data-testid="audio-player">
             {/* Main Controls */}
             <div className="flex items-center justify-center gap-4 mb-6">
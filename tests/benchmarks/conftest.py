@@ -0,0 +1,38 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py reads these at import; no connection is made until a query runs
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "masal_benchmarks")
+os.environ.setdefault("TTS_CACHE_BACKEND", "off")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: wall-clock benchmark, runs only with BENCH_ENABLED=1")
+
+
+def pytest_collection_modifyitems(config, items):
+    from .runner import ENABLED
+
+    if ENABLED:
+        return
+    skip = pytest.mark.skip(reason="wall-clock benchmark; set BENCH_ENABLED=1 to run")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter):
+    from .runner import RESULTS
+
+    if not RESULTS:
+        return
+    terminalreporter.section("benchmarks")
+    for name, result in RESULTS.items():
+        terminalreporter.write_line(f"{name}: {result}")
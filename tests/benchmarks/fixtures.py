@@ -0,0 +1,49 @@
+"""Deterministic Turkish inputs for the hot-function benchmarks"""
+
+import random
+
+_VOCABULARY = (
+    "bir varmış bir yokmuş evvel zaman içinde kalbur saman içinde küçük tavşan "
+    "ormanın derinliklerinde yaşarmış her sabah güneş doğduğunda arkadaşlarıyla "
+    "buluşur çiçeklerin arasında koşar kelebeklerle oynarmış bir gün yaşlı baykuş "
+    "ona sabırlı olmanın önemini anlatmış tavşan önce anlamamış ama zamanla "
+    "paylaşmanın ve yardımlaşmanın değerini öğrenmiş ağaçlar rüzgârda şarkı söylermiş "
+    "dere kenarındaki kurbağa neşeyle zıplar sincap fındıklarını özenle saklarmış "
+    "gökyüzü masmavi bulutlar pamuk gibiymiş çocuklar bu masalı çok sevmiş"
+).split()
+
+
+def turkish_story(words: int = 1200, seed: int = 7) -> str:
+    """A story-like text of the given length with Turkish punctuation and casing"""
+    rng = random.Random(seed)
+    sentences = []
+    remaining = words
+    while remaining > 0:
+        length = min(remaining, rng.randint(6, 14))
+        sentence = " ".join(rng.choice(_VOCABULARY) for _ in range(length))
+        sentences.append(sentence.capitalize() + rng.choice([".", ".", "!", "?", ","]))
+        remaining -= length
+    paragraphs = [" ".join(sentences[i:i + 6]) for i in range(0, len(sentences), 6)]
+    return "Başlık: Sabırlı Tavşan\n\n" + "\n\n".join(paragraphs)
+
+
+_LEET = {"a": "4", "e": "3", "i": "1", "o": "0", "s": "$", "t": "7", "b": "8"}
+
+
+def leetspeak(word: str) -> str:
+    return "".join(_LEET.get(ch, ch) for ch in word)
+
+
+def adversarial_input(bad_word: str, seed: int = 11) -> str:
+    """A user theme that hides a bad word with leetspeak, spacing and punctuation"""
+    rng = random.Random(seed)
+    spaced = " ".join(leetspeak(bad_word).upper())
+    filler = " ".join(rng.choice(_VOCABULARY) for _ in range(40))
+    return f"{filler} !!! {spaced} ... {leetspeak(bad_word)}@@ {filler}"
+
+
+LONG_TITLE = (
+    "Çok Uzak Diyarlarda Yaşayan Cesur Küçük Tavşan'ın Ormandaki Bütün Hayvanlara "
+    "Paylaşmanın, Sabrın ve Yardımlaşmanın Önemini Öğrettiği Unutulmaz Büyük Macerası"
+)
+SHORT_TITLE = "Cesur Tavşan'ın Maceraları"
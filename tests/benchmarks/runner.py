@@ -0,0 +1,126 @@
+"""
+Minimal micro-benchmark runner with stored baselines.
+
+Timings are stored relative to a fixed pure-Python calibration workload, so a
+baseline recorded on one machine stays meaningful on another. A benchmark
+fails when its relative cost exceeds the baseline by more than
+BENCH_MAX_REGRESSION percent (default 30).
+
+Work that runs mostly in native code (pydantic-core, orjson) does not track
+the pure-Python calibration, so it is checked as a speedup ratio against the
+code path it replaces instead (check_speedup, no stored baseline).
+
+Wall-clock tests carry the `benchmark` marker and are skipped unless enabled,
+so a plain `pytest tests` never depends on machine load:
+
+    BENCH_ENABLED=1 pytest tests/benchmarks          # compare with baseline.json
+    BENCH_UPDATE_BASELINE=1 pytest tests/benchmarks  # re-record baselines
+
+Measurements are listed in pytest's terminal summary.
+"""
+
+import json
+import os
+import timeit
+from pathlib import Path
+
+import pytest
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+MAX_REGRESSION = float(os.environ.get("BENCH_MAX_REGRESSION", "30"))
+UPDATE_BASELINE = os.environ.get("BENCH_UPDATE_BASELINE") == "1"
+ENABLED = UPDATE_BASELINE or os.environ.get("BENCH_ENABLED") == "1"
+REPEAT = int(os.environ.get("BENCH_REPEAT", "7"))
+MIN_ROUND_SECONDS = 0.02
+
+# name -> one-line result, printed by conftest.pytest_terminal_summary
+RESULTS = {}
+
+
+def _calibration_workload():
+    words = [f"kelime{i}" for i in range(200)]
+    joined = " ".join(sorted(words, reverse=True))
+    return sum(len(part) for part in joined.split(" ") if part.startswith("kelime1"))
+
+
+def _loops(timer: timeit.Timer) -> int:
+    """Smallest power of ten that keeps one round above MIN_ROUND_SECONDS"""
+    number = 1
+    while timer.timeit(number) < MIN_ROUND_SECONDS:
+        number *= 10
+    return number
+
+
+def measure_interleaved(*fns) -> list:
+    """
+    Best-of-REPEAT seconds per call of each fn. Rounds are interleaved so CPU
+    frequency drift and noisy neighbours hit every series alike.
+    """
+    timers = [timeit.Timer(fn) for fn in fns]
+    loops = [_loops(timer) for timer in timers]
+    best = [float("inf")] * len(timers)
+    for _ in range(REPEAT):
+        for i, timer in enumerate(timers):
+            best[i] = min(best[i], timer.timeit(loops[i]) / loops[i])
+    return best
+
+
+def measure(fn) -> tuple:
+    """Best-of-REPEAT seconds per call of fn() and of the calibration workload"""
+    seconds, calibration = measure_interleaved(fn, _calibration_workload)
+    return seconds, calibration
+
+
+def load_baselines() -> dict:
+    if BASELINE_PATH.exists():
+        return json.loads(BASELINE_PATH.read_text())
+    return {}
+
+
+def save_baseline(name: str, relative_cost: float):
+    baselines = load_baselines()
+    baselines[name] = round(relative_cost, 4)
+    BASELINE_PATH.write_text(json.dumps(dict(sorted(baselines.items())), indent=2) + "\n")
+
+
+def report(name: str, result: str):
+    RESULTS[name] = result
+
+
+def check(name: str, fn) -> float:
+    """Benchmark fn() and compare its calibrated cost with the stored baseline; returns seconds per call"""
+    seconds, calibration = measure(fn)
+    relative_cost = seconds / calibration
+    measured = f"{seconds * 1e6:.1f} µs per call, {relative_cost:.2f}x calibration"
+
+    if UPDATE_BASELINE:
+        save_baseline(name, relative_cost)
+        report(name, f"{measured} (baseline recorded)")
+        return seconds
+
+    baseline = load_baselines().get(name)
+    if baseline is None:
+        pytest.fail(f"no baseline for {name}; record it with BENCH_UPDATE_BASELINE=1", pytrace=False)
+
+    change = (relative_cost / baseline - 1) * 100
+    report(name, f"{measured} vs baseline {baseline:.2f}x ({change:+.0f}%)")
+    assert change <= MAX_REGRESSION, (
+        f"{name} regressed {change:.0f}% (limit {MAX_REGRESSION:.0f}%): "
+        f"{measured} vs baseline {baseline:.2f}x"
+    )
+    return seconds
+
+
+def check_speedup(name: str, baseline_fn, fast_fn, min_speedup: float) -> float:
+    """Benchmark fast_fn() against baseline_fn() and require at least min_speedup; returns the speedup"""
+    baseline_seconds, fast_seconds = measure_interleaved(baseline_fn, fast_fn)
+    speedup = baseline_seconds / fast_seconds
+    report(name, (
+        f"{speedup:.1f}x ({baseline_seconds * 1e6:.1f} -> {fast_seconds * 1e6:.1f} µs per call, "
+        f"minimum {min_speedup:.1f}x)"
+    ))
+    assert speedup >= min_speedup, (
+        f"{name}: speedup {speedup:.1f}x below {min_speedup:.1f}x "
+        f"({baseline_seconds * 1e6:.1f} -> {fast_seconds * 1e6:.1f} µs per call)"
+    )
+    return speedup
@@ -0,0 +1,79 @@
+"""Micro-benchmarks for pure functions on the request path (see runner.py)"""
+
+import asyncio
+
+import pytest
+
+from .fixtures import LONG_TITLE, SHORT_TITLE, adversarial_input, turkish_story
+from .runner import check
+
+from moderation import TURKISH_BAD_WORDS, contains_bad_content, normalize_text
+from topics_database import get_subtopic_by_id, get_topic_detail, search_by_kazanim, turkish_fold
+
+pytestmark = pytest.mark.benchmark
+
+STORY = turkish_story(1200)
+# contains_bad_content costs a few ms per word; keep its input short enough to repeat
+SHORT_STORY = turkish_story(100)
+ADVERSARIAL = adversarial_input(next(word for word in TURKISH_BAD_WORDS if len(word) >= 4 and word.isascii()))
+THEME = "Paylaşmak güzeldir"
+
+
+def test_normalize_text_story():
+    check("normalize_text/story_1200_words", lambda: normalize_text(STORY))
+
+
+def test_normalize_text_adversarial():
+    check("normalize_text/adversarial", lambda: normalize_text(ADVERSARIAL))
+
+
+def test_contains_bad_content_story():
+    check("contains_bad_content/story_100_words", lambda: contains_bad_content(SHORT_STORY))
+
+
+def test_contains_bad_content_adversarial():
+    assert contains_bad_content(ADVERSARIAL)[0] is True
+    check("contains_bad_content/adversarial", lambda: contains_bad_content(ADVERSARIAL))
+
+
+def test_contains_bad_content_theme():
+    check("contains_bad_content/short_theme", lambda: contains_bad_content(THEME))
+
+
+def test_generate_slug():
+    from server import generate_slug
+
+    assert generate_slug(SHORT_TITLE, "4-5") == "4-5-cesur-tavsan-in-maceralari"
+    check("generate_slug/short_title", lambda: generate_slug(SHORT_TITLE, "4-5"))
+    check("generate_slug/long_title", lambda: generate_slug(LONG_TITLE, "6-7"))
+
+
+def test_turkish_fold_story():
+    check("turkish_fold/story_1200_words", lambda: turkish_fold(STORY))
+
+
+def test_topic_lookups():
+    from topics_database import TOPICS_DATABASE
+
+    topic_id = list(TOPICS_DATABASE)[-1]
+    subtopic_id = TOPICS_DATABASE[topic_id]["subtopics"][-1]["id"]
+    assert get_subtopic_by_id(topic_id, subtopic_id) is not None
+    check("topics/get_topic_detail", lambda: get_topic_detail(topic_id))
+    check("topics/get_subtopic_by_id", lambda: get_subtopic_by_id(topic_id, subtopic_id))
+
+
+@pytest.mark.parametrize("query", ["sabır", "sabr", "paylaşma yardımlaşma"])
+def test_search_by_kazanim(query):
+    check(f"search_by_kazanim/{query}", lambda: search_by_kazanim(query))
+
+
+def test_enrich_creators_snapshotted():
+    from server import creator_snapshot, enrich_creators
+
+    user = {"user_id": "user_1", "name": "Ayşe Öğretmen", "picture": None}
+    stories = [{"id": f"story_{i}", "user_id": "user_1", **creator_snapshot(user)} for i in range(20)]
+    loop = asyncio.new_event_loop()
+    try:
+        check("enrich_creators/20_snapshotted", lambda: loop.run_until_complete(enrich_creators(stories)))
+    finally:
+        loop.close()
@@ -0,0 +1,61 @@
+"""
+Cold-start budget: `python -X importtime -c "import server"` in a fresh
+interpreter, checked against BENCH_IMPORT_BUDGET_MS (default 1500), and the
+heavy SDKs server.py must only import lazily or in the startup warm-up
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from .conftest import BACKEND_DIR
+from .runner import report
+
+IMPORT_BUDGET_MS = float(os.environ.get("BENCH_IMPORT_BUDGET_MS", "1500"))
+RUNS = 3
+LAZY_MODULES = ["openai", "grpc", "google.cloud.texttospeech", "google.genai", "better_profanity"]
+
+
+def import_time_report() -> dict:
+    """Module -> cumulative import time in microseconds, for one cold import of server"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, "WARMUP_ENABLED": "false"},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    report = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        report[module.strip()] = int(cumulative)
+    return report
+
+
+def format_report(report: dict, limit: int = 15) -> str:
+    top_level = {module: us for module, us in report.items() if "." not in module}
+    rows = sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return "\n".join(f"{us / 1000:9.1f} ms  {module}" for module, us in rows)
+
+
+def test_heavy_sdks_are_imported_lazily():
+    imported = import_time_report()
+    eager = [module for module in LAZY_MODULES if module in imported]
+    assert not eager, f"imported at module load, should be lazy: {eager}"
+
+
+@pytest.mark.benchmark
+def test_server_import_time():
+    reports = [import_time_report() for _ in range(RUNS)]
+    fastest = min(reports, key=lambda imported: imported["server"])
+    elapsed_ms = fastest["server"] / 1000
+    report("import server", f"{elapsed_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+
+    assert elapsed_ms <= IMPORT_BUDGET_MS, (
+        f"import server took {elapsed_ms:.0f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)\n{format_report(fastest)}"
+    )
@@ -0,0 +1,83 @@
+"""
+Serialization cost of a 20-story list response with full content, before
+(response_model validation + stdlib json) and after (trusted-document fast
+path + orjson) - see story_list_response in server.py.
+
+Both paths run mostly in native code, so the check is their speedup ratio
+rather than a calibrated absolute cost.
+"""
+
+import asyncio
+import json
+from typing import List
+
+import pytest
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from .fixtures import turkish_story
+from .runner import check_speedup
+
+# Measured at 8-9x; well above the noise of a ratio of two native workloads
+MIN_SPEEDUP = 4.0
+
+
+def story_documents(count: int = 20) -> list:
+    """Story documents as the list projection returns them, with full content"""
+    from server import STORY_RESPONSE_FIELDS
+
+    stories = []
+    for i in range(count):
+        story = {name: None for name in STORY_RESPONSE_FIELDS}
+        story.update({
+            "id": f"story_{i}",
+            "slug": f"4-5-sabirli-tavsan-{i}",
+            "title": f"Sabırlı Tavşan {i}",
+            "content": turkish_story(600, seed=i),
+            "topic_id": "degerler",
+            "topic_name": "Değerler Eğitimi",
+            "theme": "Sabır",
+            "age_group": "4-5",
+            "audio_pending": False,
+            "duration": 240,
+            "play_count": 100 - i,
+            "created_at": f"2025-01-{i + 1:02d}T10:00:00+00:00",
+            "user_id": "user_1",
+            "creator_name": "Ayşe Öğretmen",
+            "creator_id": "user_1"
+        })
+        stories.append(story)
+    return stories
+
+
+@pytest.fixture
+def serializers():
+    """(before, after) callables rendering the same 20 stories to response bytes"""
+    from server import StoryResponse, story_list_response
+
+    stories = story_documents()
+    # The field FastAPI builds for response_model=List[StoryResponse]
+    field = create_response_field(name="Response_get_stories", type_=List[StoryResponse], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def before() -> bytes:
+        content = loop.run_until_complete(serialize_response(field=field, response_content=stories))
+        return JSONResponse(content).body
+
+    def after() -> bytes:
+        return story_list_response(stories).body
+
+    yield before, after
+    loop.close()
+
+
+def test_fast_path_matches_response_model(serializers):
+    before, after = serializers
+    assert json.loads(before()) == json.loads(after())
+
+
+@pytest.mark.benchmark
+def test_story_list_serialization(serializers):
+    before, after = serializers
+    check_speedup("serialization/story_list_20_speedup", before, after, MIN_SPEEDUP)
@@ -0,0 +1,56 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1] / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# server.py reads these at import; no connection is made until a query runs
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "masal_tests")
+os.environ.setdefault("TTS_CACHE_BACKEND", "off")
+os.environ.setdefault("INVALIDATION_BUS_ENABLED", "false")
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """server module with db swapped for an in-memory mongomock-motor database"""
+    mongomock_motor = pytest.importorskip("mongomock_motor", reason="pip install -r backend/requirements-dev.txt")
+    import server as server_module
+
+    client = mongomock_motor.AsyncMongoMockClient()
+    monkeypatch.setattr(server_module, "client", client)
+    monkeypatch.setattr(server_module, "db", client[os.environ["DB_NAME"]])
+    return server_module
+
+
+@pytest.fixture
+def api(server):
+    """TestClient for server.app; startup hooks (warm-up, background jobs) are not run"""
+    from fastapi.testclient import TestClient
+
+    return TestClient(server.app)
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine (seeding mongomock, calling server helpers) from a sync test"""
+    import asyncio
+
+    return asyncio.run
+
+
+@pytest.fixture
+def auth_headers(server, run):
+    """Bearer headers for a freshly seeded user with a live session"""
+    from datetime import datetime, timedelta, timezone
+
+    run(server.db.users.insert_one({"user_id": "user_test", "email": "test@example.com", "name": "Test", "credits": 3}))
+    run(server.db.user_sessions.insert_one({
+        "user_id": "user_test",
+        "session_token": "test-token",
+        "expires_at": (datetime.now(timezone.utc) + timedelta(days=1)).isoformat(),
+    }))
+    return {"Authorization": "Bearer test-token"}
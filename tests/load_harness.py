@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Hermetic load harness for the Masal Sepeti backend.
+
+Boots server:app in process behind httpx's ASGI transport, replaces the LLM
+and Google TTS with deterministic fakes (configurable latency and error
+injection) and runs a weighted mix of browse / search / play / generate
+sessions at a fixed concurrency. Mongo is a local mongod (--mongo-url) or,
+by default, an in-memory mongomock-motor database (pip install -r
+backend/requirements-dev.txt).
+
+    python tests/load_harness.py --concurrency 20 --duration 30
+    python tests/load_harness.py --mix browse=50,search=20,play=20,generate=10 \\
+        --llm-latency 2.0 --llm-error-rate 0.05 --tts-latency 0.8 --json out.json
+
+Reports throughput and p50/p95/p99 per endpoint. Concurrency limits, rate
+limits and caches behave as configured through the usual environment
+variables; each virtual user gets its own X-Forwarded-For address.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+SEARCH_TERMS = ["sabır", "paylaşma", "dostluk", "sabr", "temizlik", "doga", "saygı", "renkler"]
+THEMES = ["dostluk", "paylaşmak", "cesaret", "yardımlaşma", "sabır"]
+AGE_GROUPS = ["4-5", "5-6", "6-7"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="In-process load test for the Masal Sepeti API")
+    parser.add_argument("--concurrency", type=int, default=10, help="virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to run")
+    parser.add_argument("--mix", default="browse=60,search=20,play=15,generate=5",
+                        help="scenario weights, e.g. browse=60,search=20,play=15,generate=5")
+    parser.add_argument("--seed-stories", type=int, default=200, help="stories inserted before the run")
+    parser.add_argument("--mongo-url", default=None, help="local mongod URL (default: in-memory mongomock)")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="mean fake LLM latency (s)")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--tts-latency", type=float, default=0.3, help="mean fake TTS latency (s)")
+    parser.add_argument("--tts-error-rate", type=float, default=0.0)
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report as JSON")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Environment for server.py; must run before it is imported"""
+    os.environ["MONGO_URL"] = args.mongo_url or "mongodb://localhost:27017"
+    os.environ.setdefault("DB_NAME", f"masal_load_{uuid.uuid4().hex[:8]}")
+    os.environ["LLM_PROVIDERS"] = "stub"
+    os.environ.pop("OPENAI_API_KEY", None)  # skips OpenAI moderation
+    os.environ["GOOGLE_TTS_API_KEY"] = "load-test"
+    os.environ.setdefault("TTS_CACHE_BACKEND", "off")
+    os.environ.setdefault("AUDIO_BACKFILL_ENABLED", "false")
+    os.environ.setdefault("STORY_POOL_ENABLED", "false")
+    os.environ.setdefault("SERVER_TIMING_LOG_SAMPLE", "0")
+    # Virtual users are told apart by the X-Forwarded-For hop a proxy would add
+    os.environ.setdefault("TRUSTED_PROXY_COUNT", "1")
+    # mongomock has no change streams; don't probe the unused MONGO_URL
+    os.environ.setdefault("INVALIDATION_BUS_ENABLED", "true" if args.mongo_url else "false")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+
+def jittered(mean: float) -> float:
+    return max(0.0, random.uniform(0.5, 1.5) * mean)
+
+
+def install_fakes(server, args):
+    """Deterministic stand-ins for the LLM provider and Google Cloud TTS"""
+    from google.api_core import exceptions as google_exceptions
+    from google.cloud import texttospeech
+    from llm_router import LLMRouter, StubProvider
+
+    class FakeLLMProvider(StubProvider):
+        name = "fake"
+        counter = 0
+
+        async def complete(self, system, prompt, temperature, max_tokens):
+            await asyncio.sleep(jittered(args.llm_latency))
+            if random.random() < args.llm_error_rate:
+                raise RuntimeError("injected LLM error")
+            text = await super().complete(system, prompt, temperature, max_tokens)
+            FakeLLMProvider.counter += 1
+            # Unique titles, so slug allocation behaves like production
+            return text.replace(" Masalı", f" Masalı {FakeLLMProvider.counter}", 1)
+
+    class FakeAudio:
+        def __init__(self, size: int):
+            self.audio_content = os.urandom(size)
+
+    class FakeTTSClient:
+        def __init__(self, **kwargs):
+            pass
+
+        def synthesize_speech(self, input, voice, audio_config):
+            # Runs on the TTS thread pool like the real blocking gRPC call
+            time.sleep(jittered(args.tts_latency))
+            if random.random() < args.tts_error_rate:
+                raise google_exceptions.ServiceUnavailable("injected TTS error")
+            return FakeAudio(32 * 1024)
+
+    server.llm_router = LLMRouter([FakeLLMProvider()])
+    texttospeech.TextToSpeechClient = FakeTTSClient
+
+
+def install_database(server, args):
+    if args.mongo_url:
+        return
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("In-memory mode needs mongomock-motor (pip install mongomock-motor) or pass --mongo-url")
+    server.client = AsyncMongoMockClient()
+    server.db = server.client[os.environ["DB_NAME"]]
+
+
+async def seed_stories(server, count: int) -> list:
+    from topics_database import TOPICS_DATABASE
+
+    topics = list(TOPICS_DATABASE.values())
+    audio_base64 = "QUJD" * 2048
+    stories = []
+    for i in range(count):
+        topic = topics[i % len(topics)]
+        subtopic = topic["subtopics"][i % len(topic["subtopics"])]
+        age_group = AGE_GROUPS[i % len(AGE_GROUPS)]
+        stories.append({
+            "id": str(uuid.uuid4()),
+            "slug": f"yuk-testi-masali-{i}-{age_group}",
+            "title": f"Yük Testi Masalı {i}",
+            "content": "Bir varmış bir yokmuş. " * 200,
+            "topic_id": topic["id"],
+            "topic_name": topic["name"],
+            "subtopic_id": subtopic["id"],
+            "subtopic_name": subtopic["name"],
+            "kazanim": subtopic["kazanim"],
+            "theme": subtopic["name"],
+            "age_group": age_group,
+            "character": None,
+            "audio_base64": audio_base64,
+            "duration": 300,
+            "play_count": random.randint(0, 500),
+            "created_at": f"2025-01-01T00:00:{i % 60:02d}.{i:06d}+00:00"
+        })
+    if stories:
+        await server.db.stories.insert_many([dict(story) for story in stories])
+    return stories
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    async def call(self, client, name: str, method: str, url: str, ok=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            status = response.status_code
+        except Exception:
+            response, status = None, "exception"
+        self.latencies[name].append(time.perf_counter() - started)
+        self.statuses[name][status] += 1
+        if status not in ok:
+            self.errors[name] += 1
+        return response
+
+
+async def browse(client, recorder, ctx):
+    await recorder.call(client, "GET /api/topics", "GET", "/api/topics")
+    await recorder.call(client, "GET /api/stories/popular", "GET", "/api/stories/popular")
+    response = await recorder.call(client, "GET /api/stories", "GET", "/api/stories", params={"sort_by": "newest"})
+    cursor = response.headers.get("X-Next-Cursor") if response is not None else None
+    if cursor:
+        await recorder.call(client, "GET /api/stories (page 2)", "GET", "/api/stories",
+                            params={"sort_by": "newest", "cursor": cursor})
+    story = random.choice(ctx["stories"])
+    await recorder.call(client, "GET /api/masal/{slug}", "GET", f"/api/masal/{story['slug']}")
+
+
+async def search(client, recorder, ctx):
+    await recorder.call(client, "GET /api/kazanim/search", "GET", "/api/kazanim/search",
+                        params={"q": random.choice(SEARCH_TERMS)})
+    await recorder.call(client, "GET /api/stories?search", "GET", "/api/stories",
+                        params={"search": random.choice(THEMES)})
+
+
+async def play(client, recorder, ctx):
+    story = random.choice(ctx["stories"])
+    await recorder.call(client, "GET /api/stories/{story_id}", "GET", f"/api/stories/{story['id']}")
+    await recorder.call(client, "GET /api/stories/{story_id}/audio", "GET", f"/api/stories/{story['id']}/audio")
+    await recorder.call(client, "POST /api/stories/{story_id}/play", "POST", f"/api/stories/{story['id']}/play")
+
+
+async def generate(client, recorder, ctx):
+    topic = random.choice(ctx["topics"])
+    await recorder.call(
+        client, "POST /api/stories/generate", "POST", "/api/stories/generate",
+        ok=(200, 429),  # rate limiting is expected behaviour, not an error
+        json={"topic_id": topic, "theme": random.choice(THEMES), "age_group": random.choice(AGE_GROUPS)}
+    )
+
+
+SCENARIOS = {"browse": browse, "search": search, "play": play, "generate": generate}
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            sys.exit(f"Unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+async def virtual_user(index, app, recorder, ctx, weights, deadline):
+    import httpx
+
+    headers = {"X-Forwarded-For": f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", headers=headers, timeout=120) as client:
+        names, values = zip(*weights.items())
+        while time.monotonic() < deadline:
+            scenario = random.choices(names, values)[0]
+            await SCENARIOS[scenario](client, recorder, ctx)
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(q * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def build_report(recorder, elapsed: float, args) -> dict:
+    endpoints = {}
+    for name, latencies in sorted(recorder.latencies.items()):
+        latencies = sorted(latencies)
+        endpoints[name] = {
+            "requests": len(latencies),
+            "errors": recorder.errors[name],
+            "rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+            "statuses": {str(k): v for k, v in recorder.statuses[name].items()}
+        }
+    total = sum(e["requests"] for e in endpoints.values())
+    return {
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": args.mix,
+            "mongo": "mongod" if args.mongo_url else "mongomock",
+            "llm_latency": args.llm_latency,
+            "llm_error_rate": args.llm_error_rate,
+            "tts_latency": args.tts_latency,
+            "tts_error_rate": args.tts_error_rate
+        },
+        "elapsed_seconds": round(elapsed, 2),
+        "total_requests": total,
+        "total_rps": round(total / elapsed, 2),
+        "endpoints": endpoints
+    }
+
+
+def print_report(report: dict):
+    print(f"\n{report['total_requests']} requests in {report['elapsed_seconds']}s "
+          f"({report['total_rps']} req/s), config: {report['config']}\n")
+    header = f"{'endpoint':42} {'reqs':>6} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, row in report["endpoints"].items():
+        print(f"{name:42} {row['requests']:>6} {row['errors']:>5} {row['rps']:>8} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+
+
+async def main(args):
+    random.seed(args.random_seed)
+    configure_environment(args)
+
+    import server
+
+    install_database(server, args)
+    install_fakes(server, args)
+
+    await server.app.router.startup()
+    try:
+        from topics_database import TOPICS_DATABASE
+
+        ctx = {
+            "stories": await seed_stories(server, args.seed_stories),
+            "topics": list(TOPICS_DATABASE.keys())
+        }
+        weights = parse_mix(args.mix)
+        recorder = Recorder()
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*[
+            virtual_user(i, server.app, recorder, ctx, weights, deadline) for i in range(args.concurrency)
+        ])
+        elapsed = time.monotonic() - started
+    finally:
+        if args.mongo_url:
+            await server.client.drop_database(os.environ["DB_NAME"])
+        await server.app.router.shutdown()
+
+    report = build_report(recorder, elapsed, args)
+    print_report(report)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    return report
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,52 @@
+import pytest
+
+from admission import AdmissionController
+
+STORY = {"topic_id": "vucudumuz", "theme": "Sabır", "age_group": "4-5"}
+
+
+@pytest.fixture
+def limited(server, monkeypatch):
+    """Fresh in-memory buckets (burst 6) behind one trusted proxy; moderation rejects
+    every story, so requests stop right after taking their token"""
+    monkeypatch.setenv("ADMISSION_BACKEND", "memory")
+    monkeypatch.setenv("ADMISSION_IP_BURST", "6")
+    monkeypatch.setenv("ADMISSION_IP_PER_MINUTE", "6")
+    monkeypatch.setattr(server, "admission", AdmissionController())
+    monkeypatch.setattr(server, "TRUSTED_PROXY_COUNT", 1)
+
+    async def reject(**kwargs):
+        return False, "reddedildi"
+
+    monkeypatch.setattr(server, "validate_story_request", reject)
+    return server
+
+
+def test_spoofed_forwarded_for_does_not_reset_ip_limit(api, limited):
+    statuses = [
+        api.post(
+            "/api/stories/generate", json=STORY,
+            headers={"X-Forwarded-For": f"198.51.100.{i}, 203.0.113.7"}
+        ).status_code
+        for i in range(8)
+    ]
+    assert statuses == [400] * 6 + [429] * 2
+    assert limited.admission.rate_rejected["ip"] == 2
+
+
+def test_invalid_requests_do_not_take_tokens(api, limited):
+    headers = {"X-Forwarded-For": "203.0.113.8"}
+    for _ in range(10):
+        response = api.post("/api/stories/generate", json={**STORY, "topic_id": "yok"}, headers=headers)
+        assert response.status_code == 400
+    assert api.post("/api/stories/generate", json=STORY, headers=headers).status_code == 400
+    assert limited.admission.rate_rejected["ip"] == 0
+
+
+def test_forwarded_for_ignored_without_trusted_proxy(api, limited, monkeypatch):
+    monkeypatch.setattr(limited, "TRUSTED_PROXY_COUNT", 0)
+    for i in range(6):
+        api.post("/api/stories/generate", json=STORY, headers={"X-Forwarded-For": f"203.0.113.{i}"})
+    # Every request counted against the socket peer
+    response = api.post("/api/stories/generate", json=STORY, headers={"X-Forwarded-For": "203.0.113.99"})
+    assert response.status_code == 429
@@ -0,0 +1,28 @@
+import asyncio
+
+from fastapi import HTTPException
+
+
+def test_concurrent_reservations_never_exceed_daily_chars(server, run, monkeypatch):
+    monkeypatch.setattr(server, "AUDIO_BACKFILL_DAILY_CHARS", 300)
+
+    async def reserve_many():
+        return await asyncio.gather(*[server.reserve_backfill_chars(100) for _ in range(6)])
+
+    assert sorted(run(reserve_many())) == [False] * 3 + [True] * 3
+    assert run(server.reserve_backfill_chars(1)) is False
+
+
+def test_failed_synthesis_refunds_its_reservation(server, run, monkeypatch):
+    monkeypatch.setattr(server, "AUDIO_BACKFILL_DAILY_CHARS", 100)
+    run(server.db.stories.insert_one({"id": "s1", "content": "x" * 60, "audio_pending": True, "created_at": "2026-01-01"}))
+
+    async def unavailable(text):
+        raise HTTPException(status_code=503, detail="kota")
+
+    monkeypatch.setattr(server, "generate_audio_for_story", unavailable)
+    result = run(server.backfill_audio_batch(ignore_window=True))
+
+    assert result["stopped"] == "tts_unavailable"
+    # The 60 characters went back to the budget
+    assert run(server.reserve_backfill_chars(100)) is True
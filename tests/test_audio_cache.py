@@ -0,0 +1,52 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from audio_cache import GridFSAudioCache, LocalAudioCache
+
+
+def test_local_cache_does_not_touch_disk_until_first_put(tmp_path):
+    directory = tmp_path / "tts_cache"
+    cache = LocalAudioCache(directory, max_bytes=1000)
+    assert not directory.exists()
+    assert asyncio.run(cache.get("missing")) is None
+    assert not directory.exists()
+
+
+def test_max_bytes_holds_across_worker_instances(tmp_path):
+    # Two workers share one directory but keep no shared in-memory state
+    first, second = LocalAudioCache(tmp_path, max_bytes=250), LocalAudioCache(tmp_path, max_bytes=250)
+
+    async def scenario():
+        await first.put("a", b"x" * 100)
+        await second.put("b", b"x" * 100)
+        past = time.time() - 60
+        os.utime(tmp_path / "a.bin", (past, past))
+        os.utime(tmp_path / "b.bin", (past + 1, past + 1))
+        assert await second.get("a") == b"x" * 100  # refreshes a, b is now oldest
+        await first.put("c", b"x" * 100)
+
+    asyncio.run(scenario())
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.bin", "c.bin"]
+    assert first.size_bytes() == 200
+    assert first.evictions == 1
+
+
+def test_gridfs_max_bytes_holds_across_worker_instances():
+    mongomock_motor = pytest.importorskip("mongomock_motor", reason="pip install -r backend/requirements-dev.txt")
+
+    async def scenario():
+        db = mongomock_motor.AsyncMongoMockClient()["masal_tests"]
+        first, second = GridFSAudioCache(db, max_bytes=250), GridFSAudioCache(db, max_bytes=250)
+        await first.put("a", b"x" * 100)
+        await second.put("b", b"x" * 100)
+        await first.put("c", b"x" * 100)
+        return first, sorted(await db["tts_cache.files"].distinct("filename"))
+
+    with mongomock_motor.enabled_gridfs_integration():
+        cache, names = asyncio.run(scenario())
+    assert names == ["b", "c"]
+    assert cache.size_bytes() == 200
+    assert cache.evictions == 1
@@ -0,0 +1,64 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, CircuitBreaker, CircuitOpen
+
+
+def backed_off_breaker() -> CircuitBreaker:
+    """Open breaker whose backoff has elapsed: the next call is the probe"""
+    breaker = CircuitBreaker("tts", failure_threshold=1, base_backoff=30, max_backoff=60)
+    breaker.record_failure("UNAVAILABLE")
+    breaker.opened_at = time.monotonic() - 31
+    return breaker
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = backed_off_breaker()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN and breaker.probe_in_flight
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.backoff == 30
+
+
+def test_cancelled_tts_call_releases_probe(server, monkeypatch):
+    monkeypatch.setenv("GOOGLE_TTS_API_KEY", "test")
+    monkeypatch.setattr(
+        "google.cloud.texttospeech.TextToSpeechClient", lambda **kwargs: SimpleNamespace(synthesize_speech=None)
+    )
+    breaker = backed_off_breaker()
+    monkeypatch.setattr(server, "tts_breaker", breaker)
+
+    async def hang(*args, **kwargs):
+        await asyncio.sleep(3600)
+
+    monkeypatch.setattr(server, "run_blocking", hang)
+
+    async def scenario():
+        task = asyncio.create_task(server.synthesize_speech("Bir varmış bir yokmuş", "mp3"))
+        await asyncio.sleep(0.05)
+        assert breaker.probe_in_flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert not breaker.probe_in_flight
+    breaker.before_call()  # the next call may probe again
+
+
+def test_open_circuit_has_its_own_message(server, monkeypatch):
+    monkeypatch.setenv("GOOGLE_TTS_API_KEY", "test")
+    breaker = CircuitBreaker("tts", failure_threshold=1, base_backoff=30, max_backoff=60)
+    breaker.record_failure("UNAVAILABLE")
+    monkeypatch.setattr(server, "tts_breaker", breaker)
+
+    with pytest.raises(server.HTTPException) as excinfo:
+        asyncio.run(server.synthesize_speech("Bir varmış bir yokmuş", "mp3"))
+    assert excinfo.value.status_code == 503
+    assert "kota" not in excinfo.value.detail
+    assert excinfo.value.headers["Retry-After"] == "30"
@@ -0,0 +1,36 @@
+from types import SimpleNamespace
+
+
+def seed(server, run):
+    run(server.db.users.insert_one({"user_id": "alive", "name": "Ayşe", "surname": "Yılmaz", "picture": "p.png"}))
+    run(server.db.stories.insert_many([
+        {"id": "s1", "user_id": "alive"},
+        {"id": "s2", "user_id": "gone"},
+    ]))
+
+
+def test_deleted_creator_is_tombstoned(server, run):
+    seed(server, run)
+    run(server.clear_creator_snapshot("alive"))
+
+    story = run(server.db.stories.find_one({"id": "s1"}, {"_id": 0}))
+    assert story["creator_deleted"] is True
+    assert story["creator_name"] is None
+
+
+def test_enrich_resolves_missing_creators_once(server, run, monkeypatch):
+    seed(server, run)
+    stories = run(server.db.stories.find({}, {"_id": 0}).sort("id", 1).to_list(10))
+    run(server.enrich_creators(stories))
+
+    assert stories[0]["creator_name"] == "Ayşe Yılmaz"
+    assert stories[1]["creator_name"] is None and stories[1]["creator_deleted"] is True
+    stored = run(server.db.stories.find_one({"id": "s2"}, {"_id": 0}))
+    assert stored["creator_deleted"] is True
+
+    # A tombstoned story is resolved: no further user lookups
+    def no_lookup(*args, **kwargs):
+        raise AssertionError("enrich_creators queried users for a resolved story")
+
+    monkeypatch.setattr(server.db, "users", SimpleNamespace(find=no_lookup))
+    run(server.enrich_creators([stored]))
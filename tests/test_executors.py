@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+from executors import Workload
+
+
+def fail():
+    raise ValueError("boom")
+
+
+def test_failures_are_not_counted_as_completed():
+    workload = Workload("test", "thread", 2)
+
+    async def scenario():
+        assert await workload.run(sum, [1, 2]) == 3
+        with pytest.raises(ValueError):
+            await workload.run(fail)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        workload.shutdown()
+    stats = workload.stats()
+    assert (stats["completed"], stats["failed"], stats["in_flight"]) == (1, 1, 0)
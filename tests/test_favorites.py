@@ -0,0 +1,40 @@
+from pymongo.errors import DuplicateKeyError
+
+
+def seed_story(server, run, story_id):
+    run(server.db.stories.insert_one({"id": story_id, "title": story_id, "content": "...", "user_id": "author"}))
+
+
+def test_lost_upsert_race_is_success(api, server, run, auth_headers, monkeypatch):
+    seed_story(server, run, "s1")
+
+    async def lose_race(*args, **kwargs):
+        raise DuplicateKeyError("E11000 duplicate key error collection: favorites")
+
+    monkeypatch.setattr(server.db.favorites, "update_one", lose_race)
+    response = api.post("/api/favorites/s1", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["success"] is True
+
+
+def test_count_is_not_capped_at_one_page(api, server, run, auth_headers):
+    for i in range(25):
+        seed_story(server, run, f"s{i}")
+        assert api.post(f"/api/favorites/s{i}", headers=auth_headers).status_code == 200
+    api.post("/api/favorites/s0", headers=auth_headers)
+
+    assert len(api.get("/api/favorites", headers=auth_headers).json()) == 20
+    assert api.get("/api/favorites/count", headers=auth_headers).json() == {"count": 25}
+
+
+def test_legacy_migration_keeps_order_and_is_idempotent(api, server, run, auth_headers):
+    for i in range(3):
+        seed_story(server, run, f"s{i}")
+    run(server.db.users.update_one({"user_id": "user_test"}, {"$set": {"favorites": ["s0", "s1", "s2"]}}))
+
+    assert run(server.migrate_legacy_favorites()) == 3
+    assert run(server.migrate_legacy_favorites()) == 0
+
+    # Newest (last appended) first, as with favorites added later
+    favorites = api.get("/api/favorites", headers=auth_headers).json()
+    assert [story["id"] for story in favorites] == ["s2", "s1", "s0"]
@@ -0,0 +1,79 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from http_cache import ConditionalCacheMiddleware, RangeNotSatisfiable, compute_etag, etag_matches, parse_byte_range
+
+
+def make_client():
+    async def topic(request):
+        return JSONResponse({"id": request.path_params["topic_id"]})
+
+    async def missing(request):
+        return PlainTextResponse("yok", status_code=404)
+
+    app = Starlette(routes=[Route("/api/topics/{topic_id}", topic), Route("/api/missing", missing)])
+    app.add_middleware(
+        ConditionalCacheMiddleware,
+        policies=[("/api/topics/{topic_id}", "public, max-age=60"), ("/api/missing", "public, max-age=60")],
+    )
+    return TestClient(app)
+
+
+def test_etag_round_trip_returns_304():
+    client = make_client()
+    first = client.get("/api/topics/hayvanlar")
+    assert first.status_code == 200
+    assert first.headers["etag"] == compute_etag(first.content)
+    assert first.headers["cache-control"] == "public, max-age=60"
+
+    revalidated = client.get("/api/topics/hayvanlar", headers={"If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == first.headers["etag"]
+
+    other = client.get("/api/topics/doga", headers={"If-None-Match": first.headers["etag"]})
+    assert other.status_code == 200
+    assert other.headers["etag"] != first.headers["etag"]
+
+
+def test_errors_are_not_given_validators():
+    response = make_client().get("/api/missing")
+    assert response.status_code == 404
+    assert "etag" not in response.headers
+
+
+def test_etag_matches_weak_and_lists():
+    assert etag_matches('W/"abc", "def"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abc"', '"abcd"')
+    assert not etag_matches(None, '"abc"')
+
+
+def test_topic_catalog_revalidates_instead_of_immutable(api):
+    first = api.get("/api/topics")
+    assert first.status_code == 200
+    assert "immutable" not in first.headers["cache-control"]
+
+    revalidated = api.get("/api/topics", headers={"If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_parse_byte_range():
+    assert parse_byte_range(None, 10) is None
+    assert parse_byte_range("bytes=0-3", 10) == (0, 3)
+    assert parse_byte_range("bytes=5-", 10) == (5, 9)
+    assert parse_byte_range("bytes=-4", 10) == (6, 9)
+    assert parse_byte_range("bytes=-40", 10) == (0, 9)
+    assert parse_byte_range("bytes=8-40", 10) == (8, 9)
+    # Ignored: whole body
+    assert parse_byte_range("bytes=0-1,4-5", 10) is None
+    assert parse_byte_range("items=0-1", 10) is None
+    assert parse_byte_range("bytes=4-1", 10) is None
+    assert parse_byte_range("bytes=x-1", 10) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_byte_range("bytes=10-", 10)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_byte_range("bytes=-0", 10)
@@ -0,0 +1,119 @@
+"""
+Invalidation bus against a real replica set (change streams need one):
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27018
+    mongosh --port 27018 --eval "rs.initiate()"
+    INVALIDATION_TEST_MONGO_URL=mongodb://localhost:27018/?replicaSet=rs0 pytest tests/test_invalidation_bus.py
+
+Skipped when INVALIDATION_TEST_MONGO_URL is not set.
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from invalidation import RESYNC, TTL_ONLY, create_invalidation_bus  # noqa: E402
+
+MONGO_URL = os.environ.get("INVALIDATION_TEST_MONGO_URL")
+
+pytestmark = pytest.mark.skipif(not MONGO_URL, reason="INVALIDATION_TEST_MONGO_URL (replica set) not set")
+
+
+async def wait_until(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out waiting for change stream event"
+        await asyncio.sleep(0.02)
+
+
+def run_with_bus(scenario):
+    async def main():
+        client = AsyncIOMotorClient(MONGO_URL)
+        db = client[f"masal_invalidation_{uuid.uuid4().hex[:8]}"]
+        bus = create_invalidation_bus(db)
+        events = []
+        for collection in bus.collections:
+            bus.subscribe(collection, events.append)
+        await bus.start()
+        try:
+            await wait_until(lambda: bus.live)
+            await scenario(db, bus, events)
+        finally:
+            await bus.stop()
+            await client.drop_database(db.name)
+            client.close()
+
+    asyncio.run(main())
+
+
+def test_story_events_carry_creator_and_skip_play_counts():
+    async def scenario(db, bus, events):
+        await db.stories.insert_one({"id": "s1", "user_id": "u1", "play_count": 0})
+        await db.stories.update_one({"id": "s1"}, {"$inc": {"play_count": 1}})
+        await db.stories.update_one({"id": "s1"}, {"$set": {"duration": 90}})
+        await wait_until(lambda: len(events) >= 2)
+        await asyncio.sleep(0.2)
+
+        assert [event.operation for event in events] == ["insert", "update"]
+        assert all(event.fields["user_id"] == "u1" for event in events)
+        assert events[1].updated_fields == {"duration"}
+
+    run_with_bus(scenario)
+
+
+def test_session_cache_evicted_by_changes_from_another_process():
+    async def scenario(db, bus, events):
+        cache = bus.cache("sessions", maxsize=100, ttl=60, require_live=True)
+        session_id = (await db.user_sessions.insert_one({"session_token": "tok", "user_id": "u1"})).inserted_id
+        user_id = (await db.users.insert_one({"user_id": "u1", "credits": 3})).inserted_id
+        await wait_until(lambda: len(events) >= 2)
+
+        cache.set("tok", "cached", [("user_sessions", "_id", session_id), ("users", "_id", user_id)])
+        await db.users.update_one({"_id": user_id}, {"$inc": {"credits": -1}})
+        await wait_until(lambda: cache.get("tok") is None)
+
+        cache.set("tok", "cached", [("user_sessions", "_id", session_id), ("users", "_id", user_id)])
+        await db.user_sessions.delete_one({"_id": session_id})
+        await wait_until(lambda: cache.get("tok") is None)
+
+    run_with_bus(scenario)
+
+
+def test_stream_failure_publishes_resync():
+    async def scenario(db, bus, events):
+        bus.retry_delay = 0.05
+        cache = bus.cache("sessions", maxsize=100, ttl=60)
+        await db.user_sessions.insert_one({"session_token": "tok", "user_id": "u1"})
+        await wait_until(lambda: len(events) >= 1)
+        cache.set("tok", "cached", [("user_sessions", "_id", "unrelated")])
+        # Dropping the database invalidates every open stream
+        await db.client.drop_database(db.name)
+        await wait_until(lambda: any(event.operation == RESYNC for event in events))
+        assert cache.get("tok") is None
+        await wait_until(lambda: bus.live)
+
+    run_with_bus(scenario)
+
+
+def test_standalone_or_disabled_falls_back_to_ttl_only(monkeypatch):
+    monkeypatch.setenv("INVALIDATION_BUS_ENABLED", "false")
+
+    async def main():
+        client = AsyncIOMotorClient(MONGO_URL)
+        bus = create_invalidation_bus(client["masal_invalidation_disabled"])
+        cache = bus.cache("sessions", maxsize=10, ttl=60, require_live=True)
+        await bus.start()
+        cache.set("tok", "cached", [])
+        assert bus.mode == TTL_ONLY and not bus.live
+        assert cache.get("tok") is None
+        client.close()
+
+    asyncio.run(main())
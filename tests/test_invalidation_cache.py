@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+from bson import ObjectId
+
+from invalidation import CHANGE_STREAMS, DELETE, RESYNC, UPDATE, InvalidationBus, InvalidationEvent, event_from_change
+
+
+def live_bus() -> InvalidationBus:
+    """A bus that believes every stream is open; events are published by hand"""
+    bus = InvalidationBus(None, collections={"stories": ["user_id"], "users": [], "user_sessions": []})
+    bus.mode = CHANGE_STREAMS
+    bus.open_streams = set(bus.collections)
+    return bus
+
+
+def test_event_from_update_carries_key_fields_and_changed_names():
+    story_id = ObjectId()
+    event = event_from_change("stories", {
+        "operationType": "update",
+        "documentKey": {"_id": story_id},
+        "fullDocument": {"user_id": "u1"},
+        "updatedFieldNames": ["title"],
+        "updateDescription": {"removedFields": ["audio_pending"]},
+    }, ["user_id"])
+    assert (event.collection, event.operation) == ("stories", UPDATE)
+    assert event.fields == {"_id": str(story_id), "user_id": "u1"}
+    assert event.updated_fields == {"title", "audio_pending"}
+
+
+def test_event_from_delete_falls_back_to_pre_image_or_id():
+    with_image = event_from_change("stories", {
+        "operationType": "delete",
+        "documentKey": {"_id": "s1"},
+        "fullDocumentBeforeChange": {"user_id": "u2"},
+    }, ["user_id"])
+    assert with_image.fields == {"_id": "s1", "user_id": "u2"}
+
+    without_image = event_from_change("stories", {"operationType": "delete", "documentKey": {"_id": "s1"}}, ["user_id"])
+    assert (without_image.operation, without_image.fields) == (DELETE, {"_id": "s1"})
+
+
+def test_events_drop_only_entries_tagged_with_the_changed_document():
+    bus = live_bus()
+    cache = bus.cache("sessions", maxsize=10, ttl=60, require_live=True)
+    user_id = ObjectId()
+    cache.set("tok1", "a", [("users", "_id", user_id)])
+    cache.set("tok2", "b", [("users", "_id", ObjectId())])
+
+    bus.publish(InvalidationEvent("users", UPDATE, {"_id": str(user_id)}))
+    assert cache.get("tok1") is None
+    assert cache.get("tok2") == "b"
+
+    bus.publish(InvalidationEvent("users", RESYNC))
+    assert cache.get("tok2") is None
+    assert cache.stats()["invalidated"] == 2
+
+
+def test_value_read_across_an_invalidation_is_not_cached():
+    bus = live_bus()
+    cache = bus.cache("sessions", maxsize=10, ttl=60, require_live=True)
+
+    generation = cache.snapshot()
+    # ... the document is read from Mongo, then changed elsewhere before set()
+    bus.publish(InvalidationEvent("users", UPDATE, {"_id": "u1"}))
+    cache.set("tok", "stale", [("users", "_id", "u1")], since=generation)
+    assert cache.get("tok") is None
+    assert cache.stats()["stale_skipped"] == 1
+
+    cache.set("tok", "fresh", [("users", "_id", "u1")], since=cache.snapshot())
+    assert cache.get("tok") == "fresh"
+
+
+def test_require_live_bypasses_cache_when_a_stream_is_down():
+    bus = live_bus()
+    cache = bus.cache("sessions", maxsize=10, ttl=60, require_live=True)
+    cache.set("tok", "cached", [])
+    bus.open_streams.discard("users")
+    assert cache.get("tok") is None
+
+
+def test_load_session_does_not_cache_user_changed_mid_read(server, run, auth_headers, monkeypatch):
+    bus = server.invalidation_bus
+    monkeypatch.setattr(bus, "mode", CHANGE_STREAMS)
+    monkeypatch.setattr(bus, "open_streams", set(bus.collections))
+    users = server.db.users
+
+    async def find_one_then_concurrent_update(*args, **kwargs):
+        user = await users.find_one(*args, **kwargs)
+        bus.publish(InvalidationEvent("users", UPDATE, {"_id": str(user["_id"])}))
+        return user
+
+    monkeypatch.setattr(server.db, "users", SimpleNamespace(find_one=find_one_then_concurrent_update))
+    session, user = run(server.load_session("test-token"))
+    assert user["user_id"] == "user_test"
+    assert server.session_cache.get("test-token") is None
+
+    monkeypatch.setattr(server.db, "users", users)
+    run(server.load_session("test-token"))
+    assert server.session_cache.get("test-token") is not None
+    server.session_cache.invalidate("users", "user_id", "user_test")
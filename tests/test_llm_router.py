@@ -0,0 +1,61 @@
+import asyncio
+
+from llm_router import LLMProvider, LLMRouter
+
+
+class FakeProvider(LLMProvider):
+    def __init__(self, name: str, latency: float):
+        super().__init__(model=name)
+        self.name = name
+        self.latency = latency
+
+    async def complete(self, system: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        await asyncio.sleep(self.latency)
+        return self.name
+
+
+def test_lost_hedges_do_not_lower_slow_provider_latency():
+    fast, slow = FakeProvider("fast", 0.03), FakeProvider("slow", 1.0)
+    router = LLMRouter([fast, slow], hedge=True)
+    router.stats["slow"].record(1.0, True)
+    # Hedge to the runner-up almost at once, so every slow call is cancelled early
+    router.hedge_delay = lambda provider: 0.005
+
+    async def scenario():
+        for _ in range(10):
+            assert await router.complete("system", "prompt") == ("fast", "fast")
+
+    asyncio.run(scenario())
+    slow_stats = router.stats["slow"]
+    assert router.hedges_sent == 10
+    assert slow_stats.censored == 10
+    assert slow_stats.latency_quantile(0.95) == 1.0
+    assert slow_stats.latency_quantile(0.5) == 1.0
+    assert router.ranked()[0] is fast
+
+
+def test_hedges_hold_their_own_concurrency_slot():
+    from admission import ConcurrencyLimiter
+
+    limiter = ConcurrencyLimiter("llm", limit=2, max_queue=8, queue_timeout=5)
+    peak = 0
+
+    class CountingProvider(FakeProvider):
+        async def complete(self, *args):
+            nonlocal peak
+            peak = max(peak, limiter.in_flight)
+            return await super().complete(*args)
+
+    router = LLMRouter([CountingProvider("slow", 0.05), CountingProvider("other", 0.05)], hedge=True, limiter=limiter)
+    router.hedge_delay = lambda provider: 0.001
+
+    async def scenario(requests):
+        return await asyncio.gather(*[router.complete("system", "prompt") for _ in range(requests)])
+
+    # Both slots taken by primaries: no hedges
+    assert len(asyncio.run(scenario(4))) == 4
+    assert router.hedges_sent == 0
+    # A lone request hedges into the free slot
+    asyncio.run(scenario(1))
+    assert router.hedges_sent == 1
+    assert peak == 2
@@ -0,0 +1,85 @@
+import base64
+
+
+def seed(server, run):
+    run(server.db.stories.insert_many([
+        {"id": "voiced", "slug": "voiced", "title": "A", "content": "Bir varmış", "age_group": "6-8",
+         "audio_base64": base64.b64encode(b"mp3-bytes").decode()},
+        {"id": "silent", "slug": "silent", "title": "B", "content": "Bir yokmuş", "age_group": "6-8",
+         "audio_base64": None, "audio_pending": True},
+    ]))
+
+
+def test_story_payloads_carry_no_audio_blob(api, server, run):
+    seed(server, run)
+    for path in ["/api/stories", "/api/stories/popular"]:
+        stories = {story["id"]: story for story in api.get(path).json()}
+        assert all("audio_base64" not in story for story in stories.values())
+        assert stories["voiced"]["audio_pending"] is False
+        assert stories["silent"]["audio_pending"] is True
+    for path in ["/api/masal/voiced", "/api/stories/voiced"]:
+        assert "audio_base64" not in api.get(path).json()
+
+
+def test_audio_endpoint_serves_mp3_and_skips_blob_for_other_renditions(api, server, run, monkeypatch):
+    seed(server, run)
+    response = api.get("/api/stories/voiced/audio")
+    assert response.status_code == 200
+    assert response.content == b"mp3-bytes"
+
+    seen = {}
+
+    async def fake_rendition(story, rendition):
+        seen.update(story)
+        return b"opus-bytes"
+
+    monkeypatch.setattr(server, "get_or_create_rendition", fake_rendition)
+    response = api.get("/api/stories/voiced/audio", params={"rendition": "opus"})
+    assert response.content == b"opus-bytes"
+    assert "audio_base64" not in seen
+
+    assert api.get("/api/stories/silent/audio").status_code == 404
+    assert api.get("/api/stories/silent/audio", params={"rendition": "opus"}).status_code == 404
+    assert api.get("/api/stories/missing/audio").status_code == 404
+
+
+def test_audio_endpoint_serves_byte_ranges(api, server, run):
+    seed(server, run)
+    full = api.get("/api/stories/voiced/audio")
+    assert full.headers["accept-ranges"] == "bytes"
+    assert full.headers["cache-control"] == server.AUDIO_CACHE_CONTROL
+
+    partial = api.get("/api/stories/voiced/audio", headers={"Range": "bytes=4-"})
+    assert partial.status_code == 206
+    assert partial.content == b"bytes"
+    assert partial.headers["content-range"] == "bytes 4-8/9"
+
+    stale = api.get("/api/stories/voiced/audio", headers={"Range": "bytes=0-2", "If-Range": '"old"'})
+    assert stale.status_code == 200 and stale.content == b"mp3-bytes"
+
+    beyond = api.get("/api/stories/voiced/audio", headers={"Range": "bytes=50-"})
+    assert beyond.status_code == 416
+    assert beyond.headers["content-range"] == "bytes */9"
+
+    revalidated = api.get("/api/stories/voiced/audio", headers={"If-None-Match": full.headers["etag"]})
+    assert revalidated.status_code == 304
+
+
+def test_concurrent_first_requests_synthesize_once(server, run, monkeypatch):
+    import asyncio
+
+    calls = []
+
+    async def slow_synthesis(text, rendition):
+        calls.append(rendition)
+        await asyncio.sleep(0.01)
+        return b"opus-bytes"
+
+    monkeypatch.setattr(server, "synthesize_speech", slow_synthesis)
+    story = {"id": "voiced", "content": "Bir varmış"}
+
+    async def first_requests():
+        return await asyncio.gather(*[server.get_or_create_rendition(story, "opus") for _ in range(5)])
+
+    assert run(first_requests()) == [b"opus-bytes"] * 5
+    assert calls == ["opus"]
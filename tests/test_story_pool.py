@@ -0,0 +1,53 @@
+import asyncio
+
+
+def test_concurrent_reservations_never_exceed_daily_budget(server, run, monkeypatch):
+    monkeypatch.setattr(server, "STORY_POOL_DAILY_BUDGET", 3)
+
+    async def reserve_many():
+        return await asyncio.gather(*[server.reserve_pool_budget() for _ in range(6)])
+
+    assert sorted(run(reserve_many())) == [False] * 3 + [True] * 3
+    assert run(server.pool_budget_remaining()) == 0
+    assert run(server.reserve_pool_budget()) is False
+
+
+def test_idleness_is_shared_across_workers(server, run):
+    from datetime import datetime, timedelta, timezone
+
+    now = datetime.now(timezone.utc)
+    assert run(server.server_is_idle()) is True
+
+    # Another worker's generation: still running, started a while ago
+    run(server.db.generation_activity.insert_one({
+        "_id": "other", "started_at": now - timedelta(minutes=5), "finished_at": None
+    }))
+    assert run(server.server_is_idle()) is False
+
+    run(server.db.generation_activity.update_one({"_id": "other"}, {"$set": {"finished_at": now}}))
+    assert run(server.server_is_idle()) is True
+
+    activity_id = run(server.record_generation_start())
+    assert run(server.server_is_idle()) is False
+    run(server.record_generation_end(activity_id))
+    # Finished, but started within STORY_POOL_IDLE_SECONDS
+    assert run(server.server_is_idle()) is False
+
+
+def test_pool_demand_ignores_custom_requests(server, run, monkeypatch):
+    from datetime import datetime, timezone
+
+    # Target size == number of counted requests
+    monkeypatch.setattr(server, "STORY_POOL_DEMAND_PER_SLOT", 1)
+    monkeypatch.setattr(server, "STORY_POOL_SIZE", 10)
+    base = {"topic_id": "t", "subtopic_id": "st", "subtopic_name": "Paylaşmak", "age_group": "4-6",
+            "created_at": datetime.now(timezone.utc).isoformat()}
+    run(server.db.stories.insert_many([
+        {**base, "theme": "Paylaşmak", "character": None},
+        {**base, "theme": "Paylaşmak", "character": "Ejderha"},
+        {**base, "theme": "Uzayda paylaşmak", "character": ""},
+    ]))
+
+    [(combination, target)] = run(server.popular_pool_targets())
+    assert combination["subtopic_id"] == "st"
+    assert target == 1
@@ -0,0 +1,85 @@
+"""The trusted-document fast path must render exactly what response_model did"""
+
+from typing import List
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+STORIES = [
+    {
+        "id": "s1", "slug": "4-5-sabirli-tavsan", "title": "Sabırlı Tavşan", "content": "Bir varmış...",
+        "topic_id": "degerler", "topic_name": "Değerler", "theme": "Sabır", "age_group": "4-5",
+        "duration": 120, "play_count": 9, "created_at": "2025-01-02T10:00:00+00:00",
+        "user_id": "u1", "creator_name": "Ayşe", "creator_id": "u1", "audio_base64": "QUJD",
+    },
+    {
+        # Legacy shape: old topic field, no topic_id / theme / play_count
+        "id": "s2", "slug": "eski-masal", "title": "Eski Masal", "content": "Bir yokmuş...",
+        "topic": "Doğa", "age_group": "6-8", "audio_base64": None, "audio_pending": True,
+    },
+]
+
+
+def validated_client(server):
+    """The same documents served the old way: response_model validation"""
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    @app.get("/stories", response_model=List[server.StoryResponse])
+    async def stories(response: Response, cursor: str = ""):
+        if cursor:
+            response.headers["X-Next-Cursor"] = cursor
+        return [dict(story) for story in STORIES]
+
+    @app.get("/masal/{slug}", response_model=server.StoryResponse)
+    async def story(slug: str):
+        return next(dict(story) for story in STORIES if story["slug"] == slug)
+
+    return TestClient(app)
+
+
+def response_headers(response) -> dict:
+    return {name: response.headers.get(name) for name in ["content-type", "content-length", "x-next-cursor"]}
+
+
+def test_story_list_matches_validated_path(api, server, run):
+    run(server.db.stories.insert_many([dict(story) for story in STORIES]))
+    reference = validated_client(server)
+
+    fast = api.get("/api/stories", params={"sort_by": "popular"})
+    validated = reference.get("/stories")
+    assert fast.content == validated.content
+    assert response_headers(fast) == response_headers(validated)
+
+    first_page = api.get("/api/stories", params={"sort_by": "popular", "limit": 1})
+    assert first_page.headers.get("x-next-cursor")
+    assert first_page.json() == validated.json()[:1]
+
+
+def test_story_detail_matches_validated_path(api, server, run):
+    run(server.db.stories.insert_many([dict(story) for story in STORIES]))
+    reference = validated_client(server)
+    for slug in ["4-5-sabirli-tavsan", "eski-masal"]:
+        fast = api.get(f"/api/masal/{slug}")
+        validated = reference.get(f"/masal/{slug}")
+        assert fast.status_code == validated.status_code == 200
+        assert fast.content == validated.content
+        assert response_headers(fast) == response_headers(validated)
+
+
+def test_missing_required_field_fails_like_validated_path(server, run):
+    legacy = {"id": "s3", "slug": "icerik-yok", "title": "İçerik Yok"}
+    # A validation error naming the field, not an orjson TypeError on a sentinel
+    with pytest.raises(ValidationError, match="content"):
+        server.story_payload(legacy)
+
+    run(server.db.stories.insert_one(dict(legacy)))
+    STORIES.append(legacy)
+    try:
+        fast = TestClient(server.app, raise_server_exceptions=False).get("/api/masal/icerik-yok")
+        validated = TestClient(validated_client(server).app, raise_server_exceptions=False).get("/masal/icerik-yok")
+    finally:
+        STORIES.remove(legacy)
+    assert fast.status_code == validated.status_code == 500